@@ -0,0 +1,69 @@
+"""
+Times the doc fetch and cache paths against the local docs stand-in.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_doc_fetch.py [--latency=<seconds>]
+
+Runs without network access: every request goes to `tests/docs_standin.py`,
+which adds a fixed latency (default 50 ms) to each page, and the doc cache
+lives in a temporary directory.
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests"))
+
+import generate_stimela_casa_cab  # noqa: E402
+from docs_standin import DocsStandIn  # noqa: E402
+from generate_stimela_casa_cab import (  # noqa: E402
+    CACHE_DIR_ENV, DOCS_MEMO, DOCS_URL_ENV, ArchiveDocSource, build_doc_archive, fetch_xml_parameter_info,
+    lookup_docs, prefetch_docs,
+)
+
+TASK = "deconvolve"
+
+
+def timed_ms(func):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func()
+        return (time.perf_counter() - start) * 1000
+
+
+def main():
+    options = dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("--") and "=" in arg)
+    latency = float(options.get("latency", 0.05))
+    generate_stimela_casa_cab.HTTP_BACKOFF = 0
+
+    rows = []
+    with tempfile.TemporaryDirectory() as cache_dir, DocsStandIn(latency=latency) as standin:
+        os.environ[CACHE_DIR_ENV] = cache_dir
+        os.environ[DOCS_URL_ENV] = standin.url
+        DOCS_MEMO.clear()
+
+        rows.append(["download (cold cache)", timed_ms(lambda: fetch_xml_parameter_info(TASK))])
+        rows.append(["disk cache, fresh", timed_ms(lambda: fetch_xml_parameter_info(TASK))])
+        rows.append(["disk cache, revalidated (304)", timed_ms(lambda: fetch_xml_parameter_info(TASK, max_age=0))])
+        standin.fail_next(2)
+        rows.append(["download after 2 retried 503s", timed_ms(lambda: fetch_xml_parameter_info(TASK, max_age=0))])
+        lookup_docs(TASK)
+        rows.append(["in-process memo", timed_ms(lambda: lookup_docs(TASK))])
+        archive = ArchiveDocSource(os.path.join(cache_dir, "docs-archive.json"))
+        build_doc_archive(archive.path, [TASK])
+        rows.append(["offline archive, first read", timed_ms(lambda: archive.lookup(TASK))])
+        rows.append(["offline archive, loaded", timed_ms(lambda: archive.lookup(TASK))])
+        for concurrency in (1, 2):
+            rows.append([f"prefetch index, concurrency {concurrency}", timed_ms(lambda: prefetch_docs(concurrency))])
+
+    print(f"Stand-in latency: {latency * 1000:.0f} ms per request")
+    print(tabulate([[name, f"{ms:.2f}"] for name, ms in rows], headers=["path", "ms"], tablefmt="github"))
+
+
+if __name__ == "__main__":
+    main()
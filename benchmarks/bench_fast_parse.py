@@ -0,0 +1,57 @@
+"""
+Compares the tokenizer fast path with the full-AST path of `extract_yaml()`.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_fast_parse.py [<python_file|dir>...]
+
+Defaults to the test fixtures. Reports best-of-N timings for locating the
+task regions alone and for the whole extraction.
+"""
+import ast
+import contextlib
+import io
+import os
+import sys
+import timeit
+
+from tabulate import tabulate
+
+from generate_stimela_casa_cab import collect_task_files, extract_yaml, scan_task_regions, task_regions_from_ast
+
+REPEAT = 5
+NUMBER = 20
+
+
+def best_ms(func):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return min(timeit.repeat(func, repeat=REPEAT, number=NUMBER)) / NUMBER * 1000
+
+
+def ast_regions(path):
+    with open(path) as f:
+        return task_regions_from_ast(ast.parse(f.read()))
+
+
+def main():
+    paths = collect_task_files(sys.argv[1:] or [os.path.join("tests", "fixtures")])
+    rows = []
+    for path in paths:
+        if scan_task_regions(path) is None:
+            rows.append([os.path.basename(path), "fallback", "", "", "", ""])
+            continue
+        regions_ast = best_ms(lambda: ast_regions(path))
+        regions_fast = best_ms(lambda: scan_task_regions(path))
+        full_ast = best_ms(lambda: extract_yaml(path))
+        full_fast = best_ms(lambda: extract_yaml(path, fast=True))
+        rows.append([
+            os.path.basename(path),
+            f"{regions_ast:.3f}", f"{regions_fast:.3f}",
+            f"{full_ast:.3f}", f"{full_fast:.3f}",
+            f"{full_ast / full_fast:.2f}x",
+        ])
+    headers = ["task", "regions AST (ms)", "regions fast (ms)", "extract AST (ms)", "extract fast (ms)", "speedup"]
+    print(tabulate(rows, headers=headers, tablefmt="github"))
+
+
+if __name__ == "__main__":
+    main()
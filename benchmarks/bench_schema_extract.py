@@ -0,0 +1,81 @@
+"""
+Compares `extract_schema_dict()` with the exception-driven extractor it replaced.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_schema_extract.py [<python_file|dir>...]
+
+Defaults to the test fixtures. Both extractors run on the same pre-parsed
+`schema` node; the table reports best-of-N timings and how many exceptions
+the old extractor raised and caught per call.
+"""
+import ast
+import os
+import sys
+import timeit
+
+from tabulate import tabulate
+
+from generate_stimela_casa_cab import collect_task_files, extract_schema_dict, task_regions_from_ast
+
+REPEAT = 5
+NUMBER = 200
+
+
+def get_default_value(node):
+    """The previous per-value reader: the literal value of `node`, or its source text when it is not a literal."""
+    try:
+        return ast.literal_eval(node)
+    except Exception:
+        return ast.unparse(node)
+
+
+def legacy_extract_schema_dict(schema_node):
+    """The previous extractor: `literal_eval`, then `unparse` on failure, for every key of every entry."""
+    schema = {}
+    if not isinstance(schema_node, ast.Dict):
+        return schema
+    for key_node, val_node in zip(schema_node.keys, schema_node.values):
+        key = key_node.value if isinstance(key_node, ast.Constant) else None
+        if key and isinstance(val_node, ast.Dict):
+            param_info = {}
+            for k, v in zip(val_node.keys, val_node.values):
+                if isinstance(k, ast.Constant):
+                    param_info[k.value] = get_default_value(v)
+            schema[key] = param_info
+    return schema
+
+
+def count_exceptions(schema_node):
+    count = 0
+    for val_node in getattr(schema_node, "values", []):
+        for v in getattr(val_node, "values", []):
+            try:
+                ast.literal_eval(v)
+            except Exception:
+                count += 1
+    return count
+
+
+def best_us(func):
+    return min(timeit.repeat(func, repeat=REPEAT, number=NUMBER)) / NUMBER * 1e6
+
+
+def main():
+    paths = collect_task_files(sys.argv[1:] or [os.path.join("tests", "fixtures")])
+    rows = []
+    for path in paths:
+        with open(path) as f:
+            schema_node = task_regions_from_ast(ast.parse(f.read()))["schema"]
+        if schema_node is None:
+            rows.append([os.path.basename(path), "no schema", "", "", ""])
+            continue
+        legacy = best_us(lambda: legacy_extract_schema_dict(schema_node))
+        selective = best_us(lambda: extract_schema_dict(schema_node))
+        rows.append([os.path.basename(path), count_exceptions(schema_node), f"{legacy:.1f}", f"{selective:.1f}",
+                     f"{legacy / selective:.1f}x"])
+    headers = ["task", "exceptions (old)", "old (µs)", "key-selective (µs)", "speedup"]
+    print(tabulate(rows, headers=headers, tablefmt="github"))
+
+
+if __name__ == "__main__":
+    main()
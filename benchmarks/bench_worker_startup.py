@@ -0,0 +1,100 @@
+"""
+Compares worker start-up and per-task overhead of naive and warm-started pools.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_worker_startup.py [--workers=<n>] [--tasks=<n>] [<python_file|dir>...]
+
+"startup" is the time until every worker has answered a trivial task, which
+includes importing the generator and its dependencies where a worker has to.
+"per task" is the mean wall time per extraction of the fixtures, repeated to
+`--tasks` items, once the pool is up. Each pool is measured in its own
+interpreter, so no fork server or preload list carries over between pools.
+A second table times extraction with the cyclic GC enabled and paused.
+"""
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+import timeit
+from concurrent.futures import ProcessPoolExecutor
+
+from tabulate import tabulate
+
+from generate_stimela_casa_cab import collect_task_files, extract_task, extract_yaml, gc_paused, make_worker_pool
+
+
+def naive_pool(method):
+    def make_pool(workers):
+        context = multiprocessing.get_context(method)
+        if method == "forkserver":
+            # Only this pool runs in the measuring interpreter, so the preload list is not shared
+            context.set_forkserver_preload([])
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    return make_pool
+
+
+POOLS = [
+    ("spawn (naive)", naive_pool("spawn")),
+    ("forkserver (naive)", naive_pool("forkserver")),
+    ("fork (naive)", naive_pool("fork")),
+    ("forkserver + preload + gc.freeze", make_worker_pool),
+]
+
+
+def run(make_pool, workers, items):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        with make_pool(workers) as executor:
+            list(executor.map(extract_task, [("noop", "")] * workers * 2))
+            started = time.perf_counter()
+            list(executor.map(extract_task, items))
+            finished = time.perf_counter()
+    return (started - start) * 1000, (finished - started) / len(items) * 1000
+
+
+def main():
+    options = dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("--") and "=" in arg)
+    workers = int(options.get("workers", 4))
+    paths = collect_task_files([arg for arg in sys.argv[1:] if not arg.startswith("--")]
+                               or [os.path.join("tests", "fixtures")])
+    count = int(options.get("tasks", 200))
+    items = [paths[i % len(paths)] for i in range(count)]
+
+    if "pool" in options:
+        # Child run: measure a single pool and report it to the parent
+        print(json.dumps(run(POOLS[int(options["pool"])][1], workers, items)))
+        return
+
+    rows = []
+    for index, (name, _) in enumerate(POOLS):
+        if name.split()[0] not in multiprocessing.get_all_start_methods():
+            continue
+        child = subprocess.run([sys.executable, __file__, f"--pool={index}"] + sys.argv[1:],
+                               check=True, capture_output=True, text=True)
+        startup, per_task = json.loads(child.stdout.splitlines()[-1])
+        rows.append([name, f"{startup:.0f}", f"{per_task:.3f}"])
+    print(f"{workers} workers, {count} tasks")
+    print(tabulate(rows, headers=["pool", "startup (ms)", "per task (ms)"], tablefmt="github"))
+
+    rows = []
+    for path in paths:
+        def extract():
+            with contextlib.redirect_stdout(io.StringIO()):
+                extract_yaml(path)
+
+        def extract_paused():
+            with gc_paused():
+                extract()
+
+        enabled, paused = (min(timeit.repeat(func, repeat=5, number=20)) / 20 * 1000 for func in (extract, extract_paused))
+        rows.append([os.path.basename(path), f"{enabled:.3f}", f"{paused:.3f}"])
+    print()
+    print(tabulate(rows, headers=["task", "GC enabled (ms)", "GC paused (ms)"], tablefmt="github"))
+
+
+if __name__ == "__main__":
+    main()
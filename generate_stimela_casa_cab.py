@@ -1,4 +1,27 @@
+import abc
 import ast
+import atexit
+import contextlib
+import copy
+import gc
+import hashlib
+import inspect
+import io
+import json
+import mmap
+import multiprocessing
+import multiprocessing.connection
+import signal
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+import tokenize
+import xml.etree.ElementTree as ElementTree
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import yaml
 import re
 import sys
@@ -7,6 +30,11 @@ import requests
 from bs4 import BeautifulSoup
 from tabulate import tabulate
 
+try:
+    import fcntl
+except ImportError:  # not available on Windows; FileLock then does not lock
+    fcntl = None
+
 # CASA c-based data types mapped to python
 CASA_TO_PYTHON_TYPES = {
     "cFloat": "float",
@@ -33,6 +61,12 @@ UNION_TYPE_MAP = {
     ("bool", "List[bool]"): "Union[bool, List[bool]]",
 }
 
+# Keys of each `schema` entry read by extract_schema_dict(); everything else (e.g. `coerce`) is skipped
+SCHEMA_KEYS = ("type", "anyof", "allowed")
+
+# Stimela dtypes of `type`/`anyof` schema fragments, keyed by structural hash; see resolve_schema_dtype()
+DTYPE_CACHE = {}
+
 
 class QuotedString(str):
     """
@@ -61,60 +95,300 @@ class CleanDumper(yaml.SafeDumper):
 
 CleanDumper.add_representer(QuotedString, quoted_presenter)
 
+# File holding parameter specs shared between cabs in --shared-fragments mode
+SHARED_FRAGMENTS_FILE = "casa_shared_params.yaml"
+# Combined cab file written in --shared-anchors mode
+SHARED_ANCHORS_FILE = "casa_cabs.yaml"
+# Stimela config section the shared fragments are stored under
+SHARED_FRAGMENTS_SECTION = "lib.params.casa"
 
-def get_default_value(node):
-    """
-    Resolves the most appropriate default value for a given parameter.
+# Bumped whenever generated cabs change for the same wrapper; part of the extraction memo key
+GENERATOR_VERSION = 2
+# Entries kept by the in-process extraction and doc memos
+DEFAULT_MEMO_SIZE = 256
 
-    Prioritizes the value parsed from the docstring. Falls back to the AST
-    function signature default if no docstring default is found.
+# Start method of batch worker processes; forkserver avoids forking a process that runs doc-fetch and metrics threads
+WORKER_START_METHOD = "forkserver"
+# Modules the fork server imports once, so every worker starts with them (and CleanDumper's representers) loaded
+WORKER_PRELOAD = (__name__, "yaml", "requests", "bs4", "tabulate")
 
-    Args:
-        parsed_doc_info (dict): Dictionary of parsed parameter docstrings.
-        param_defaults (dict): Accumulator for parameter defaults.
-        name (str): Name of the current parameter.
-        i (int): Index of the parameter in the function signature.
-        default_offset (int): Offset to align parameters with defaults.
-        defaults (list): List of AST-parsed default values.
+# Fast-load sidecar written next to each YAML file with --sidecar
+SIDECAR_SUFFIX = ".cab.json"
+# Bumped whenever the sidecar layout changes; stale versions are ignored by load_cab()
+SIDECAR_SCHEMA_VERSION = 1
 
-    Returns:
-        Any: A valid Python object or literal to be used as default.
+# Packed cab bundle written with --bundle: magic, 8-byte header length, JSON header index, then one JSON blob per cab
+BUNDLE_MAGIC = b"CASACABS"
+BUNDLE_SCHEMA_VERSION = 1
+
+# CASA XML task documentation; task pages live under CASA_TASK_DOCS_PATH
+CASA_DOCS_URL = "https://casadocs.readthedocs.io/en/v4.7-v6.1/"
+# Environment variable pointing the generator at another docs site, e.g. a local mirror or test stand-in
+DOCS_URL_ENV = "STIMELA_CASA_DOCS_URL"
+CASA_TASK_DOCS_PATH = "tasks611/"
+CASA_XML_INDEX_PATH = "notebooks/XML611.html"
+# Docs location of each CASA release whose task pages use the XML parameter table layout
+CASA_RELEASES = {
+    "6.1": {"docs_url": CASA_DOCS_URL, "tasks_path": CASA_TASK_DOCS_PATH, "index_path": CASA_XML_INDEX_PATH},
+}
+DEFAULT_CASA_VERSION = "6.1"
+# Environment variable selecting the CASA release whose docs are used (set by --casa-version)
+CASA_VERSION_ENV = "STIMELA_CASA_VERSION"
+# Content-addressed cab store shared by all CASA releases, inside the cache directory unless --store=<dir>
+CAB_STORE_DIR = "store"
+# Store releases are labelled with any release number, e.g. 6.2 or 6.5.0-pre, whether or not CASA_RELEASES knows its docs
+RELEASE_LABEL_RE = re.compile(r"\d+(?:\.\d+)*(?:[-+][A-Za-z0-9.]+)?")
+# Seconds a cached doc page is served without revalidating it; --doc-max-age=<seconds> sets DOC_MAX_AGE_ENV
+DOC_CACHE_MAX_AGE = 24 * 3600
+DOC_MAX_AGE_ENV = "STIMELA_CASA_DOC_MAX_AGE"
+# Tasks whose doc pages are fetched ahead of the one being parsed in pipelined runs
+DEFAULT_DOC_LOOKAHEAD = 4
+# Task list of the last --prefetch crawl, inside the doc cache
+CRAWL_INDEX_FILE = "_crawl.json"
+DEFAULT_PREFETCH_CONCURRENCY = 8
+HTTP_TIMEOUT = 30
+HTTP_RETRIES = 2
+HTTP_BACKOFF = 0.25
+
+# Environment variables adding local CASA task XML files (`<task>.xml`) and a prebuilt offline doc archive to the
+# doc-source chain (set by --xml-dir and --doc-archive); the XML files belong to one CASA release, XML_VERSION_ENV
+# (set by --xml-version, else --casa-version), and only serve lookups for that release
+XML_DIR_ENV = "STIMELA_CASA_XML_DIR"
+XML_VERSION_ENV = "STIMELA_CASA_XML_VERSION"
+DOC_ARCHIVE_ENV = "STIMELA_CASA_DOC_ARCHIVE"
+DOC_ARCHIVE_SCHEMA_VERSION = 1
+# Most recent doc lookups kept by a DocSourceChain for its report
+DOC_SOURCE_LOG_SIZE = 10_000
+
+# A lock on a shared cache entry held longer than this many seconds is treated as abandoned and broken
+LOCK_STALE_AFTER = 600
+# Seconds between attempts to take a lock held by another process
+LOCK_POLL_INTERVAL = 0.05
+# Seconds between touches of the locks a live process holds, so long-running holders never look stale
+LOCK_HEARTBEAT_INTERVAL = 15
+
+# Environment variable overriding the on-disk cache directory
+CACHE_DIR_ENV = "STIMELA_CASA_CACHE_DIR"
+# SQLite file, inside the cache directory, holding incremental validation results
+VALIDATION_STATE_FILE = "validation_state.sqlite"
+
+# Default SQLite database written by --index and read by --query
+INDEX_DB_FILE = "casa_index.sqlite"
+# Layout version of the index, kept in `PRAGMA user_version`; older indexes are rebuilt
+INDEX_SCHEMA_VERSION = 2
+
+# Metric names are prefixed with METRIC_PREFIX; latency histograms use METRIC_BUCKETS (seconds)
+METRIC_PREFIX = "stimela_casa_"
+METRIC_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_HELP = {
+    "tasks_total": "Task wrappers processed, by status.",
+    "task_seconds": "Wall time to extract one task.",
+    "stage_seconds": "Wall time of each stage: extract_yaml's parse/docstring/schema/build, write and validate.",
+    "cab_cache_total": "Generated-cab cache lookups, by layer (memory or store) and result.",
+    "dtype_cache_total": "Schema-fragment dtype resolutions, by result.",
+    "doc_cache_total": "Doc cache lookups, by result.",
+    "doc_source_total": "Task docs served by each backend of the doc-source chain, by status.",
+    "lock_wait_seconds": "Time spent waiting for another process to finish a shared cache entry.",
+    "locks_broken_total": "Stale cache-entry locks broken after their holder died or timed out.",
+    "doc_source_seconds": "Time to look up one task's docs through the doc-source chain, by serving backend.",
+    "http_requests_total": "HTTP requests to the CASA docs, by status code.",
+    "http_errors_total": "HTTP requests to the CASA docs that failed.",
+    "http_request_seconds": "Latency of HTTP requests to the CASA docs.",
+    "bytes_written_total": "Bytes written to YAML and sidecar files.",
+    "budget_exceeded_total": "Tasks killed for exceeding their time or memory budget, by kind.",
+    "run_seconds": "Seconds since the run started.",
+    "tasks_per_second": "Task wrappers processed per second since the run started.",
+}
+
+# Default localhost port for --serve when no --socket is given
+DEFAULT_SERVER_PORT = 8765
+
+
+class RunMetrics:
     """
-    try:
-        return ast.literal_eval(node)
-    except Exception:
-        return ast.unparse(node)
+    Thread-safe counters and latency histograms for a generator run.
+
+    Exported at the end of a run, or periodically, in Prometheus text-exposition
+    format or as JSON (see `write()`).
+    """
+
+    def __init__(self, buckets=METRIC_BUCKETS):
+        self.buckets = buckets
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram["counts"][i] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0)
+
+    def _gauges(self):
+        elapsed = max(time.time() - self.started, 1e-9)
+        tasks = sum(value for (name, _), value in self._counters.items() if name == "tasks_total")
+        return {"run_seconds": elapsed, "tasks_per_second": tasks / elapsed}
+
+    def snapshot(self):
+        """
+        Returns all metrics as a JSON-serializable dict.
+
+        Returns:
+            dict: 'counters', 'histograms' and derived 'gauges'.
+        """
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "histograms": [
+                    {"name": name, "labels": dict(labels), "buckets": dict(zip(map(str, self.buckets), h["counts"])),
+                     "sum": h["sum"], "count": h["count"]}
+                    for (name, labels), h in sorted(self._histograms.items())
+                ],
+                "gauges": self._gauges(),
+            }
+
+    def to_prometheus(self):
+        """
+        Renders all metrics in Prometheus text-exposition format.
+
+        Returns:
+            str: Exposition text, one family per metric name.
+        """
+        def fmt_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            families = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                families.setdefault((name, "counter"), []).append(f"{METRIC_PREFIX}{name}{fmt_labels(labels)} {value}")
+            for (name, labels), h in sorted(self._histograms.items()):
+                samples = families.setdefault((name, "histogram"), [])
+                for bound, count in zip(self.buckets, h["counts"]):
+                    samples.append(f"{METRIC_PREFIX}{name}_bucket{fmt_labels(labels, [('le', bound)])} {count}")
+                samples.append(f"{METRIC_PREFIX}{name}_bucket{fmt_labels(labels, [('le', '+Inf')])} {h['count']}")
+                samples.append(f"{METRIC_PREFIX}{name}_sum{fmt_labels(labels)} {h['sum']}")
+                samples.append(f"{METRIC_PREFIX}{name}_count{fmt_labels(labels)} {h['count']}")
+            for name, value in self._gauges().items():
+                families[(name, "gauge")] = [f"{METRIC_PREFIX}{name} {value}"]
+
+        for (name, kind), samples in families.items():
+            lines.append(f"# HELP {METRIC_PREFIX}{name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Writes the metrics to `path`: JSON for `.json` files, Prometheus text otherwise.
+
+        Args:
+            path (str): Destination file, replaced atomically.
+        """
+        if path.endswith(".json"):
+            text = json.dumps(self.snapshot(), indent=2)
+        else:
+            text = self.to_prometheus()
+        # The periodic writer and the exit flush can write at the same time
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+# Process-wide metrics of the current run
+METRICS = RunMetrics()
 
 
 def extract_schema_dict(schema_node):
     """
-    Constructs the full Stimela-style YAML schema for a given CASA task.
+    Reads the parts of a task's `schema` literal that the generator uses.
 
-    Processes all function parameters using both AST introspection and docstring parsing.
-    Extracts types, default values, and parameter descriptions, then formats them
-    into a dictionary following Stimela's 'cabs' structure.
+    Only the `SCHEMA_KEYS` of each parameter entry are visited, and their
+    values are read straight from constant nodes, so the `coerce` callables
+    that make up most of the literal are never evaluated or unparsed. Values
+    that are not plain constants are left out.
 
     Args:
-        (your existing parameters...)
+        schema_node (ast.AST): The `schema = {...}` value node.
 
     Returns:
-        dict: A structured dictionary representing the Stimela 'cabs' YAML schema.
+        dict: Mapping of parameter names to their `type`, `anyof` and `allowed` entries.
     """
     schema = {}
     if not isinstance(schema_node, ast.Dict):
         return schema
     for key_node, val_node in zip(schema_node.keys, schema_node.values):
-        key = key_node.value if isinstance(key_node, ast.Constant) else None
-        if key and isinstance(val_node, ast.Dict):
-            param_info = {}
-            for k, v in zip(val_node.keys, val_node.values):
-                if isinstance(k, ast.Constant):
-                    param_key = k.value
-                    param_info[param_key] = get_default_value(v)
-            schema[key] = param_info
+        if isinstance(key_node, ast.Constant) and key_node.value and isinstance(val_node, ast.Dict):
+            schema[key_node.value] = _schema_entry(val_node)
     return schema
 
 
+def _schema_entry(dict_node):
+    param_info = {}
+    for k, v in zip(dict_node.keys, dict_node.values):
+        if not isinstance(k, ast.Constant) or k.value not in SCHEMA_KEYS:
+            continue
+        if k.value == "anyof":
+            if isinstance(v, ast.List):
+                param_info["anyof"] = [_schema_entry(alt) for alt in v.elts if isinstance(alt, ast.Dict)]
+            continue
+        value = _constant_value(v)
+        if value is not _NOT_CONSTANT:
+            param_info[k.value] = value
+    return param_info
+
+
+_NOT_CONSTANT = object()
+
+
+def _constant_value(node):
+    """Returns the value of a constant, or list/tuple of constants, node; `_NOT_CONSTANT` otherwise."""
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, (ast.List, ast.Tuple)):
+        values = [_constant_value(elt) for elt in node.elts]
+        if _NOT_CONSTANT in values:
+            return _NOT_CONSTANT
+        return values if isinstance(node, ast.List) else tuple(values)
+    if (isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant)
+            and isinstance(node.operand.value, (int, float, complex))):
+        return -node.operand.value
+    return _NOT_CONSTANT
+
+
 def extract_structured_param_docs_full_pass(filepath):
     """
     Parses the full docstring of a CASA task to extract structured parameter metadata.
@@ -130,51 +404,76 @@ def extract_structured_param_docs_full_pass(filepath):
     """
     with open(filepath, "r") as f:
         tree = ast.parse(f.read())
+    return extract_structured_param_docs(tree)
 
-    param_docs = {}
-    current_param = None
-    buffer = []
-    collecting = False
 
+def extract_structured_param_docs(tree):
+    """
+    Same as `extract_structured_param_docs_full_pass()`, on an already parsed module.
+
+    Args:
+        tree (ast.Module): Parsed CASA task module.
+
+    Returns:
+        dict: Mapping of parameter names to their 'default' and 'info' metadata.
+    """
     for node in ast.walk(tree):
         if isinstance(node, ast.ClassDef):
-            docstring = ast.get_docstring(node)
-            if not docstring:
-                return param_docs
+            return parse_param_docstring(ast.get_docstring(node))
+    return {}
 
-            lines = docstring.splitlines()
 
-            for line in lines:
-                line = line.expandtabs()
-                stripped = line.strip()
+def parse_param_docstring(docstring):
+    """
+    Extracts structured parameter metadata from a CASA task class docstring.
 
-                if 'parameter descriptions' in stripped.lower():
-                    collecting = True
-                    continue
+    Args:
+        docstring (str): Cleaned class docstring, or None.
 
-                if not collecting:
-                    continue
+    Returns:
+        dict: Mapping of parameter names to their 'default' and 'info' metadata.
+    """
+    param_docs = {}
+    current_param = None
+    buffer = []
+    collecting = False
+
+    if not docstring:
+        return param_docs
+
+    for line in docstring.splitlines():
+        line = line.expandtabs()
+        stripped = line.strip()
 
-                match = re.match(r'^([a-zA-Z_][a-zA-Z0-9_]*)\s{2,}(.*)', line)
-                if match:
-                    if current_param:
-                        param_docs[current_param] = process_block(current_param, buffer)
-                        buffer = []
-                    current_param = match.group(1)
-                    desc = match.group(2).strip()
-                    if desc:
-                        buffer.append(desc)
-                elif current_param:
-                    buffer.append(stripped)
+        if 'parameter descriptions' in stripped.lower():
+            collecting = True
+            continue
+
+        if not collecting:
+            continue
 
+        match = re.match(r'^([a-zA-Z_][a-zA-Z0-9_]*)\s{2,}(.*)', line)
+        if match:
             if current_param:
                 param_docs[current_param] = process_block(current_param, buffer)
+                buffer = []
+            current_param = match.group(1)
+            desc = match.group(2).strip()
+            if desc:
+                buffer.append(desc)
+        elif current_param:
+            buffer.append(stripped)
 
-            break
+    if current_param:
+        param_docs[current_param] = process_block(current_param, buffer)
 
     return param_docs
 
 
+# `default: (<value>)` in a parameter's docstring lines
+DOC_DEFAULT_RE = re.compile(r"default:\s*(\([^\)]+\))")
+
+
 def process_block(param, lines):
     """
     Extracts metadata for a single parameter from its docstring lines.
@@ -218,8 +517,8 @@ def process_block(param, lines):
             info = line.strip()
 
         if "default:" in lower:
-            # match = re.search(r"default:\s*(\(.*\))", line)
-            match = re.search(r"default:\s*(\([^\)]+\))", line)
+            # Stopping the search at the last ')' keeps it linear: no start position can scan past it and fail
+            match = DOC_DEFAULT_RE.search(line, 0, line.rfind(")") + 1)
             if match:
                 raw_val = match.group(1).strip()
                 default = parse_casa_default(raw_val)
@@ -230,100 +529,373 @@ def process_block(param, lines):
     return {"info": info, "default": default}
 
 
-def extract_yaml(filepath):
+def task_regions_from_ast(tree):
     """
-    Extracts a Stimela-style YAML schema from a Python CASA task file.
-
-    This function uses the AST to locate function definitions and parameters,
-    parses docstrings for default values and descriptions, and combines that
-    information into a dictionary under the Stimela 'cabs' format.
+    Locates the parts of a CASA task module that `extract_yaml()` needs.
 
     Args:
-        filepath (str): Path to the CASA task Python file.
+        tree (ast.Module): Parsed CASA task module.
 
     Returns:
-        dict: A dictionary containing the YAML structure, cab name, and parsed doc info.
+        dict: 'docstring' (cleaned class docstring), 'args' (`ast.arguments` of
+        `__call__`), 'schema' (the `schema = {...}` value node) and 'has_outputs'.
     """
-    with open(filepath, "r") as f:
-        tree = ast.parse(f.read())
-
-    cab_name = os.path.splitext(os.path.basename(filepath))[0]
-    param_order = []
-    param_defaults = {}
-    schema_data = {}
-    has_outputs = False
-    parsed_doc_info = extract_structured_param_docs_full_pass(filepath)
+    regions = {"docstring": None, "args": None, "schema": None, "has_outputs": False}
+    docstring_found = False
 
     for node in ast.walk(tree):
         if isinstance(node, ast.ClassDef):
+            if not docstring_found:
+                regions["docstring"] = ast.get_docstring(node)
+                docstring_found = True
+
             call_method = next((n for n in node.body if isinstance(n, ast.FunctionDef) and n.name == '__call__'), None)
             if not call_method:
                 continue
 
-            args = call_method.args.args[1:]
-            defaults = call_method.args.defaults
-            default_offset = len(args) - len(defaults)
-
-            for i, arg in enumerate(args):
-                name = arg.arg
-                param_order.append(name)
-                parsed = parsed_doc_info.get(name, {})
-                if parsed and parsed.get("default", None) is not None:
-                    param_defaults[name] = parsed["default"]
-                elif i >= default_offset:
-                    try:
-                        param_defaults[name] = ast.unparse(defaults[i - default_offset])
-                        if isinstance(param_defaults[name], str):
-                            if re.match(r"\[?bool\(true\)\]?", param_defaults[name].lower()):
-                                param_defaults[name] = [True]
-                            elif re.match(r"\[?bool\(false\)\]?", param_defaults[name].lower()):
-                                param_defaults[name] = [False]
-                            elif "bool(true)" in param_defaults[name].lower():
-                                param_defaults[name] = [True for _ in re.findall(r"bool\\(true\\)", param_defaults[name].lower())]
-                            elif "bool(false)" in param_defaults[name].lower():
-                                param_defaults[name] = [
-                                    False for _ in re.findall(r"bool\\(false\\)", param_defaults[name].lower())
-                                ]
-                    except Exception:
-                        param_defaults[name] = None
-                else:
-                    param_defaults[name] = None
-
-            has_outputs = any(isinstance(n, ast.Return) and n.value is not None for n in ast.walk(call_method))
+            regions["args"] = call_method.args
+            regions["has_outputs"] = any(isinstance(n, ast.Return) and n.value is not None for n in ast.walk(call_method))
 
             for stmt in call_method.body:
                 if isinstance(stmt, ast.Assign):
                     for target in stmt.targets:
                         if isinstance(target, ast.Name) and target.id == 'schema':
-                            schema_data = extract_schema_dict(stmt.value)
+                            regions["schema"] = stmt.value
             break
 
+    return regions
+
+
+def _tokenize_region(buf, offset, stop):
+    """
+    Tokenizes `buf` from byte `offset` until `stop(token, depth)` returns True.
+
+    Args:
+        buf (mmap.mmap or bytes): Module source.
+        offset (int): Byte offset of the start of a line.
+        stop (callable): Called with each token and the current bracket depth.
+
+    Returns:
+        tuple: `(text, token)` where `text` is the source from `offset` up to and
+        including the stop token.
+    """
+    pos = offset
+    lines = []
+
+    def readline():
+        nonlocal pos
+        end = buf.find(b"\n", pos)
+        end = len(buf) if end < 0 else end + 1
+        line = buf[pos:end].decode("utf-8")
+        pos = end
+        lines.append(line)
+        return line
+
+    depth = 0
+    for token in tokenize.generate_tokens(readline):
+        if token.type == tokenize.OP and token.string in "([{":
+            depth += 1
+        elif token.type == tokenize.OP and token.string in ")]}":
+            depth -= 1
+        if stop(token, depth):
+            row, col = token.end
+            return "".join(lines[:row - 1]) + lines[row - 1][:col], token
+    raise ValueError("region end not found")
+
+
+def _parse_region(buf, offset, stop, wrap):
+    """
+    Parses the statement starting at `offset` with `wrap(text)`.
+
+    xml-casa writes signatures and schema literals on a single line, which is
+    tried first; statements spanning several lines are delimited with `tokenize`.
+    """
+    end = buf.find(b"\n", offset)
+    line = buf[offset:len(buf) if end < 0 else end].decode("utf-8")
+    try:
+        return wrap(line.strip())
+    except SyntaxError:
+        text, _ = _tokenize_region(buf, offset, stop)
+        return wrap(text.strip())
+
+
+def _read_docstring(buf, class_pos):
+    """Returns the cleaned docstring of the class starting at `class_pos`, or None."""
+    match = re.compile(rb"[^\n#]*:[ \t]*(?:#[^\n]*)?\n(?:[ \t]*\n)*[ \t]+([rRuU]?)(\"\"\"|\'\'\')").match(buf, class_pos)
+    if not match:
+        return None
+    close = buf.find(match.group(2), match.end())
+    if close < 0:
+        raise ValueError("unterminated docstring")
+    literal = buf[match.start(1):close + 3].decode("utf-8")
+    return inspect.cleandoc(ast.literal_eval(literal))
+
+
+def scan_task_regions(filepath, source=None):
+    """
+    Fast path for standard xml-casa output that avoids building the module AST.
+
+    The file is memory-mapped and only three regions are read: the class
+    docstring (delimited by its quotes), the `__call__` signature and the
+    `schema = {...}` literal, each parsed on its own.
+
+    Args:
+        filepath (str): Path to the CASA task Python file.
+        source (str): Module source to use instead of mapping `filepath`.
+
+    Returns:
+        dict: Same layout as `task_regions_from_ast()`, or None when the file
+        does not look like standard xml-casa output.
+    """
+    if source is not None:
+        return _scan_task_regions(source.encode("utf-8"))
+    with open(filepath, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return None
+        with buf:
+            return _scan_task_regions(buf)
+
+
+def _scan_task_regions(buf):
+    if buf.find(b"generated by xml-casa", 0, 512) < 0:
+        return None
+
+    call_marker = b"    def __call__("
+    class_pos = buf.find(b"\nclass ")
+    call_pos = buf.find(call_marker)
+    if class_pos < 0 or call_pos < class_pos:
+        return None
+    # Exactly one class and one __call__, as xml-casa emits them
+    if buf.find(b"\nclass ", class_pos + 1) >= 0 or buf.find(b"def __call__(", call_pos + len(call_marker)) >= 0:
+        return None
+    schema_pos = buf.find(b"        schema = {", call_pos)
+    if schema_pos < 0:
+        return None
+    call_end = re.compile(rb"\n(?=\S)").search(buf, schema_pos)
+    call_end = call_end.start() if call_end else len(buf)
+
+    try:
+        docstring = _read_docstring(buf, class_pos + 1)
+        call_args = _parse_region(
+            buf, call_pos,
+            lambda token, depth: depth == 0 and token.type == tokenize.OP and token.string == ":",
+            lambda text: ast.parse(text + " pass").body[0].args,
+        )
+        schema = _parse_region(
+            buf, schema_pos,
+            lambda token, depth: depth == 0 and token.type == tokenize.OP and token.string == "}",
+            lambda text: ast.parse(text).body[0].value,
+        )
+    except (SyntaxError, ValueError, tokenize.TokenError, UnicodeDecodeError):
+        return None
+
+    try:
+        has_outputs = _returns_value(buf[call_pos:call_end].decode("utf-8"))
+    except (SyntaxError, tokenize.TokenError, UnicodeDecodeError):
+        return None
+    return {"docstring": docstring, "args": call_args, "schema": schema, "has_outputs": has_outputs}
+
+
+def _returns_value(text):
+    """
+    Whether the `__call__` source in `text` has a `return` with a value.
+
+    Works on tokens rather than lines so that `return(...)` is seen and the word
+    inside strings and docstrings is not, matching the `ast.Return` check.
+    """
+    previous = None
+    for token in tokenize.generate_tokens(io.StringIO(text).readline):
+        if (previous is not None and previous.type == tokenize.NAME and previous.string == "return"
+                and token.type not in (tokenize.NEWLINE, tokenize.NL, tokenize.COMMENT, tokenize.DEDENT, tokenize.ENDMARKER)
+                and token.string != ";"):
+            return True
+        previous = token
+    return False
+
+
+# Constructors xml-casa wraps signature defaults in, e.g. `nterms=int(2)`
+DEFAULT_CONSTRUCTORS = {"int": int, "float": float, "bool": bool, "str": str}
+
+
+def evaluate_default(node):
+    """
+    Evaluates a CASA constructor default from the `__call__` signature in one pass.
+
+    Understands literals, `int(...)`, `float(...)`, `bool(...)`, `str(...)`,
+    `numpy.array([...])`, negation, and lists, tuples and dicts of those.
+
+    Args:
+        node (ast.expr): Default value node from the function signature.
+
+    Returns:
+        Any: The typed Python value (tuples and arrays become lists).
+
+    Raises:
+        ValueError: If the node is not one of the supported forms, or a constructor
+            rejects its argument (e.g. `int('x')`).
+        TypeError: If a value has the wrong type, e.g. an unhashable dict key or
+            `int([1])`.
+    """
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [evaluate_default(elt) for elt in node.elts]
+    if isinstance(node, ast.Dict):
+        if any(key is None for key in node.keys):
+            raise ValueError("dict unpacking is not a literal")
+        return {evaluate_default(k): evaluate_default(v) for k, v in zip(node.keys, node.values)}
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = evaluate_default(node.operand)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return -value if isinstance(node.op, ast.USub) else value
+    if isinstance(node, ast.Call) and len(node.args) <= 1 and not node.keywords:
+        func = node.func
+        if isinstance(func, ast.Name) and func.id in DEFAULT_CONSTRUCTORS:
+            constructor = DEFAULT_CONSTRUCTORS[func.id]
+            return constructor(evaluate_default(node.args[0])) if node.args else constructor()
+        if (isinstance(func, ast.Attribute) and func.attr == "array"
+                and isinstance(func.value, ast.Name) and func.value.id in ("numpy", "np")):
+            return evaluate_default(node.args[0]) if node.args else []
+    raise ValueError(f"unsupported default: {ast.dump(node)}")
+
+
+def coerce_text_default(value):
+    """
+    Converts a default parsed from docstring text into a typed value.
+
+    Args:
+        value (Any): Output of `process_block()`; only strings are converted.
+
+    Returns:
+        Any: `float(...)`/`int(...)` constructors and Python literals become
+        values; other text is returned unchanged.
+    """
+    if not isinstance(value, str):
+        return value
+    float_match = re.match(r"float\((-?\d+(?:\.\d*)?)\)", value)
+    int_match = re.match(r"int\((-?\d+)\)", value)
+    if float_match:
+        return float(float_match.group(1))
+    if int_match:
+        return int(int_match.group(1))
+    try:
+        return ast.literal_eval(value)
+    except Exception:
+        return value
+
+
+def _type_fragment(schema_entry):
+    """Reduces a schema entry to the `type`/`anyof` structure that decides its dtype."""
+    if isinstance(schema_entry.get("anyof"), list):
+        return {"anyof": [_type_fragment(alt) for alt in schema_entry["anyof"] if isinstance(alt, dict)]}
+    return {"type": schema_entry.get("type", "unknown")}
+
+
+def _resolve_type_fragment(fragment):
+    if "anyof" not in fragment:
+        return CASA_TO_PYTHON_TYPES.get(fragment["type"], fragment["type"])
+    dtypes = list(dict.fromkeys(_resolve_type_fragment(alt) for alt in fragment["anyof"]))
+    if not dtypes or "Any" in dtypes:
+        return "Any"
+    if len(dtypes) == 1:
+        return dtypes[0]
+    return (UNION_TYPE_MAP.get(tuple(dtypes)) or UNION_TYPE_MAP.get(tuple(reversed(dtypes)))
+            or f"Union[{', '.join(dtypes)}]")
+
+
+def resolve_schema_dtype(schema_entry):
+    """
+    Maps a parameter's `schema` entry to a Stimela dtype.
+
+    Plain `type` entries go through `CASA_TO_PYTHON_TYPES`; `anyof` entries
+    become a Union of their alternatives, using `UNION_TYPE_MAP` spellings where
+    one exists. Results are memoized by the structural hash of the fragment, so
+    each distinct combination is resolved once per process.
+
+    Args:
+        schema_entry (dict): The parameter's entry from `extract_schema_dict()`.
+
+    Returns:
+        str: Stimela dtype, e.g. `Union[str, List[str]]`.
+    """
+    fragment = _type_fragment(schema_entry or {})
+    key = canonical_hash(fragment)
+    dtype = DTYPE_CACHE.get(key)
+    METRICS.inc("dtype_cache_total", result="miss" if dtype is None else "hit")
+    if dtype is None:
+        dtype = DTYPE_CACHE[key] = _resolve_type_fragment(fragment)
+    return dtype
+
+
+def extract_yaml(filepath, source=None, fast=False):
+    """
+    Extracts a Stimela-style YAML schema from a Python CASA task file.
+
+    This function uses the AST to locate function definitions and parameters,
+    parses docstrings for default values and descriptions, and combines that
+    information into a dictionary under the Stimela 'cabs' format.
+
+    Args:
+        filepath (str): Path to the CASA task Python file; its base name is the cab name.
+        source (str): Module source to use instead of reading `filepath`.
+        fast (bool): Try the tokenizer fast path (`scan_task_regions()`) first,
+            falling back to the full AST for non-standard files.
+
+    Returns:
+        dict: A dictionary containing the YAML structure, cab name, the task's
+        parsed `schema` literal and per-stage `timings` in seconds.
+    """
+    timings = {}
+    start = time.perf_counter()
+    regions = scan_task_regions(filepath, source) if fast else None
+    if regions is None:
+        if source is None:
+            with open(filepath, "r") as f:
+                source = f.read()
+        regions = task_regions_from_ast(ast.parse(source))
+    timings["parse"] = time.perf_counter() - start
+
+    cab_name = os.path.splitext(os.path.basename(filepath))[0]
+    param_order = []
+    param_defaults = {}
+    start = time.perf_counter()
+    parsed_doc_info = parse_param_docstring(regions["docstring"])
+    timings["docstring"] = time.perf_counter() - start
+    start = time.perf_counter()
+    schema_data = extract_schema_dict(regions["schema"]) if regions["schema"] is not None else {}
+    timings["schema"] = time.perf_counter() - start
+    has_outputs = regions["has_outputs"]
+
+    start = time.perf_counter()
+    if regions["args"] is not None:
+        args = regions["args"].args[1:]
+        defaults = regions["args"].defaults
+        default_offset = len(args) - len(defaults)
+
+        for i, arg in enumerate(args):
+            name = arg.arg
+            param_order.append(name)
+            parsed = parsed_doc_info.get(name, {})
+            if parsed and parsed.get("default", None) is not None:
+                param_defaults[name] = coerce_text_default(parsed["default"])
+            elif i >= default_offset:
+                node = defaults[i - default_offset]
+                try:
+                    param_defaults[name] = evaluate_default(node)
+                except (ValueError, TypeError):
+                    # Not a CASA constructor literal; keep the source text
+                    param_defaults[name] = ast.unparse(node)
+            else:
+                param_defaults[name] = None
+
     inputs = {}
     for param in param_order:
-        casa_dtype = schema_data.get(param, {}).get('type', 'unknown')
-        dtype = CASA_TO_PYTHON_TYPES.get(casa_dtype, casa_dtype)
+        dtype = resolve_schema_dtype(schema_data.get(param, {}))
         default = param_defaults.get(param)
-
         parsed = parsed_doc_info.get(param, {})
-        if default is None and parsed.get("default") not in [None, '']:
-            default = parsed["default"]
-
-        raw_default = param_defaults.get(param)
-
-        if isinstance(raw_default, str):
-            float_match = re.match(r"float\((-?\d+\.?\d*)\)", raw_default)
-            int_match = re.match(r"int\((-?\d+)\)", raw_default)
-            if float_match:
-                default = float(float_match.group(1))
-            elif int_match:
-                default = int(int_match.group(1))
-            else:
-                try:
-                    default = ast.literal_eval(raw_default)
-                except Exception:
-                    default = raw_default
-        else:
-            default = raw_default
 
         # Handle Union[<type>, List[<type>]] based on hints
         info_text = parsed.get("info", "").lower()
@@ -364,8 +936,9 @@ def extract_yaml(filepath):
 
     if has_outputs:
         cab_structure['cabs'][cab_name]['outputs'] = {}
+    timings["build"] = time.perf_counter() - start
 
-    return {'cab_name': cab_name, 'yaml': cab_structure}
+    return {'cab_name': cab_name, 'yaml': cab_structure, 'schema': schema_data, 'timings': timings}
 
 
 def validate_and_print_summary(inputs):
@@ -397,171 +970,3003 @@ def validate_and_print_summary(inputs):
     print(tabulate(rows, headers=headers, tablefmt="github"))
 
 
-def fetch_xml_parameter_info(task_name):
+def get_cache_dir():
     """
-    Fetches and parses CASA XML documentation for a specific task.
-
-    Extracts descriptions of each parameter from the remote XML documentation,
-    enabling validation and autofill for missing YAML fields.
+    Returns the directory used for on-disk caches, creating it if needed.
 
-    Args:
-        taskname (str): Name of the CASA task.
+    Defaults to `~/.cache/stimela-casa-cab`; `STIMELA_CASA_CACHE_DIR` overrides it.
 
     Returns:
-        dict: Mapping of parameter names to their description from the XML.
+        str: Path to the cache directory.
     """
-    base_url = "https://casadocs.readthedocs.io/en/v4.7-v6.1/tasks611/"
-    url = f"{base_url}{task_name}.xml.html"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-    except Exception as e:
-        print(f"⚠️ Could not fetch XML documentation: {e}")
-        return {}
+    cache_dir = os.environ.get(CACHE_DIR_ENV) or os.path.join(os.path.expanduser("~"), ".cache", "stimela-casa-cab")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
 
-    soup = BeautifulSoup(response.text, 'html.parser')
-    parameters = {}
-    table = soup.find('table')
-    if not table:
-        print("⚠️ Could not find parameter table in XML page.")
-        return parameters
 
-    rows = table.find_all('tr')[1:]  # Skip header
-    for row in rows:
-        cols = row.find_all('td')
-        if len(cols) >= 3:
-            name = cols[0].get_text(strip=True)
-            default = cols[1].get_text(strip=True)
-            description = cols[2].get_text(strip=True)
-            parameters[name] = {'default': default, 'description': description}
-    return parameters
+class FileLock:
+    """
+    Exclusive `fcntl.flock()` lock on a file, shared by processes and threads.
 
+    The lock file records its holder's host, pid and start time, and a background
+    thread touches it every `LOCK_HEARTBEAT_INTERVAL` seconds while it is held. A
+    waiter breaks the lock when the holder is a process on this host that no longer
+    exists (its lock can outlive it in forked children that inherited the
+    descriptor, or on network filesystems) or when the file has not been touched for
+    `stale_after` seconds. The lock file is removed on release; a waiter whose file
+    was removed or replaced meanwhile simply tries again. Without `fcntl` (non-POSIX
+    systems) locking is a no-op.
 
-def fuzzy_match(norm_local, norm_xml):
+    Args:
+        path (str): Lock file path.
+        stale_after (float): Seconds without a heartbeat after which a held lock is
+            considered abandoned; None never breaks the lock.
     """
-    Returns True if the local and XML default values are functionally equivalent.
 
-    Handles:
-    - constructor strings like int(10), float(0.1), str("value")
-    - numpy.array([...]) with int/float constructor wrapping
-    - empty vs non-empty bool lists
-    - CASA dict-like thresholds: {'value': float(...), 'unit': '...'}
-    """
+    _held = set()
+    _held_guard = threading.Lock()
+    _heartbeat = None
 
-    import re
+    def __init__(self, path, stale_after=LOCK_STALE_AFTER):
+        self.path = path
+        self.stale_after = stale_after
+        self.waited = False
+        self._fd = None
 
-    # Exact match
-    if norm_local == norm_xml:
-        return True
+    @classmethod
+    def _beat(cls):
+        while True:
+            time.sleep(LOCK_HEARTBEAT_INTERVAL)
+            with cls._held_guard:
+                for lock in cls._held:
+                    with contextlib.suppress(OSError):
+                        os.utime(lock._fd)
 
-    # Scalar vs constructor string
-    if isinstance(norm_local, (int, float, str)) and isinstance(norm_xml, str):
-        expected = f"{type(norm_local).__name__}({repr(norm_local)})"
-        alt_expected = f"{type(norm_local).__name__}({norm_local})"
-        return norm_xml in (expected, alt_expected)
+    @classmethod
+    def _forget_held(cls):
+        # A forked child does not hold its parent's locks and must not keep them alive
+        cls._held = set()
+        cls._held_guard = threading.Lock()
+        cls._heartbeat = None
 
-    # Bool list vs empty bool list
-    if isinstance(norm_local, list) and isinstance(norm_xml, list):
-        if all(isinstance(x, bool) for x in norm_local + norm_xml):
-            return norm_local == [] or norm_xml == []
+    def _hold(self, fd):
+        cls = type(self)
+        with cls._held_guard:
+            self._fd = fd
+            if self.stale_after is None:
+                return
+            cls._held.add(self)
+            if cls._heartbeat is None or not cls._heartbeat.is_alive():
+                cls._heartbeat = threading.Thread(target=cls._beat, name="file-lock-heartbeat", daemon=True)
+                cls._heartbeat.start()
 
-    # List vs numpy-style string
-    if isinstance(norm_local, list) and isinstance(norm_xml, str):
+    def _owner(self):
         try:
-            clean = re.sub(r"(numpy\.array\(|\))", "", norm_xml)
-            clean = re.sub(r"(int|float)\((.*?)\)", r"\2", clean)
-            xml_list = [int(x.strip()) if x.strip().isdigit() else float(x.strip()) for x in clean.split(",")]
-            return norm_local == xml_list
-        except:
-            return False
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
 
-    # Dict match: e.g. threshold = {'value': float(0.0), 'unit': 'mjy'}
-    if isinstance(norm_local, dict) and isinstance(norm_xml, str):
+    def _stale_inode(self):
+        """Returns the inode of the lock file if its holder is gone or too old, else None."""
+        if self.stale_after is None:
+            return None
         try:
-            # Match CASA-style threshold dicts
-            value_match = re.search(r"'?value'?:\s*float\((-?\d+\.?\d*)\)", norm_xml)
-            unit_match = re.search(r"'?unit'?:\s*'(\w+)'", norm_xml)
-            if value_match and unit_match:
-                parsed = {
-                    "value": float(value_match.group(1)),
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        if time.time() - stat.st_mtime > self.stale_after:
+            return stat.st_ino
+        owner = self._owner()
+        if owner.get("host") != socket.gethostname() or not owner.get("pid"):
+            return None
+        try:
+            os.kill(owner["pid"], 0)
+        except ProcessLookupError:
+            return stat.st_ino
+        except OSError:
+            pass
+        return None
+
+    def _break_stale(self):
+        """Removes the lock file if it is stale; waiters serialize on a guard lock so only one of them breaks it."""
+        with FileLock(self.path + ".break", stale_after=None):
+            inode = self._stale_inode()
+            if inode is None:
+                return
+            owner = self._owner()
+            with contextlib.suppress(FileNotFoundError):
+                if os.stat(self.path).st_ino == inode:
+                    os.unlink(self.path)
+                    print(f"⚠️ Broke stale lock {self.path} held by {owner or 'an unknown process'}")
+                    METRICS.inc("locks_broken_total")
+
+    def acquire(self, blocking=True, timeout=None):
+        """
+        Takes the lock.
+
+        Args:
+            blocking (bool): Wait for the holder to finish; otherwise give up at once.
+            timeout (float): Maximum seconds to wait, unbounded when None.
+
+        Returns:
+            bool: Whether the lock was taken. `waited` tells if another holder had it first.
+        """
+        if fcntl is None:
+            return True
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        start = time.perf_counter()
+        self.waited = False
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+            else:
+                try:
+                    same_file = os.fstat(fd).st_ino == os.stat(self.path).st_ino
+                except FileNotFoundError:
+                    same_file = False
+                if same_file:
+                    owner = json.dumps({"host": socket.gethostname(), "pid": os.getpid(), "acquired_at": time.time()})
+                    os.ftruncate(fd, 0)
+                    os.write(fd, owner.encode("utf-8"))
+                    self._hold(fd)
+                    if self.waited:
+                        METRICS.observe("lock_wait_seconds", time.perf_counter() - start)
+                    return True
+                os.close(fd)
+                continue
+
+            if self._stale_inode() is not None:
+                self._break_stale()
+                continue
+            if not blocking or (timeout is not None and time.perf_counter() - start >= timeout):
+                return False
+            self.waited = True
+            time.sleep(LOCK_POLL_INTERVAL)
+
+    def release(self):
+        cls = type(self)
+        with cls._held_guard:
+            fd, self._fd = self._fd, None
+            cls._held.discard(self)
+        if fd is None:
+            return
+        # Our file may have been broken as stale and replaced by another holder's; leave theirs alone
+        with contextlib.suppress(FileNotFoundError):
+            if os.stat(self.path).st_ino == os.fstat(fd).st_ino:
+                os.unlink(self.path)
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=FileLock._forget_held)
+
+
+def get_casa_version():
+    """Returns the selected CASA release: `STIMELA_CASA_VERSION`, else `DEFAULT_CASA_VERSION`."""
+    return os.environ.get(CASA_VERSION_ENV) or DEFAULT_CASA_VERSION
+
+
+def get_casa_release(version=None):
+    """
+    Returns the docs location of a CASA release.
+
+    Args:
+        version (str): Release such as "6.1"; defaults to `STIMELA_CASA_VERSION`,
+            then `DEFAULT_CASA_VERSION`.
+
+    Returns:
+        dict: The release's 'docs_url', 'tasks_path' and 'index_path'.
+
+    Raises:
+        ValueError: If the release is not in `CASA_RELEASES`.
+    """
+    version = version or get_casa_version()
+    if version not in CASA_RELEASES:
+        raise ValueError(f"Unknown CASA version {version}; known versions: {', '.join(sorted(CASA_RELEASES))}")
+    return CASA_RELEASES[version]
+
+
+def get_docs_url():
+    """
+    Returns the base URL of the CASA docs site, ending in a slash.
+
+    Defaults to the selected CASA release's docs; `STIMELA_CASA_DOCS_URL` overrides it.
+    """
+    url = os.environ.get(DOCS_URL_ENV) or get_casa_release()["docs_url"]
+    return url if url.endswith("/") else url + "/"
+
+
+def task_docs_url():
+    """Returns the URL under which the selected release's task pages live."""
+    return f"{get_docs_url()}{get_casa_release()['tasks_path']}"
+
+
+def doc_cache_dir():
+    """Returns the doc cache directory; docs of other sites or releases are kept apart from the default ones."""
+    url = task_docs_url()
+    if url == CASA_DOCS_URL + CASA_TASK_DOCS_PATH:
+        name = "docs"
+    else:
+        name = "docs-" + hashlib.sha256(url.encode("utf-8")).hexdigest()[:12]
+    doc_dir = os.path.join(get_cache_dir(), name)
+    os.makedirs(doc_dir, exist_ok=True)
+    return doc_dir
+
+
+def _doc_cache_path(task_name):
+    return os.path.join(doc_cache_dir(), f"{task_name}.json")
+
+
+def load_cached_docs(task_name):
+    """
+    Returns the on-disk doc cache entry for a task, or None.
+
+    Args:
+        task_name (str): Name of the CASA task.
+
+    Returns:
+        dict: Entry with 'parameters', 'etag', 'last_modified' and 'fetched_at'.
+    """
+    try:
+        with open(_doc_cache_path(task_name), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store_cached_docs(task_name, parameters, etag=None, last_modified=None):
+    """
+    Writes a task's parsed parameter docs to the on-disk doc cache.
+
+    Args:
+        task_name (str): Name of the CASA task.
+        parameters (dict): Output of `parse_xml_parameter_table()`.
+        etag (str): ETag of the page the parameters were parsed from.
+        last_modified (str): Last-Modified header of that page.
+    """
+    entry = {"parameters": parameters, "etag": etag, "last_modified": last_modified, "fetched_at": time.time()}
+    path = _doc_cache_path(task_name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def parse_xml_parameter_table(html):
+    """
+    Parses the parameter table of a CASA XML task documentation page.
+
+    Args:
+        html (str): Page content.
+
+    Returns:
+        dict: Mapping of parameter names to their 'default' and 'description', or
+        None when the page has no parameter table.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    parameters = {}
+    table = soup.find('table')
+    if not table:
+        return None
+
+    rows = table.find_all('tr')[1:]  # Skip header
+    for row in rows:
+        cols = row.find_all('td')
+        if len(cols) >= 3:
+            name = cols[0].get_text(strip=True)
+            default = cols[1].get_text(strip=True)
+            description = cols[2].get_text(strip=True)
+            parameters[name] = {'default': default, 'description': description}
+    return parameters
+
+
+def _local_tag(element):
+    return element.tag.rsplit("}", 1)[-1]
+
+
+def _casa_xml_value(value, value_type):
+    items = [child for child in value if _local_tag(child) == "value"]
+    if items or value_type.endswith("Array"):
+        item_type = value_type[:-len("Array")] if value_type.endswith("Array") else value_type
+        return "[" + ", ".join(_casa_xml_value(item, item.get("type", item_type)) for item in items) + "]"
+    text = (value.text or "").strip()
+    if value_type == "string":
+        return repr(text)
+    if value_type == "bool":
+        return "True" if text.lower() == "true" else "False"
+    return text
+
+
+def parse_casa_task_xml(text):
+    """
+    Parses the input parameters of a CASA task XML file, the source xml-casa generates the wrappers from.
+
+    Args:
+        text (str): Content of `<task>.xml`.
+
+    Returns:
+        dict: Mapping of parameter names to their 'default' and 'description', laid
+        out like `parse_xml_parameter_table()`, or None when the file describes no task.
+
+    Raises:
+        xml.etree.ElementTree.ParseError: If the file is not well-formed XML.
+    """
+    root = ElementTree.fromstring(text)
+    task = root if _local_tag(root) == "task" else next((el for el in root if _local_tag(el) == "task"), None)
+    if task is None:
+        return None
+
+    parameters = {}
+    for section in task:
+        if _local_tag(section) != "input":
+            continue
+        for param in section:
+            if _local_tag(param) != "param":
+                continue
+            children = {_local_tag(child): child for child in param}
+            description = children.get("shortdescription", children.get("description"))
+            value = children.get("value")
+            param_type = param.get("type", "string")
+            parameters[param.get("name")] = {
+                "default": _casa_xml_value(value, value.get("type", param_type)) if value is not None else "''",
+                "description": " ".join((description.text or "").split()) if description is not None else "",
+            }
+    return parameters
+
+
+def http_get(url, headers=None):
+    """
+    GET with a timeout, retrying connection errors, 429 and 5xx responses.
+
+    Args:
+        url (str): URL to fetch.
+        headers (dict): Extra request headers.
+
+    Returns:
+        requests.Response: The final response; 4xx responses are returned as is.
+
+    Raises:
+        requests.RequestException: When the last attempt still fails.
+    """
+    for attempt in range(HTTP_RETRIES + 1):
+        start = time.perf_counter()
+        try:
+            response = requests.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+            METRICS.observe("http_request_seconds", time.perf_counter() - start)
+            METRICS.inc("http_requests_total", code=response.status_code)
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            METRICS.inc("http_errors_total")
+            if attempt == HTTP_RETRIES:
+                response.raise_for_status()
+        except (requests.ConnectionError, requests.Timeout):
+            METRICS.observe("http_request_seconds", time.perf_counter() - start)
+            METRICS.inc("http_errors_total")
+            if attempt == HTTP_RETRIES:
+                raise
+        time.sleep(HTTP_BACKOFF * 2 ** attempt)
+
+
+def get_doc_max_age():
+    """Returns the seconds a cached doc page is served without revalidation (`STIMELA_CASA_DOC_MAX_AGE`)."""
+    return float(os.environ.get(DOC_MAX_AGE_ENV, DOC_CACHE_MAX_AGE))
+
+
+def refresh_docs(task_name, max_age=DOC_CACHE_MAX_AGE):
+    """
+    Brings a task's entry in the on-disk doc cache up to date.
+
+    Entries younger than `max_age` seconds are used without any network access;
+    older ones are revalidated with a conditional request.
+
+    Args:
+        task_name (str): Name of the CASA task.
+        max_age (float): Maximum age of a cache entry served without revalidation.
+
+    Only one process (or thread) at a time fetches a given task: the others wait
+    on the entry's lock and then read what it stored.
+
+    Returns:
+        tuple: `(parameters, status)` where status is one of 'fresh',
+        'not-modified', 'downloaded', 'shared' (fetched meanwhile by another
+        process), 'stale' (offline, cached copy used) or 'failed' (parameters is None).
+    """
+    cached = load_cached_docs(task_name)
+    if cached and time.time() - cached.get("fetched_at", 0) < max_age:
+        METRICS.inc("doc_cache_total", layer="disk", result="hit")
+        return cached["parameters"], "fresh"
+
+    wait_started = time.time()
+    with FileLock(_doc_cache_path(task_name) + ".lock") as lock:
+        if lock.waited:
+            shared = load_cached_docs(task_name)
+            if shared and shared.get("fetched_at", 0) >= wait_started:
+                METRICS.inc("doc_cache_total", layer="disk", result="shared")
+                return shared["parameters"], "shared"
+            cached = shared or cached
+        return _download_docs(task_name, cached)
+
+
+def _download_docs(task_name, cached):
+    url = f"{task_docs_url()}{task_name}.xml.html"
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+        response = http_get(url, headers)
+        if response.status_code == 304 and cached:
+            store_cached_docs(task_name, cached["parameters"], cached.get("etag"), cached.get("last_modified"))
+            METRICS.inc("doc_cache_total", layer="disk", result="revalidated")
+            return cached["parameters"], "not-modified"
+        response.raise_for_status()
+    except Exception as e:
+        if cached:
+            print(f"⚠️ Could not fetch XML documentation, using cached copy: {e}")
+            METRICS.inc("doc_cache_total", layer="disk", result="stale")
+            return cached["parameters"], "stale"
+        print(f"⚠️ Could not fetch XML documentation: {e}")
+        METRICS.inc("doc_cache_total", layer="disk", result="failed")
+        return None, "failed"
+
+    METRICS.inc("doc_cache_total", layer="disk", result="miss")
+    parameters = parse_xml_parameter_table(response.text)
+    if parameters is None:
+        print("⚠️ Could not find parameter table in XML page.")
+        return None, "failed"
+    store_cached_docs(task_name, parameters, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    return parameters, "downloaded"
+
+
+def fetch_xml_parameter_info(task_name, max_age=DOC_CACHE_MAX_AGE):
+    """
+    Fetches and parses CASA XML documentation for a specific task.
+
+    Extracts descriptions of each parameter from the remote XML documentation,
+    enabling validation and autofill for missing YAML fields. Parsed pages are
+    kept in the on-disk doc cache (see `refresh_docs()`), so recently fetched or
+    prefetched pages are served without touching the network, and the cached
+    copy is used when the site cannot be reached.
+
+    Args:
+        task_name (str): Name of the CASA task.
+        max_age (float): Maximum age of a cache entry served without revalidation.
+
+    Returns:
+        dict: Mapping of parameter names to their description from the XML.
+    """
+    parameters, _ = refresh_docs(task_name, max_age)
+    return parameters or {}
+
+
+def list_indexed_tasks():
+    """
+    Reads the CASA XML index page and returns every task it links to.
+
+    Returns:
+        list of str: Sorted task names.
+    """
+    release = get_casa_release()
+    response = http_get(f"{get_docs_url()}{release['index_path']}")
+    response.raise_for_status()
+    soup = BeautifulSoup(response.text, 'html.parser')
+    pattern = re.compile(re.escape(release["tasks_path"]) + r"([A-Za-z0-9_]+)\.xml\.html")
+    tasks = set()
+    for link in soup.find_all('a', href=True):
+        match = pattern.search(link['href'])
+        if match:
+            tasks.add(match.group(1))
+    return sorted(tasks)
+
+
+def prefetch_docs(concurrency=DEFAULT_PREFETCH_CONCURRENCY):
+    """
+    Downloads and parses every task page listed in the CASA XML index.
+
+    Pages are fetched with at most `concurrency` requests in flight and stored
+    in the on-disk doc cache; unchanged pages are revalidated, not re-downloaded.
+
+    Args:
+        concurrency (int): Maximum number of simultaneous requests.
+
+    Returns:
+        dict: Task names grouped under 'added', 'changed', 'unchanged',
+        'removed' and 'failed' relative to the previous crawl.
+
+    Raises:
+        ValueError: If the index page lists no tasks; the previous crawl is kept.
+    """
+    tasks = list_indexed_tasks()
+    if not tasks:
+        raise ValueError(f"No task pages found in the CASA XML index at {get_docs_url()}{get_casa_release()['index_path']}")
+    before = {}
+    for task_name in tasks:
+        cached = load_cached_docs(task_name)
+        if cached:
+            before[task_name] = param_spec_hash(cached["parameters"])
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        refreshed = dict(zip(tasks, executor.map(lambda task_name: refresh_docs(task_name, max_age=0), tasks)))
+
+    changes = {"added": [], "changed": [], "unchanged": [], "removed": [], "failed": []}
+    for task_name, (parameters, status) in refreshed.items():
+        if status in ("failed", "stale"):
+            changes["failed"].append(task_name)
+        elif task_name not in before:
+            changes["added"].append(task_name)
+        elif before[task_name] != param_spec_hash(parameters):
+            changes["changed"].append(task_name)
+        else:
+            changes["unchanged"].append(task_name)
+
+    index_path = os.path.join(doc_cache_dir(), CRAWL_INDEX_FILE)
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            previous_tasks = json.load(f)["tasks"]
+    except (OSError, ValueError, KeyError):
+        previous_tasks = []
+    changes["removed"] = sorted(set(previous_tasks) - set(tasks))
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump({"tasks": tasks, "crawled_at": time.time()}, f)
+    return changes
+
+
+def build_doc_archive(out_file, tasks=None):
+    """
+    Packs parsed task docs into one offline archive file for the doc-source chain.
+
+    The archive records the task-docs URL it was built from and is only served
+    for that site and CASA release (see `ArchiveDocSource`).
+
+    Args:
+        out_file (str): Archive file to write, replaced atomically.
+        tasks (list of str): Tasks to include, fetched through the on-disk doc
+            cache; by default every task already in the doc cache, e.g. after `--prefetch`.
+
+    Returns:
+        list of str: Names of the archived tasks.
+    """
+    if tasks is None:
+        tasks = sorted(os.path.splitext(name)[0] for name in os.listdir(doc_cache_dir())
+                       if name.endswith(".json") and name != CRAWL_INDEX_FILE)
+    archived = {}
+    for task_name in tasks:
+        parameters = fetch_xml_parameter_info(task_name)
+        if parameters:
+            archived[task_name] = parameters
+
+    archive = {"schema_version": DOC_ARCHIVE_SCHEMA_VERSION, "docs_url": task_docs_url(), "built_at": time.time(),
+               "tasks": archived}
+    tmp_path = f"{out_file}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(archive, f, ensure_ascii=False)
+    os.replace(tmp_path, out_file)
+    return sorted(archived)
+
+
+def fuzzy_match(norm_local, norm_xml):
+    """
+    Returns True if the local and XML default values are functionally equivalent.
+
+    Handles:
+    - constructor strings like int(10), float(0.1), str("value")
+    - numpy.array([...]) with int/float constructor wrapping
+    - empty vs non-empty bool lists
+    - CASA dict-like thresholds: {'value': float(...), 'unit': '...'}
+    """
+
+    import re
+
+    # Exact match
+    if norm_local == norm_xml:
+        return True
+
+    # Scalar vs constructor string
+    if isinstance(norm_local, (int, float, str)) and isinstance(norm_xml, str):
+        expected = f"{type(norm_local).__name__}({repr(norm_local)})"
+        alt_expected = f"{type(norm_local).__name__}({norm_local})"
+        return norm_xml in (expected, alt_expected)
+
+    # Bool list vs empty bool list
+    if isinstance(norm_local, list) and isinstance(norm_xml, list):
+        if all(isinstance(x, bool) for x in norm_local + norm_xml):
+            return norm_local == [] or norm_xml == []
+
+    # List vs numpy-style string
+    if isinstance(norm_local, list) and isinstance(norm_xml, str):
+        try:
+            clean = re.sub(r"(int|float)\(([^()]*)\)", r"\2", norm_xml)
+            clean = re.sub(r"(numpy\.array\(|[\[\])])", "", clean)
+            items = [x.strip() for x in clean.split(",") if x.strip()]
+            xml_list = [int(x) if x.isdigit() else float(x) for x in items]
+            return norm_local == xml_list
+        except:
+            return False
+
+    # Dict match: e.g. threshold = {'value': float(0.0), 'unit': 'mjy'}
+    if isinstance(norm_local, dict) and isinstance(norm_xml, str):
+        try:
+            # Match CASA-style threshold dicts
+            value_match = re.search(r"'?value'?:\s*float\((-?\d+(?:\.\d*)?)\)", norm_xml)
+            unit_match = re.search(r"'?unit'?:\s*'(\w+)'", norm_xml)
+            if value_match and unit_match:
+                parsed = {
+                    "value": float(value_match.group(1)),
                     "unit": unit_match.group(1)
                 }
                 return norm_local == parsed
         except:
             return False
 
-    return False
+    return False
+
+
+VALIDATION_HEADERS = ["Parameter", "Status", "Default Match", "Description Match", "YAML Info", "XML Info"]
+
+
+def normalize_default(val):
+    """
+    Normalizes a YAML or XML default value into a comparable Python object.
+
+    Args:
+        val (Any): Default value from the YAML inputs or the XML table.
+
+    Returns:
+        Any: Literal-evaluated value, or the lower-cased string if it is not a literal.
+    """
+    if isinstance(val, str):
+        val = val.strip()
+        if val == "numpy.array([])":
+            return []
+        if val == "(boolArray=[True])":
+            return [True]
+        try:
+            return ast.literal_eval(val)
+        except Exception:
+            return val.lower()
+    return val
+
+
+def compare_param_with_xml(param, local, xml):
+    """
+    Compares one YAML input with its CASA XML entry.
+
+    Args:
+        param (str): Parameter name.
+        local (dict): The parameter's generated spec.
+        xml (dict): The parameter's XML entry, or None if it is not documented.
+
+    Returns:
+        list: Row matching `VALIDATION_HEADERS`.
+    """
+    if not xml:
+        return [param, "❌ Not found in XML", "", "", "", ""]
+
+    norm_local = normalize_default(local.get("default"))
+    norm_xml = normalize_default(xml["default"])
+    print(f"DEBUG: {param} - YAML: {repr(norm_local)} ({type(norm_local)}) vs XML: {repr(norm_xml)} ({type(norm_xml)})")
+    if fuzzy_match(norm_local, norm_xml):
+        default_match = "✓"
+    else:
+        default_match = "✗"
+
+    local_info = local.get("info", "").strip()
+    xml_desc = xml["description"].strip()
+    description_match = "✓" if xml_desc[:50].lower() in local_info.lower() else "✗"
+
+    status = "✅" if default_match == "✓" and description_match == "✓" else "⚠️"
+
+    return [param, status, default_match, description_match, f"YAML: {local_info[:50]}...", f"XML: {xml_desc[:50]}..."]
+
+
+def compare_with_xml(inputs, xml_params):
+    """
+    Compares YAML inputs with parsed CASA XML parameters, one row per parameter.
+
+    Args:
+        inputs (dict): Dictionary of parameters from the generated YAML schema.
+        xml_params (dict): Output of `lookup_docs()` for the task.
+
+    Returns:
+        list of list: Rows matching `VALIDATION_HEADERS`.
+    """
+    return [compare_param_with_xml(param, local, xml_params.get(param)) for param, local in inputs.items()]
+
+
+class ValidationState:
+    """
+    SQLite store of the last validation result per (task, parameter).
+
+    Each result is keyed on a hash of the parameter's generated spec and a hash
+    of its XML doc entry; a stored row is reused only while both are unchanged.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_cache_dir(), VALIDATION_STATE_FILE)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS validation ("
+            " task TEXT NOT NULL, param TEXT NOT NULL, spec_hash TEXT NOT NULL, doc_hash TEXT NOT NULL,"
+            " row TEXT NOT NULL, validated_at REAL NOT NULL, PRIMARY KEY (task, param))"
+        )
+
+    def lookup(self, task_name, param, spec_hash, doc_hash):
+        """Returns the stored row if it was validated against the same spec and doc entry, else None."""
+        found = self.conn.execute(
+            "SELECT row FROM validation WHERE task = ? AND param = ? AND spec_hash = ? AND doc_hash = ?",
+            (task_name, param, spec_hash, doc_hash),
+        ).fetchone()
+        return json.loads(found[0]) if found else None
+
+    def store(self, task_name, param, spec_hash, doc_hash, row):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO validation VALUES (?, ?, ?, ?, ?, ?)",
+            (task_name, param, spec_hash, doc_hash, json.dumps(row, ensure_ascii=False), time.time()),
+        )
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def compare_with_xml_incremental(task_name, inputs, xml_params, state):
+    """
+    Like `compare_with_xml()`, but reuses stored results for unchanged parameters.
+
+    Args:
+        task_name (str): Name of the cab/task being validated.
+        inputs (dict): Dictionary of parameters from the generated YAML schema.
+        xml_params (dict): Output of `lookup_docs()` for the task.
+        state (ValidationState): Store of previous results, updated in place.
+
+    Returns:
+        list of list: Rows matching `VALIDATION_HEADERS` plus a trailing
+        'cached' or 'fresh' column.
+    """
+    rows = []
+    for param, local in inputs.items():
+        xml = xml_params.get(param)
+        spec_hash = param_spec_hash(local)
+        doc_hash = param_spec_hash(xml or {})
+        row = state.lookup(task_name, param, spec_hash, doc_hash)
+        if row is not None:
+            rows.append(row + ["cached"])
+            continue
+        row = compare_param_with_xml(param, local, xml)
+        state.store(task_name, param, spec_hash, doc_hash, row)
+        rows.append(row + ["fresh"])
+    state.conn.commit()
+    return rows
+
+
+def validate_against_xml(task_name, inputs, state=None, xml_params=None):
+    """
+    Validates a YAML schema against the CASA XML documentation for the same task.
+
+    Checks consistency between default values and descriptions, prints the
+    comparison table and writes it to `<task>_online_validation_report.md`.
+
+    Args:
+        task_name (str): Name of the cab/task being validated.
+        inputs (dict): Dictionary of parameters from the generated YAML schema.
+        state (ValidationState): When given, only parameters whose spec or doc
+            entry changed since the last run are compared again.
+        xml_params (dict): Already fetched docs for the task; fetched when None.
+
+    Returns:
+        None: Prints summary and mismatch results to stdout.
+    """
+    if xml_params is None:
+        xml_params = lookup_docs(task_name)
+    print("\n=== Online XML-CASA Validation Report ===")
+    headers = VALIDATION_HEADERS
+    if state is not None:
+        rows = compare_with_xml_incremental(task_name, inputs, xml_params, state)
+        headers = VALIDATION_HEADERS + ["Result"]
+        cached = sum(1 for row in rows if row[-1] == "cached")
+        print(f"♻️ {cached} cached, {len(rows) - cached} freshly validated parameter(s)")
+    else:
+        rows = compare_with_xml(inputs, xml_params)
+
+    if not rows:
+        print("⚠️ No matching parameters found.")
+        return
+
+    table = tabulate(rows, headers=headers, tablefmt="github")
+    print(table)
+
+    report_path = f"{task_name}_online_validation_report.md"
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write("# Online XML-CASA Validation Report\n\n")
+        f.write(table)
+        f.write("\n")
+
+    print(f"📄 Report written to: {report_path}")
+
+
+def fill_missing_descriptions(yaml_inputs, xml_data):
+    """
+    Fills blank `info` fields of YAML inputs from parsed CASA XML descriptions.
+
+    Args:
+        yaml_inputs (dict): Cab inputs to update in place.
+        xml_data (dict): Output of `lookup_docs()` for the task.
+
+    Returns:
+        list of str: Names of the parameters whose `info` was filled.
+    """
+    filled = []
+    for param, data in yaml_inputs.items():
+        if not data.get("info"):
+            xml_info = xml_data.get(param, {}).get("description")
+            if xml_info:
+                data["info"] = QuotedString(xml_info)
+                print(f"📘 Filled missing info for '{param}' using XML.")
+                filled.append(param)
+    return filled
+
+
+# `info:` lines whose value may be empty (`""`, `''`, `~`, `null` or nothing), in block-style YAML; whether it is, e.g.
+# a bare `info:` continued by a multi-line scalar on the following lines, is decided from the parsed file
+EMPTY_INFO_RE = re.compile(
+    r"""^(?P<indent>[ \t]+)info:(?P<value>[ \t]*(?:""|''|~|null|Null|NULL)?)[ \t]*(?:#.*)?$""", re.MULTILINE
+)
+# A block mapping key with no inline value, e.g. `  applycal:`
+BLOCK_KEY_RE = re.compile(r"""^(?P<indent>[ \t]*)(?P<key>[^\s#'"{\[][^:#]*?):[ \t]*(?:#.*)?$""")
+
+
+def _enclosing_keys(text, pos, indent):
+    """
+    Returns the block mapping keys enclosing the line at `pos`, outermost first.
+
+    Walks backwards line by line, so the cost is proportional to the distance to
+    the enclosing keys rather than to the size of the file.
+    """
+    keys = []
+    end = pos
+    while indent > 0 and end > 0:
+        start = text.rfind("\n", 0, end - 1) + 1
+        line = text[start:end - 1] if text[end - 1] == "\n" else text[start:end]
+        end = start
+        stripped = line.lstrip(" \t")
+        if not stripped or stripped.startswith("#"):
+            continue
+        line_indent = len(line) - len(stripped)
+        if line_indent >= indent:
+            continue
+        match = BLOCK_KEY_RE.match(line)
+        if not match:
+            return None
+        keys.append(match.group("key"))
+        indent = line_indent
+    return keys[::-1]
+
+
+def patch_descriptions(yaml_path, docs_lookup=None, out_path=None):
+    """
+    Fills empty `info` fields of an existing cab YAML file in place.
+
+    Only the empty values are replaced; every other byte of the file, including
+    comments, ordering and formatting, is left untouched.
+
+    Args:
+        yaml_path (str): Cab YAML file to patch.
+        docs_lookup (callable): Maps a task name to its parsed XML docs,
+            `lookup_docs()` by default.
+        out_path (str): Where to write the result, `yaml_path` by default.
+
+    Returns:
+        list of tuple: `(cab_name, parameter)` pairs that were filled.
+    """
+    docs_lookup = docs_lookup or lookup_docs
+    with open(yaml_path, encoding="utf-8") as f:
+        text = f.read()
+
+    parsed = yaml.safe_load(text) or {}
+    docs = {}
+    edits = []
+    for match in EMPTY_INFO_RE.finditer(text):
+        keys = _enclosing_keys(text, match.start(), len(match.group("indent").expandtabs()))
+        if not keys or len(keys) != 4 or keys[0] != "cabs" or keys[2] != "inputs":
+            continue
+        cab_name, param = keys[1], keys[3]
+        spec = ((parsed.get("cabs") or {}).get(cab_name) or {}).get("inputs", {}).get(param)
+        if not isinstance(spec, dict) or spec.get("info") not in (None, ""):
+            continue
+        if cab_name not in docs:
+            docs[cab_name] = docs_lookup(cab_name) or {}
+        description = docs[cab_name].get(param, {}).get("description")
+        if description:
+            edits.append((match.start("value"), match.end("value"), " " + json.dumps(description, ensure_ascii=False),
+                          cab_name, param))
+
+    parts = []
+    last = 0
+    for start, end, replacement, _, _ in edits:
+        parts.append(text[last:start])
+        parts.append(replacement)
+        last = end
+    parts.append(text[last:])
+
+    if edits or out_path:
+        out_path = out_path or yaml_path
+        tmp_path = f"{out_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("".join(parts))
+        os.replace(tmp_path, out_path)
+    return [(cab_name, param) for _, _, _, cab_name, param in edits]
+
+
+def dump_yaml(data):
+    """
+    Serializes a cab structure to YAML text using the project's CleanDumper.
+
+    Args:
+        data (dict): Structure to serialize.
+
+    Returns:
+        str: YAML document text.
+    """
+    return yaml.dump(data, sort_keys=False, Dumper=CleanDumper, allow_unicode=True)
+
+
+def write_yaml(data, out_file):
+    """
+    Writes a cab structure to a YAML file.
+
+    Args:
+        data (dict): Structure to serialize.
+        out_file (str): Destination path.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    with METRICS.timer("stage_seconds", stage="write"):
+        text = dump_yaml(data).encode("utf-8")
+        with open(out_file, "wb") as f:
+            f.write(text)
+    METRICS.inc("bytes_written_total", len(text))
+    return len(text)
+
+
+def sidecar_path(yaml_path):
+    """Returns the fast-load sidecar path belonging to a YAML file."""
+    return os.path.splitext(yaml_path)[0] + SIDECAR_SUFFIX
+
+
+def _file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def write_sidecar(yaml_path):
+    """
+    Writes a JSON fast-load sidecar next to a generated YAML file.
+
+    The sidecar holds the already-parsed YAML document together with a schema
+    version and the SHA-256 of the YAML bytes it was produced from, so
+    `load_cab()` can tell whether it is still fresh.
+
+    Args:
+        yaml_path (str): Path to the YAML file.
+
+    Returns:
+        str: Path of the sidecar written.
+    """
+    with open(yaml_path, "rb") as f:
+        raw = f.read()
+    sidecar = {
+        "schema_version": SIDECAR_SCHEMA_VERSION,
+        "source_hash": hashlib.sha256(raw).hexdigest(),
+        "cab": yaml.safe_load(raw),
+    }
+    out_file = sidecar_path(yaml_path)
+    payload = json.dumps(sidecar, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    with open(out_file, "wb") as f:
+        f.write(payload)
+    METRICS.inc("bytes_written_total", len(payload))
+    return out_file
+
+
+def load_cab(yaml_path):
+    """
+    Loads a generated cab, preferring its fast-load sidecar when it is fresh.
+
+    The sidecar is used only if its schema version matches and its source hash
+    equals the hash of the current YAML file; otherwise the YAML is parsed.
+
+    Args:
+        yaml_path (str): Path to the YAML file.
+
+    Returns:
+        dict: The parsed YAML document.
+    """
+    try:
+        with open(sidecar_path(yaml_path), encoding="utf-8") as f:
+            sidecar = json.load(f)
+        if (sidecar.get("schema_version") == SIDECAR_SCHEMA_VERSION
+                and sidecar.get("source_hash") == _file_sha256(yaml_path)):
+            return sidecar["cab"]
+    except (OSError, ValueError):
+        pass
+
+    with open(yaml_path, encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def write_bundle(results, out_file):
+    """
+    Packs many cabs into one bundle file with a byte-offset index.
+
+    Each cab is serialized on its own as compact JSON. The header maps every
+    cab name to the `[offset, length, sha256]` of its blob, offsets counted
+    from the end of the header, so `CabBundle` can decode a single cab without
+    touching the others.
+
+    Args:
+        results (list of dict): Outputs of `extract_yaml()`.
+        out_file (str): Path of the bundle to write.
+
+    Returns:
+        str: Path of the bundle written.
+    """
+    blobs = []
+    index = {}
+    offset = 0
+    for result in sorted(results, key=lambda result: result["cab_name"]):
+        cab_name = result["cab_name"]
+        blob = json.dumps(result["yaml"]["cabs"][cab_name], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        index[cab_name] = [offset, len(blob), hashlib.sha256(blob).hexdigest()]
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = json.dumps({"schema_version": BUNDLE_SCHEMA_VERSION, "cabs": index}, separators=(",", ":")).encode("utf-8")
+    tmp_file = out_file + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(BUNDLE_MAGIC + len(header).to_bytes(8, "little") + header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_file, out_file)
+    METRICS.inc("bytes_written_total", len(BUNDLE_MAGIC) + 8 + len(header) + offset)
+    return out_file
+
+
+class CabBundle:
+    """
+    Lazy reader for a bundle written by `write_bundle()`.
+
+    The file is memory-mapped and only the header index is parsed on open;
+    each cab is decoded, and its hash checked, when it is first requested.
+
+    Args:
+        path (str): Path to the bundle.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        prefix = len(BUNDLE_MAGIC) + 8
+        if self._map[:len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a cab bundle")
+        header_length = int.from_bytes(self._map[len(BUNDLE_MAGIC):prefix], "little")
+        header = json.loads(self._map[prefix:prefix + header_length])
+        if header.get("schema_version") != BUNDLE_SCHEMA_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} has unsupported bundle version {header.get('schema_version')}")
+        self._index = header["cabs"]
+        self._data_start = prefix + header_length
+
+    def names(self):
+        """Returns the names of all cabs in the bundle, sorted."""
+        return sorted(self._index)
+
+    def __contains__(self, cab_name):
+        return cab_name in self._index
+
+    def load(self, cab_name):
+        """
+        Decodes one cab from the bundle.
+
+        Args:
+            cab_name (str): Name of the cab.
+
+        Returns:
+            dict: The cab, as it appears under `cabs:` in its YAML.
+
+        Raises:
+            KeyError: If the bundle has no such cab.
+            ValueError: If the cab's bytes do not match the indexed hash.
+        """
+        offset, length, digest = self._index[cab_name]
+        blob = self._map[self._data_start + offset:self._data_start + offset + length]
+        if hashlib.sha256(blob).hexdigest() != digest:
+            raise ValueError(f"Cab {cab_name} in {self.path} is corrupt")
+        return json.loads(blob)
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def collect_task_files(paths):
+    """
+    Expands a list of files and directories into CASA task wrapper paths.
+
+    Directories contribute every `.py` file they contain, in sorted order.
+
+    Args:
+        paths (list of str): Files and/or directories given on the command line.
+
+    Returns:
+        list of str: Paths to the task wrapper files.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".py")
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def param_spec_hash(spec):
+    """
+    Returns a content hash of a generated parameter spec.
+
+    The hash is computed over a canonical JSON encoding, so two specs with the
+    same dtype, default, required flag and info always hash identically.
+
+    Args:
+        spec (dict): A single entry of a cab's `inputs` section.
+
+    Returns:
+        str: Hex digest identifying the spec's content.
+    """
+    canonical = json.dumps(spec, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def build_shared_fragments(results):
+    """
+    Detects parameter specs that are repeated verbatim across a batch of cabs.
+
+    Every parameter spec is content-hashed; a spec becomes a shared fragment when
+    the same hash appears in at least two cabs.
+
+    Args:
+        results (list of dict): Outputs of `extract_yaml()` for the batch.
+
+    Returns:
+        tuple: `(fragments, refs)` where `fragments` maps fragment ids to specs and
+        `refs` maps cab name → {parameter name: fragment id}.
+    """
+    occurrences = {}
+    for result in results:
+        cab_name = result["cab_name"]
+        for param, spec in result["yaml"]["cabs"][cab_name]["inputs"].items():
+            digest = param_spec_hash(spec)
+            occurrences.setdefault(digest, []).append((cab_name, param, spec))
+
+    fragments = {}
+    refs = {}
+    for digest, users in occurrences.items():
+        if len({cab_name for cab_name, _, _ in users}) < 2:
+            continue
+        first_param, spec = users[0][1], users[0][2]
+        frag_id = f"{first_param}_{digest[:8]}"
+        fragments[frag_id] = spec
+        for cab_name, param, _ in users:
+            refs.setdefault(cab_name, {})[param] = frag_id
+    return fragments, refs
+
+
+def write_shared_fragments(results, out_dir="."):
+    """
+    Writes a batch of cabs with repeated parameter specs moved to a fragment file.
+
+    Shared specs are emitted once into `SHARED_FRAGMENTS_FILE`; each cab file
+    includes it and references its entries through Stimela's `_use` directive.
+    When no spec is shared, no fragment file is written and the cabs are plain.
+
+    Args:
+        results (list of dict): Outputs of `extract_yaml()` for the batch.
+        out_dir (str): Directory the files are written to.
+
+    Returns:
+        list of str: Paths of all files written, fragment file (if any) first.
+    """
+    fragments, refs = build_shared_fragments(results)
+    written = []
+    if fragments:
+        section = {}
+        node = section
+        for key in SHARED_FRAGMENTS_SECTION.split("."):
+            node[key] = {}
+            node = node[key]
+        node.update(fragments)
+
+        fragments_path = os.path.join(out_dir, SHARED_FRAGMENTS_FILE)
+        write_yaml(section, fragments_path)
+        written.append(fragments_path)
+
+    for result in results:
+        cab_name = result["cab_name"]
+        cab = result["yaml"]["cabs"][cab_name]
+        cab_refs = refs.get(cab_name, {})
+        inputs = {
+            param: {"_use": f"{SHARED_FRAGMENTS_SECTION}.{cab_refs[param]}"} if param in cab_refs else spec
+            for param, spec in cab["inputs"].items()
+        }
+        document = {"_include": [SHARED_FRAGMENTS_FILE]} if cab_refs else {}
+        document["cabs"] = {cab_name: dict(cab, inputs=inputs)}
+        out_file = os.path.join(out_dir, f"{cab_name}.yaml")
+        write_yaml(document, out_file)
+        written.append(out_file)
+    return written
+
+
+def write_shared_anchors(results, out_dir="."):
+    """
+    Writes a batch of cabs into a single combined file using YAML anchors.
+
+    Identical parameter specs are replaced by one shared object, which PyYAML
+    serializes once as an anchor and references everywhere else as an alias.
+
+    Args:
+        results (list of dict): Outputs of `extract_yaml()` for the batch.
+        out_dir (str): Directory the file is written to.
+
+    Returns:
+        list of str: Path of the combined file.
+    """
+    fragments, refs = build_shared_fragments(results)
+    cabs = {}
+    for result in results:
+        cab_name = result["cab_name"]
+        cab = result["yaml"]["cabs"][cab_name]
+        cab_refs = refs.get(cab_name, {})
+        inputs = {
+            param: fragments[cab_refs[param]] if param in cab_refs else spec
+            for param, spec in cab["inputs"].items()
+        }
+        cabs[cab_name] = dict(cab, inputs=inputs)
+
+    out_file = os.path.join(out_dir, SHARED_ANCHORS_FILE)
+    write_yaml({"cabs": cabs}, out_file)
+    return [out_file]
+
+
+def _load_time(texts, repeat=3):
+    """Best-of-`repeat` wall time to `yaml.safe_load` every text in `texts`."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            yaml.safe_load(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def report_shared_savings(results, written):
+    """
+    Prints the byte and load-time savings of a shared-fragment run.
+
+    The baseline is one fully expanded `<cab>.yaml` per task, as written by the
+    default mode; it is serialized in memory only for the comparison.
+
+    Args:
+        results (list of dict): Outputs of `extract_yaml()` for the batch.
+        written (list of str): Files produced by the shared mode.
+
+    Returns:
+        None: Results are printed to stdout in tabular form.
+    """
+    fragments, _ = build_shared_fragments(results)
+    print(f"\n=== Shared Parameter Fragments: {len(fragments)} shared specs across {len(results)} cabs ===")
+    if not fragments:
+        print("No parameter spec is shared between cabs; nothing to compare.")
+        return
+
+    baseline = [dump_yaml(result["yaml"]) for result in results]
+    shared = []
+    for path in written:
+        with open(path, encoding="utf-8") as f:
+            shared.append(f.read())
+
+    baseline_bytes = sum(len(text.encode("utf-8")) for text in baseline)
+    shared_bytes = sum(len(text.encode("utf-8")) for text in shared)
+    baseline_load = _load_time(baseline)
+    shared_load = _load_time(shared)
+
+    def saving(before, after):
+        return f"{100.0 * (before - after) / before:.1f}%" if before else "n/a"
+
+    rows = [
+        ["files", len(baseline), len(shared), ""],
+        ["bytes", baseline_bytes, shared_bytes, saving(baseline_bytes, shared_bytes)],
+        ["load time (ms)", f"{baseline_load * 1000:.2f}", f"{shared_load * 1000:.2f}", saving(baseline_load, shared_load)],
+    ]
+    print(tabulate(rows, headers=["", "per-cab", "shared", "saving"], tablefmt="github"))
+
+
+def worker_context():
+    """
+    Returns the multiprocessing context for batch worker pools.
+
+    Uses `WORKER_START_METHOD` where the platform supports it, with the fork
+    server preloading `WORKER_PRELOAD`; otherwise the platform default.
+    """
+    if WORKER_START_METHOD not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()
+    context = multiprocessing.get_context(WORKER_START_METHOD)
+    if WORKER_START_METHOD == "forkserver":
+        context.set_forkserver_preload(list(WORKER_PRELOAD))
+    return context
+
+
+# Set by `warm_worker()`; extraction pauses the GC only in worker processes, never in a caller's threads
+_in_worker = False
+
+
+def warm_worker():
+    """
+    Initializer of batch workers: warms up, then freezes the heap for the GC.
+
+    After one YAML dump and one parse, everything the worker has allocated so
+    far (modules, compiled regexes, dumper tables) is moved to the permanent
+    generation, so later collections never scan it again.
+    """
+    global _in_worker
+    _in_worker = True
+    dump_yaml({"cabs": {"warm": {"inputs": {"x": {"dtype": "str", "info": QuotedString("")}}}}})
+    ast.parse("def warm(x=1):\n    return x\n")
+    gc.collect()
+    gc.freeze()
+
+
+def make_worker_pool(workers):
+    """Returns a warm-started `ProcessPoolExecutor`; see `worker_context()` and `warm_worker()`."""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=worker_context(), initializer=warm_worker)
+
+
+@contextlib.contextmanager
+def gc_paused():
+    """
+    Disables the cyclic GC for a block of AST-heavy work.
+
+    AST nodes form no reference cycles, so they are freed by reference counting
+    alone; without the GC, building a large tree does not trigger repeated
+    collections that walk it. The switch is process-wide, so `extract_task()`
+    only uses it in batch worker processes.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def task_item_parts(item):
+    """Splits a batch item into `(cab_name, filepath, source)`; `source` is None for wrapper paths."""
+    if isinstance(item, tuple):
+        cab_name, source = item
+        return cab_name, f"{cab_name}.py", source
+    filepath = os.fspath(item)
+    return os.path.splitext(os.path.basename(filepath))[0], filepath, None
+
+
+def extract_task(item, fast=False):
+    """
+    Runs `extract_yaml()` for one batch item and never raises.
+
+    Args:
+        item (str or tuple): A wrapper path, or a `(cab_name, source)` pair.
+        fast (bool): Use the tokenizer fast path where possible.
+
+    Returns:
+        tuple: `(cab_name, cab_dict, diagnostics)`; `cab_dict` is None when
+        extraction failed and `diagnostics["error"]` says why.
+    """
+    cab_name, filepath, source = task_item_parts(item)
+    diagnostics = {"source": filepath if source is None else "<source>", "pid": os.getpid(), "error": None}
+    start = time.perf_counter()
+    try:
+        with gc_paused() if _in_worker else contextlib.nullcontext():
+            result = extract_yaml(filepath, source=source, fast=fast)
+        cab_name = result["cab_name"]
+        cab = result["yaml"]["cabs"][cab_name]
+        diagnostics["stages"] = result["timings"]
+        diagnostics["params"] = len(cab["inputs"])
+        diagnostics["missing_info"] = [param for param, spec in cab["inputs"].items() if not spec.get("info")]
+    except Exception as e:
+        cab = None
+        diagnostics["error"] = f"{type(e).__name__}: {e}"
+    diagnostics["seconds"] = time.perf_counter() - start
+    return cab_name, cab, diagnostics
+
+
+def record_task_metrics(diagnostics):
+    """Adds one `extract_task()` outcome to the run metrics."""
+    METRICS.inc("tasks_total", status="failed" if diagnostics["error"] else "ok")
+    METRICS.observe("task_seconds", diagnostics["seconds"])
+    for stage, seconds in diagnostics.get("stages", {}).items():
+        METRICS.observe("stage_seconds", seconds, stage=stage)
+
+
+def _budget_worker(conn, fast, extract):
+    """Worker loop for `iter_budgeted_cabs()`: extracts items received on `conn` until it gets None."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    warm_worker()
+    while True:
+        item = conn.recv()
+        if item is None:
+            return
+        conn.send(extract(item, fast))
+
+
+def process_rss(pid):
+    """Returns the resident set size of a process in bytes, or None where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def describe_budgets(timeout=None, max_rss=None):
+    """Returns a short description of the per-task budgets, e.g. `30s, 512 MB RSS`."""
+    parts = []
+    if timeout:
+        parts.append(f"{timeout:g}s")
+    if max_rss:
+        parts.append(f"{max_rss / 2**20:g} MB RSS")
+    return ", ".join(parts) or "unlimited"
+
+
+def iter_budgeted_cabs(sources, workers=1, timeout=None, max_rss=None, ordered=True, fast=False,
+                       poll_interval=0.05, context=None, extract=extract_task):
+    """
+    Like `iter_cabs()` with workers, but enforces per-task wall-clock and RSS budgets.
+
+    Each worker process extracts one task at a time. A worker whose task runs
+    longer than `timeout` seconds, or whose resident memory exceeds `max_rss`
+    bytes (read from /proc, so Linux only), is killed and replaced; its task is
+    yielded as failed with `diagnostics["budget"]` set to "time" or "memory".
+    A worker that dies on its own is handled the same way.
+
+    Args:
+        sources (iterable): Wrapper paths and/or `(cab_name, source)` pairs.
+        workers (int): Number of worker processes.
+        timeout (float): Wall-clock budget per task in seconds, or None.
+        max_rss (int): Resident memory budget per worker in bytes, or None.
+        ordered (bool): Yield in input order; otherwise in completion order.
+        fast (bool): Use the tokenizer fast path where possible.
+        poll_interval (float): Seconds between budget checks.
+        context (multiprocessing.context.BaseContext): Start method of the workers,
+            by default `worker_context()`.
+        extract (callable): Run in the worker for each item, with the signature of
+            `extract_task()`; it must be a module-level function, so that spawn and
+            forkserver workers can import it.
+
+    Yields:
+        tuple: `(cab_name, cab_dict, diagnostics)` as returned by `extract_task()`.
+    """
+    context = context or worker_context()
+    items = enumerate(sources)
+    slots = []
+    finished = {}
+    next_seq = 0
+
+    def spawn():
+        conn, child_conn = context.Pipe()
+        process = context.Process(target=_budget_worker, args=(child_conn, fast, extract), daemon=True)
+        process.start()
+        child_conn.close()
+        return {"process": process, "conn": conn, "job": None}
+
+    def assign(slot):
+        for seq, item in items:
+            slot["job"] = (seq, item, time.monotonic())
+            slot["conn"].send(item)
+            return
+        slot["job"] = None
+
+    def kill(slot):
+        slot["process"].kill()
+        slot["process"].join()
+        slot["conn"].close()
+
+    def failed(slot, error, budget=None):
+        seq, item, started = slot["job"]
+        diagnostics = {"source": task_item_parts(item)[1], "pid": slot["process"].pid, "error": error,
+                       "seconds": time.monotonic() - started}
+        if budget:
+            diagnostics["budget"] = budget
+            METRICS.inc("budget_exceeded_total", kind=budget)
+        return task_item_parts(item)[0], None, diagnostics
+
+    try:
+        for _ in range(max(1, workers)):
+            slots.append(spawn())
+            assign(slots[-1])
+
+        while any(slot["job"] for slot in slots):
+            busy = [slot for slot in slots if slot["job"]]
+            ready = multiprocessing.connection.wait([slot["conn"] for slot in busy], timeout=poll_interval)
+            for i, slot in enumerate(slots):
+                if not slot["job"]:
+                    continue
+                seq, item, started = slot["job"]
+                outcome = None
+                if slot["conn"] in ready:
+                    try:
+                        outcome = slot["conn"].recv()
+                    except (EOFError, OSError):
+                        slot["process"].join()
+                        outcome = failed(slot, f"WorkerDied: worker exited with code {slot['process'].exitcode}")
+                        kill(slot)
+                        slots[i] = spawn()
+                else:
+                    rss = process_rss(slot["process"].pid) if max_rss else None
+                    if timeout and time.monotonic() - started > timeout:
+                        outcome = failed(slot, f"TimeBudgetExceeded: still running after {timeout:g}s", "time")
+                    elif rss is not None and rss > max_rss:
+                        outcome = failed(slot, f"MemoryBudgetExceeded: worker RSS {rss / 2**20:.0f} MB over "
+                                               f"{max_rss / 2**20:g} MB", "memory")
+                    if outcome is not None:
+                        kill(slot)
+                        slots[i] = spawn()
+                if outcome is None:
+                    continue
+                record_task_metrics(outcome[2])
+                assign(slots[i])
+                if ordered:
+                    finished[seq] = outcome
+                else:
+                    yield outcome
+            while next_seq in finished:
+                yield finished.pop(next_seq)
+                next_seq += 1
+    finally:
+        for slot in slots:
+            with contextlib.suppress(OSError):
+                slot["conn"].send(None)
+            slot["process"].join(timeout=1)
+            if slot["process"].is_alive():
+                kill(slot)
+
+
+def iter_cabs(sources, workers=0, ordered=True, max_pending=None, fast=False, timeout=None, max_rss=None):
+    """
+    Lazily extracts cabs from an iterable of task wrappers.
+
+    Results are yielded as each task finishes. With `workers > 0` extraction runs
+    in a process pool; at most `max_pending` tasks are in flight at once, so
+    memory stays bounded however long `sources` is.
+
+    Args:
+        sources (iterable): Wrapper paths and/or `(cab_name, source)` pairs.
+        workers (int): Number of worker processes; 0 extracts in the calling process.
+        ordered (bool): Yield in input order; otherwise in completion order.
+        max_pending (int): Maximum in-flight tasks, defaults to twice `workers`.
+        fast (bool): Use the tokenizer fast path where possible.
+        timeout (float): Per-task wall-clock budget in seconds; see `iter_budgeted_cabs()`.
+        max_rss (int): Per-worker resident memory budget in bytes.
+
+    Yields:
+        tuple: `(cab_name, cab_dict, diagnostics)` as returned by `extract_task()`.
+    """
+    if timeout or max_rss:
+        # Budgets need a worker that can be killed, so they always run pooled.
+        yield from iter_budgeted_cabs(sources, max(1, workers), timeout, max_rss, ordered, fast)
+        return
+
+    if workers <= 0:
+        for item in sources:
+            outcome = extract_task(item, fast)
+            record_task_metrics(outcome[2])
+            yield outcome
+        return
+
+    max_pending = max_pending or 2 * workers
+    items = iter(sources)
+    with make_worker_pool(workers) as executor:
+        pending = deque()
+
+        def submit_next():
+            for item in items:
+                pending.append(executor.submit(extract_task, item, fast))
+                return True
+            return False
+
+        while len(pending) < max_pending and submit_next():
+            pass
+
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                done = [future for future in pending if future in finished]
+                for future in done:
+                    pending.remove(future)
+            for future in done:
+                submit_next()
+                outcome = future.result()
+                record_task_metrics(outcome[2])
+                yield outcome
+
+
+def canonical_hash(data):
+    """
+    Returns a hash of a YAML-compatible structure that ignores mapping order.
+
+    Args:
+        data (Any): Parsed or generated YAML document.
+
+    Returns:
+        str: SHA-256 hex digest of the canonical JSON encoding.
+    """
+    canonical = json.dumps(data, sort_keys=True, default=str, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def structural_diff(expected, actual, path=""):
+    """
+    Lists the differences between two YAML-compatible structures.
+
+    Args:
+        expected (Any): Reference structure.
+        actual (Any): Structure to compare against it.
+        path (str): Dotted path of the structures being compared.
+
+    Returns:
+        list of str: One line per differing leaf, missing or unexpected key.
+    """
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        lines = []
+        for key in expected:
+            child = f"{path}.{key}" if path else str(key)
+            if key not in actual:
+                lines.append(f"{child}: missing")
+            else:
+                lines.extend(structural_diff(expected[key], actual[key], child))
+        for key in actual:
+            if key not in expected:
+                lines.append(f"{path}.{key}: unexpected" if path else f"{key}: unexpected")
+        return lines
+    if expected != actual or type(expected) is not type(actual):
+        return [f"{path}: expected {expected!r}, got {actual!r}"]
+    return []
+
+
+def check_golden_task(pair):
+    """
+    Regenerates one cab and compares it with its stored expected YAML.
+
+    Args:
+        pair (tuple): `(fixture_path, expected_path)`.
+
+    Returns:
+        tuple: `(cab_name, matched, diff_lines)`.
+    """
+    fixture_path, expected_path = pair
+    cab_name = os.path.splitext(os.path.basename(fixture_path))[0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            generated = extract_yaml(fixture_path)["yaml"]
+        except Exception as e:
+            return cab_name, False, [f"extraction failed: {type(e).__name__}: {e}"]
+    with open(expected_path, encoding="utf-8") as f:
+        expected = yaml.safe_load(f)
+    if canonical_hash(generated) == canonical_hash(expected):
+        return cab_name, True, []
+    return cab_name, False, structural_diff(expected, generated)
+
+
+def check_golden(fixtures_dir, expected_dir, workers=None):
+    """
+    Verifies every fixture in `fixtures_dir` against `expected_dir/<cab>.yaml`.
+
+    Cabs are regenerated in a process pool and compared by canonical hash; a
+    structural diff is printed only for mismatches.
+
+    Args:
+        fixtures_dir (str): Directory of CASA task wrappers.
+        expected_dir (str): Directory of reference YAML files.
+        workers (int): Pool size, defaults to the number of CPUs.
+
+    Returns:
+        bool: True when every fixture with a reference YAML matched.
+    """
+    pairs = []
+    skipped = []
+    for fixture_path in collect_task_files([fixtures_dir]):
+        cab_name = os.path.splitext(os.path.basename(fixture_path))[0]
+        expected_path = os.path.join(expected_dir, f"{cab_name}.yaml")
+        if os.path.exists(expected_path):
+            pairs.append((fixture_path, expected_path))
+        else:
+            skipped.append(cab_name)
+
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(pairs) > 1:
+        with make_worker_pool(workers) as executor:
+            chunksize = max(1, len(pairs) // (workers * 4))
+            outcomes = list(executor.map(check_golden_task, pairs, chunksize=chunksize))
+    else:
+        outcomes = [check_golden_task(pair) for pair in pairs]
+    elapsed = time.perf_counter() - start
+
+    mismatched = [(cab_name, diff) for cab_name, matched, diff in outcomes if not matched]
+    for cab_name, diff in mismatched:
+        print(f"❌ {cab_name}")
+        for line in diff:
+            print(f"    {line}")
+    if skipped:
+        print(f"⚠️ No expected YAML for: {', '.join(skipped)}")
+    print(f"{'✅' if not mismatched else '❌'} {len(outcomes) - len(mismatched)}/{len(outcomes)} cabs match "
+          f"the golden corpus ({elapsed:.2f}s)")
+    return not mismatched
+
+
+def casa_type_of(schema_entry):
+    """
+    Returns the CASA type recorded for a parameter in a task's `schema` literal.
+
+    Args:
+        schema_entry (dict): The parameter's entry from `extract_schema_dict()`.
+
+    Returns:
+        str: The `type`, `|`-joined `anyof` types, or 'unknown'.
+    """
+    if "type" in schema_entry:
+        return schema_entry["type"]
+    if isinstance(schema_entry.get("anyof"), list):
+        return "|".join(str(alt.get("type", "unknown")) for alt in schema_entry["anyof"] if isinstance(alt, dict))
+    return "unknown"
+
+
+def index_task_rows(filepath):
+    """
+    Extracts the rows `index_tree()` stores for one task wrapper.
+
+    Args:
+        filepath (str): Path to the CASA task Python file.
+
+    Returns:
+        tuple: `(task_row, param_rows, error)` for the `tasks` and `params` tables;
+        when extraction fails the rows are None and `error` says why.
+    """
+    path = os.path.abspath(filepath)
+    source_hash = _file_sha256(filepath)
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            result = extract_yaml(filepath)
+        except Exception as e:
+            return (path, source_hash), None, f"{type(e).__name__}: {e}"
+    cab_name = result["cab_name"]
+    cab = result["yaml"]["cabs"][cab_name]
+    task_row = (path, cab_name, source_hash, int("outputs" in cab))
+    param_rows = [
+        (
+            path, cab_name, param, position, spec["dtype"], json.dumps(spec["default"], default=str),
+            int(spec["required"]), str(spec["info"]), casa_type_of(result["schema"].get(param, {})),
+        )
+        for position, (param, spec) in enumerate(cab["inputs"].items())
+    ]
+    return task_row, param_rows, None
+
+
+def open_index(db_path=INDEX_DB_FILE, create=True):
+    """
+    Opens (and if needed creates) the task and parameter index database.
+
+    Tasks are keyed on their wrapper's path, so same-named tasks from different
+    trees are kept apart. An index written with an older layout is rebuilt.
+
+    Args:
+        db_path (str): Path to the SQLite file.
+        create (bool): Create the database if it does not exist.
+
+    Returns:
+        sqlite3.Connection: Open connection.
+
+    Raises:
+        FileNotFoundError: If `create` is False and there is no database.
+    """
+    if not create and not os.path.isfile(db_path):
+        raise FileNotFoundError(f"No index at {db_path}; build one with --index first")
+    conn = sqlite3.connect(db_path)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_SCHEMA_VERSION:
+        conn.executescript("DROP TABLE IF EXISTS params; DROP TABLE IF EXISTS tasks; DROP TABLE IF EXISTS errors;")
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS tasks (
+            path TEXT PRIMARY KEY, name TEXT NOT NULL, source_hash TEXT NOT NULL, has_outputs INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS params (
+            path TEXT NOT NULL, task TEXT NOT NULL, name TEXT NOT NULL, position INTEGER NOT NULL, dtype TEXT NOT NULL,
+            default_json TEXT, required INTEGER NOT NULL, info TEXT, casa_type TEXT NOT NULL,
+            PRIMARY KEY (path, name)
+        );
+        CREATE TABLE IF NOT EXISTS errors (
+            path TEXT PRIMARY KEY, source_hash TEXT NOT NULL, error TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS params_task ON params (task);
+        CREATE INDEX IF NOT EXISTS params_name_dtype ON params (name, dtype);
+        CREATE INDEX IF NOT EXISTS params_dtype ON params (dtype);
+        CREATE INDEX IF NOT EXISTS params_casa_type ON params (casa_type, name);
+        PRAGMA user_version = {INDEX_SCHEMA_VERSION};
+    """)
+    return conn
+
+
+def index_tree(paths, db_path=INDEX_DB_FILE, workers=None):
+    """
+    Stores the `extract_yaml()` output of many tasks in an indexed SQLite database.
+
+    Tasks whose wrapper is unchanged since the last run (same SHA-256) are skipped,
+    and tasks whose wrapper no longer exists are removed. A wrapper that fails to
+    extract is recorded in the `errors` table and skipped until it changes.
+
+    Args:
+        paths (list of str): Wrapper files and/or directories.
+        db_path (str): Path to the SQLite file.
+        workers (int): Pool size, defaults to the number of CPUs.
+
+    Returns:
+        tuple: `(indexed, unchanged, removed, failed)`, where `failed` lists
+        `(path, error)` for wrappers that could not be extracted in this run.
+    """
+    conn = open_index(db_path)
+    known = dict(conn.execute("SELECT path, source_hash FROM tasks UNION ALL SELECT path, source_hash FROM errors"))
+    all_paths = collect_task_files(paths)
+    filepaths = [path for path in all_paths if known.get(os.path.abspath(path)) != _file_sha256(path)]
+    unchanged = len(all_paths) - len(filepaths)
+    gone = [(path,) for path in known if not os.path.exists(path)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(filepaths) > 1:
+        with make_worker_pool(workers) as executor:
+            indexed = list(executor.map(index_task_rows, filepaths, chunksize=8))
+    else:
+        indexed = [index_task_rows(path) for path in filepaths]
+
+    failed = []
+    with conn:
+        for table in ("params", "tasks", "errors"):
+            conn.executemany(f"DELETE FROM {table} WHERE path = ?", gone)
+        for task_row, param_rows, error in indexed:
+            path = task_row[0]
+            conn.execute("DELETE FROM params WHERE path = ?", (path,))
+            if error is not None:
+                conn.execute("DELETE FROM tasks WHERE path = ?", (path,))
+                conn.execute("INSERT OR REPLACE INTO errors VALUES (?, ?, ?)", (*task_row, error))
+                failed.append((path, error))
+                continue
+            conn.execute("DELETE FROM errors WHERE path = ?", (path,))
+            conn.execute("INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?)", task_row)
+            conn.executemany("INSERT INTO params VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", param_rows)
+    conn.close()
+    return len(indexed) - len(failed), unchanged, len(gone), failed
+
+
+def query_index(db_path=INDEX_DB_FILE, task=None, param=None, dtype=None, casa_type=None):
+    """
+    Looks up parameters in the index built by `index_tree()`.
+
+    Every filter is optional; given filters must all match exactly.
+
+    Args:
+        db_path (str): Path to the SQLite file.
+        task (str): Task name.
+        param (str): Parameter name.
+        dtype (str): Stimela dtype, e.g. 'Union[str, List[str]]'.
+        casa_type (str): CASA type from the task's schema, e.g. 'cVariant'.
+
+    Returns:
+        list of tuple: `(task, parameter, dtype, casa_type, default)` rows.
+
+    Raises:
+        FileNotFoundError: If there is no index at `db_path`.
+    """
+    filters = [("task", task), ("name", param), ("dtype", dtype), ("casa_type", casa_type)]
+    where = [f"{column} = ?" for column, value in filters if value is not None]
+    sql = "SELECT task, name, dtype, casa_type, default_json FROM params"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY task, path, position"
+    conn = open_index(db_path, create=False)
+    rows = conn.execute(sql, [value for _, value in filters if value is not None]).fetchall()
+    conn.close()
+    return rows
+
+
+def iter_cabs_with_docs(filepaths, workers=0, fast=False, lookahead=DEFAULT_DOC_LOOKAHEAD, timeout=None,
+                        max_rss=None):
+    """
+    Pairs each extracted cab with its XML docs, fetching docs ahead of parsing.
+
+    While task N is being extracted, doc pages for tasks N+1..N+`lookahead` are
+    already being fetched in background threads. Each task's page is fetched
+    at most once per call, even if the task appears more than once, and is
+    released after its last use, so only about `lookahead` pages are held at once.
+
+    Args:
+        filepaths (list of str): Task wrapper paths.
+        workers (int): Extraction worker processes, as for `iter_cabs()`.
+        fast (bool): Use the tokenizer fast path where possible.
+        lookahead (int): Number of tasks whose docs are fetched ahead.
+        timeout (float): Per-task wall-clock budget in seconds, as for `iter_cabs()`.
+        max_rss (int): Per-worker resident memory budget in bytes.
+
+    Yields:
+        tuple: `(filepath, (cab_name, cab_dict, diagnostics), xml_params)`.
+    """
+    names = [os.path.splitext(os.path.basename(path))[0] for path in filepaths]
+    last_use = {name: i for i, name in enumerate(names)}
+    with ThreadPoolExecutor(max_workers=max(1, lookahead)) as fetcher:
+        futures = {}
+
+        def fetch_ahead(first):
+            for name in names[first:first + lookahead + 1]:
+                if name not in futures:
+                    futures[name] = fetcher.submit(lookup_docs, name)
+
+        fetch_ahead(0)
+        for i, outcome in enumerate(iter_cabs(filepaths, workers, fast=fast, timeout=timeout, max_rss=max_rss)):
+            fetch_ahead(i + 1)
+            future = futures.pop(names[i]) if last_use[names[i]] == i else futures[names[i]]
+            yield filepaths[i], outcome, future.result()
+
+
+class CabStore:
+    """
+    Content-addressed store of generated cabs for several CASA releases.
+
+    Every parameter spec and every cab (with its parameters replaced by their
+    hashes) is stored once under `objects/`, named by its canonical hash, so
+    tasks and parameters that are identical across releases share storage.
+    `releases/<version>.json` maps each task of a release to the hash of its
+    wrapper source and of its cab, and `built/` maps (task, wrapper source,
+    generator version) to the cab built from it, so concurrent runs on the same
+    store extract each wrapper only once: the first run to need a cab claims its
+    lock, the others wait for it and reuse the result.
+
+    Args:
+        root (str): Store directory; defaults to `store/` in the cache directory.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(get_cache_dir(), CAB_STORE_DIR)
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(self.root, "releases"), exist_ok=True)
+        os.makedirs(os.path.join(self.root, "built"), exist_ok=True)
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.json")
+
+    def _release_path(self, version):
+        return os.path.join(self.root, "releases", f"{version}.json")
+
+    def _built_path(self, task_name, source_hash):
+        return os.path.join(self.root, "built", f"{task_name}-{source_hash}-v{GENERATOR_VERSION}.json")
+
+    def built_cab(self, task_name, source_hash):
+        """Returns the hash of the cab built from a wrapper source under this generator version, or None."""
+        try:
+            with open(self._built_path(task_name, source_hash), encoding="utf-8") as f:
+                return json.load(f)["cab"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _record_built(self, task_name, source_hash, cab):
+        digest = self.put_cab(cab)
+        path = self._built_path(task_name, source_hash)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"cab": digest}, f)
+        os.replace(tmp_path, path)
+        return digest
+
+    def put_object(self, data):
+        """Stores a JSON-compatible value unless already present and returns its hash."""
+        digest = canonical_hash(data)
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+            METRICS.inc("bytes_written_total", len(payload))
+        return digest
+
+    def get_object(self, digest):
+        with open(self._object_path(digest), encoding="utf-8") as f:
+            return json.load(f)
+
+    def put_cab(self, cab):
+        """Stores a cab and each of its parameter specs; returns the cab's hash."""
+        stored = dict(cab)
+        for section in ("inputs", "outputs"):
+            if isinstance(cab.get(section), dict):
+                stored[section] = {name: self.put_object(spec) for name, spec in cab[section].items()}
+        return self.put_object(stored)
+
+    def get_cab(self, digest):
+        cab = self.get_object(digest)
+        for section in ("inputs", "outputs"):
+            if isinstance(cab.get(section), dict):
+                cab[section] = {name: self.get_object(spec) for name, spec in cab[section].items()}
+                # JSON drops the QuotedString marker; restore it so exported YAML matches generated YAML
+                for spec in cab[section].values():
+                    if isinstance(spec.get("info"), str):
+                        spec["info"] = QuotedString(spec["info"])
+        return cab
+
+    def releases(self):
+        """Returns the versions held in the store, sorted."""
+        return sorted(name[:-5] for name in os.listdir(os.path.join(self.root, "releases")) if name.endswith(".json"))
+
+    def release(self, version):
+        """Returns a release manifest, or None if the store does not hold that version."""
+        try:
+            with open(self._release_path(version), encoding="utf-8") as f:
+                return json.load(f)
+        except OSError:
+            return None
+
+    def load_cab(self, version, task_name):
+        """Returns one task's cab as generated for a release."""
+        return self.get_cab(self.release(version)["tasks"][task_name]["cab"])
+
+    def update_release(self, version, filepaths, workers=0):
+        """
+        Generates a release into the store, reusing unchanged tasks.
+
+        A task whose wrapper source (as written by xml-casa) is byte-identical to
+        one already in any release, under the same generator version, reuses
+        that release's cab without being extracted again. Wrappers that another
+        process is extracting right now are waited for rather than extracted twice.
+
+        Args:
+            version (str): Release label, e.g. "6.2".
+            filepaths (list of str): The release's task wrappers.
+            workers (int): Extraction worker processes, as for `iter_cabs()`.
+
+        Returns:
+            dict: Task names grouped under 'extracted', 'reused' and 'failed'.
+
+        Raises:
+            ValueError: If `version` is not a release number such as "6.2".
+        """
+        if not RELEASE_LABEL_RE.fullmatch(version):
+            raise ValueError(f"Invalid CASA release {version!r}; store releases are numbers such as 6.2 or 6.5.0-pre")
+        known = {}
+        for other in self.releases():
+            manifest = self.release(other)
+            if manifest.get("generator_version") == GENERATOR_VERSION:
+                for task_name, entry in manifest["tasks"].items():
+                    known[(task_name, entry["source_hash"])] = entry["cab"]
+
+        tasks = {}
+        report = {"extracted": [], "reused": [], "failed": []}
+        claimed, contended = [], []
+
+        def reuse(task_name, source_hash, digest):
+            if digest:
+                METRICS.inc("cab_cache_total", layer="store", result="hit")
+                tasks[task_name] = {"source_hash": source_hash, "cab": digest}
+                report["reused"].append(task_name)
+            return digest
+
+        for filepath in filepaths:
+            task_name = os.path.splitext(os.path.basename(filepath))[0]
+            source_hash = _file_sha256(filepath)
+            if reuse(task_name, source_hash,
+                     known.get((task_name, source_hash)) or self.built_cab(task_name, source_hash)):
+                continue
+            lock = FileLock(self._built_path(task_name, source_hash) + ".lock")
+            if not lock.acquire(blocking=False):
+                contended.append((filepath, source_hash, lock))
+            # Another process may have built it between the check above and taking the lock
+            elif reuse(task_name, source_hash, self.built_cab(task_name, source_hash)):
+                lock.release()
+            else:
+                claimed.append((filepath, source_hash, lock))
+
+        def extract(todo):
+            try:
+                for (filepath, source_hash, lock), (cab_name, cab, _) in zip(
+                        todo, iter_cabs([path for path, _, _ in todo], workers)):
+                    METRICS.inc("cab_cache_total", layer="store", result="miss")
+                    if cab is None:
+                        report["failed"].append(cab_name)
+                    else:
+                        digest = self._record_built(cab_name, source_hash, cab)
+                        tasks[cab_name] = {"source_hash": source_hash, "cab": digest}
+                        report["extracted"].append(cab_name)
+                    # Waiters on this wrapper need not wait for the rest of the batch
+                    lock.release()
+            finally:
+                for _, _, lock in todo:
+                    lock.release()
+
+        extract(claimed)
+        for filepath, source_hash, lock in contended:
+            lock.acquire()
+            task_name = os.path.splitext(os.path.basename(filepath))[0]
+            if reuse(task_name, source_hash, self.built_cab(task_name, source_hash)):
+                lock.release()
+            else:
+                extract([(filepath, source_hash, lock)])
+
+        manifest = {"version": version, "generator_version": GENERATOR_VERSION, "tasks": dict(sorted(tasks.items()))}
+        tmp_path = self._release_path(version) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self._release_path(version))
+        return report
+
+    def export_release(self, version, out_dir):
+        """Writes every cab of a release as `<task>.yaml` into `out_dir`; returns the paths written."""
+        os.makedirs(out_dir, exist_ok=True)
+        written = []
+        for task_name, entry in self.release(version)["tasks"].items():
+            out_file = os.path.join(out_dir, f"{task_name}.yaml")
+            write_yaml({"cabs": {task_name: self.get_cab(entry["cab"])}}, out_file)
+            written.append(out_file)
+        return written
+
+    def stats(self):
+        """Returns release, task-entry, unique-cab and object counts plus the bytes the objects take."""
+        manifests = [self.release(version) for version in self.releases()]
+        objects = [os.path.join(dirpath, name) for dirpath, _, names in os.walk(os.path.join(self.root, "objects"))
+                   for name in names if name.endswith(".json")]
+        return {
+            "releases": len(manifests),
+            "tasks": sum(len(manifest["tasks"]) for manifest in manifests),
+            "unique_cabs": len({entry["cab"] for manifest in manifests for entry in manifest["tasks"].values()}),
+            "objects": len(objects),
+            "bytes": sum(os.path.getsize(path) for path in objects),
+        }
+
+
+def load_manifest(manifest_path):
+    """
+    Reads a task manifest: one wrapper file or directory per line, `#` comments allowed.
+
+    Relative entries are resolved against the manifest's directory. A wrapper
+    listed more than once is kept once.
+
+    Args:
+        manifest_path (str): Path to the manifest file.
+
+    Returns:
+        list of str: Wrapper paths, sorted by task name.
+
+    Raises:
+        ValueError: If two different wrappers have the same task name, e.g. a
+            manifest listing several CASA releases; cabs are named by task, so
+            one would overwrite the other.
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    entries = []
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                entries.append(os.path.join(base, line))
+
+    by_task = {}
+    for path in collect_task_files(entries):
+        path = os.path.abspath(path)
+        task_name = os.path.splitext(os.path.basename(path))[0]
+        if by_task.setdefault(task_name, path) != path:
+            raise ValueError(f"Task {task_name} is listed twice in {manifest_path}: {by_task[task_name]} and {path}")
+    return [by_task[task_name] for task_name in sorted(by_task)]
+
+
+def parse_shard_spec(spec):
+    """
+    Parses an `--shard=<i>/<n>` value.
+
+    Returns:
+        tuple: `(i, n)` with `n >= 1` and `0 <= i < n`.
+
+    Raises:
+        ValueError: If the value is not of that form.
+    """
+    try:
+        shard, shards = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard {spec!r}: expected <i>/<n>, e.g. 0/4") from None
+    if shards < 1 or not 0 <= shard < shards:
+        raise ValueError(f"Invalid shard {spec!r}: need n >= 1 and 0 <= i < n")
+    return shard, shards
+
+
+def manifest_hash(filepaths):
+    """
+    Identifies a manifest's inputs by each wrapper's path and content.
+
+    Shards run over the same task names but from a different checkout, or after
+    a wrapper was regenerated, get a different hash and so are not merged.
+    """
+    entries = sorted(f"{path}\t{_file_sha256(path)}" for path in filepaths)
+    return hashlib.sha256("\n".join(entries).encode("utf-8")).hexdigest()
+
+
+def shard_of(task_name, shards):
+    """
+    Returns the shard a task belongs to.
+
+    Based on a hash of the task name only, so the assignment does not depend on
+    manifest order or on which other tasks are present.
+    """
+    return int(hashlib.sha256(task_name.encode("utf-8")).hexdigest()[:8], 16) % shards
+
+
+def shard_dir_name(shard, shards):
+    return f"shard-{shard}-of-{shards}"
 
 
-def validate_against_xml(task_name, inputs):
+def run_shard(manifest_path, shard, shards, out_dir, workers=0, timeout=None, max_rss=None):
     """
-    Validates a YAML schema against the CASA XML documentation for the same task.
+    Extracts the tasks of one shard and writes them as partial results.
 
-    Checks consistency between default values and descriptions. Optionally
-    fills in blank descriptions using XML when `fix_description=True`.
+    Each shard writes `<out_dir>/shard-<i>-of-<n>/` containing one YAML per cab
+    and, last of all, a `shard.json` record, so a shard directory without that
+    record is known to be incomplete.
 
     Args:
-        yaml_dict (dict): Stimela-style YAML structure.
-        cab_name (str): Name of the cab/task being validated.
-        fix_description (bool): Whether to autofill missing descriptions.
+        manifest_path (str): Task manifest shared by all shards.
+        shard (int): Index of this shard, from 0 to `shards - 1`.
+        shards (int): Total number of shards.
+        out_dir (str): Shared directory holding all shard outputs.
+        workers (int): Extraction worker processes for this shard.
+        timeout (float): Per-task wall-clock budget in seconds, as for `iter_cabs()`.
+        max_rss (int): Per-worker resident memory budget in bytes.
 
     Returns:
-        None: Prints summary and mismatch results to stdout.
-    """
+        dict: The shard record written to `shard.json`.
 
-    def normalize(val):
-        if isinstance(val, str):
-            val = val.strip()
-            if val == "numpy.array([])":
-                return []
-            if val == "(boolArray=[True])":
-                return [True]
-            try:
-                return ast.literal_eval(val)
-            except Exception:
-                return val.lower()
-        return val
+    Raises:
+        ValueError: If the shard numbers are out of range or the manifest lists a task twice.
+    """
+    parse_shard_spec(f"{shard}/{shards}")
+    filepaths = load_manifest(manifest_path)
+    mine = [path for path in filepaths if shard_of(os.path.splitext(os.path.basename(path))[0], shards) == shard]
+    shard_dir = os.path.join(out_dir, shard_dir_name(shard, shards))
+    os.makedirs(shard_dir, exist_ok=True)
 
-    xml_params = fetch_xml_parameter_info(task_name)
-    print("\n=== Online XML-CASA Validation Report ===")
-    rows = []
-    for param, local in inputs.items():
-        xml = xml_params.get(param)
-        if not xml:
-            rows.append([param, "❌ Not found in XML", "", "", "", ""])
+    record = {"shard": shard, "shards": shards, "manifest_hash": manifest_hash(filepaths), "tasks": {}, "failed": {}}
+    for filepath, (cab_name, cab, diagnostics) in zip(mine, iter_cabs(mine, workers, timeout=timeout, max_rss=max_rss)):
+        if cab is None:
+            record["failed"][cab_name] = diagnostics["error"]
             continue
+        document = {"cabs": {cab_name: cab}}
+        write_yaml(document, os.path.join(shard_dir, f"{cab_name}.yaml"))
+        record["tasks"][cab_name] = {"source": filepath, "hash": canonical_hash(document)}
+
+    tmp_path = os.path.join(shard_dir, "shard.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(shard_dir, "shard.json"))
+    return record
+
+
+def merge_shards(manifest_path, shards_dir, out_dir):
+    """
+    Combines all shard outputs into the final cab set.
+
+    Checks that every shard finished, that all shards used the same manifest,
+    that every task appears exactly once without failures and that each YAML
+    still matches the hash its shard recorded. Writes the cabs and a
+    `cabs.sha256` verification file to `out_dir`.
+
+    Args:
+        manifest_path (str): Task manifest the shards were run from.
+        shards_dir (str): Shared directory holding all shard outputs.
+        out_dir (str): Directory for the merged cab set.
+
+    Returns:
+        str: Verification hash over every cab name and content hash.
+
+    Raises:
+        ValueError: If shards are missing, inconsistent or incomplete.
+    """
+    filepaths = load_manifest(manifest_path)
+    expected_hash = manifest_hash(filepaths)
+    records = []
+    for name in sorted(os.listdir(shards_dir)):
+        record_path = os.path.join(shards_dir, name, "shard.json")
+        if name.startswith("shard-") and os.path.exists(record_path):
+            with open(record_path, encoding="utf-8") as f:
+                records.append((os.path.join(shards_dir, name), json.load(f)))
+    if not records:
+        raise ValueError(f"No completed shards in {shards_dir}")
+
+    shards = records[0][1]["shards"]
+    present = {record["shard"] for _, record in records if record["shards"] == shards}
+    missing = sorted(set(range(shards)) - present)
+    if missing:
+        raise ValueError(f"Missing or unfinished shards: {missing} of {shards}")
+    if any(record["manifest_hash"] != expected_hash or record["shards"] != shards for _, record in records):
+        raise ValueError("Shards were generated from a different manifest or shard count")
+
+    cabs = {}
+    for shard_dir, record in records:
+        if record["failed"]:
+            raise ValueError(f"Shard {record['shard']} failed tasks: {record['failed']}")
+        for cab_name, entry in record["tasks"].items():
+            if cab_name in cabs:
+                raise ValueError(f"Task {cab_name} produced by more than one shard")
+            cabs[cab_name] = (shard_dir, entry["hash"])
+
+    names = sorted(os.path.splitext(os.path.basename(path))[0] for path in filepaths)
+    if sorted(cabs) != names:
+        raise ValueError(f"Shards do not cover the manifest: missing {sorted(set(names) - set(cabs))}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    lines = []
+    for cab_name in names:
+        shard_dir, recorded = cabs[cab_name]
+        with open(os.path.join(shard_dir, f"{cab_name}.yaml"), "rb") as f:
+            raw = f.read()
+        if canonical_hash(yaml.safe_load(raw)) != recorded:
+            raise ValueError(f"{cab_name}.yaml in {shard_dir} does not match its recorded hash")
+        with open(os.path.join(out_dir, f"{cab_name}.yaml"), "wb") as f:
+            f.write(raw)
+        lines.append(f"{recorded}  {cab_name}.yaml\n")
+
+    verification = hashlib.sha256("".join(lines).encode("utf-8")).hexdigest()
+    with open(os.path.join(out_dir, "cabs.sha256"), "w", encoding="utf-8") as f:
+        f.writelines(lines)
+        f.write(f"{verification}  *\n")
+    return verification
+
+
+def process_task(filepath, do_validate=False, fix_description=False, sidecar=False, result=None, state=None,
+                 xml_params=None):
+    """
+    Generates, summarizes and optionally validates the cab for one CASA task.
+
+    Args:
+        filepath (str): Path to the CASA task Python file.
+        do_validate (bool): Whether to validate against the online CASA XML.
+        fix_description (bool): Whether to fill missing descriptions from XML.
+        sidecar (bool): Whether to write fast-load sidecars next to the YAML.
+        result (dict): Already extracted result for `filepath`, e.g. from `iter_cabs()`.
+        state (ValidationState): Store enabling incremental validation.
+        xml_params (dict): Already fetched docs for the task, shared by
+            description fixing and validation; fetched once here when None.
+
+    Returns:
+        dict: The `extract_yaml()` result for the task.
+    """
+    if result is None:
+        result = extract_yaml(filepath)
+    out_file = f"{result['cab_name']}.yaml"
+    write_yaml(result['yaml'], out_file)
+    if sidecar:
+        write_sidecar(out_file)
+
+    if (fix_description or do_validate) and xml_params is None:
+        xml_params = lookup_docs(result['cab_name'])
+
+    if fix_description:
+        cab_name = result['cab_name']
+        yaml_inputs = result["yaml"]["cabs"][cab_name]["inputs"]
+        if fill_missing_descriptions(yaml_inputs, xml_params):
+            fixed_out_file = f"{cab_name}_fixed.yaml"
+            write_yaml(result["yaml"], fixed_out_file)
+            if sidecar:
+                write_sidecar(fixed_out_file)
+            print(f"✅ YAML with fixed descriptions written to: {fixed_out_file}")
+
+    print(f"✅ YAML written to: {out_file}")
+    validate_and_print_summary(result['yaml']['cabs'][result['cab_name']]['inputs'])
+    if do_validate:
+        with METRICS.timer("stage_seconds", stage="validate"):
+            validate_against_xml(
+                result['cab_name'], result['yaml']['cabs'][result['cab_name']]['inputs'], state, xml_params
+            )
+    return result
+
+
+class LRUMemo:
+    """
+    Thread-safe, size-bounded memo with least-recently-used eviction.
+
+    Values are deep-copied on the way in and on the way out, so callers are
+    free to modify what they get back without corrupting the cached entry.
+
+    Args:
+        maxsize (int): Maximum number of entries kept.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MEMO_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        """Returns a copy of the value stored under `key`, or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, key, value):
+        """Stores a copy of `value`, evicting the least recently used entries beyond `maxsize`."""
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Returns hit, miss and eviction counts together with the current and maximum size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "size": len(self._entries), "maxsize": self.maxsize}
+
+
+EXTRACT_MEMO = LRUMemo()
+DOCS_MEMO = LRUMemo()
+
+
+def memo_extract_yaml(filepath, fast=False):
+    """
+    `extract_yaml()` memoized on (path, mtime, size, generator version).
+
+    Editing the wrapper changes its mtime and size, so a stale cab is never
+    returned. The result is a private copy the caller may modify.
+    """
+    stat = os.stat(filepath)
+    key = (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size, GENERATOR_VERSION, fast)
+    result = EXTRACT_MEMO.get(key)
+    METRICS.inc("cab_cache_total", layer="memory", result="miss" if result is None else "hit")
+    if result is None:
+        result = extract_yaml(filepath, fast=fast)
+        EXTRACT_MEMO.put(key, result)
+    return result
+
+
+def memo_stats():
+    """Returns the hit/miss statistics of the extraction and doc memos."""
+    return {"extract": EXTRACT_MEMO.stats(), "docs": DOCS_MEMO.stats()}
+
+
+class DocSource(abc.ABC):
+    """
+    One backend of the doc-source chain.
+
+    `lookup()` returns `(parameters, status)` in the layout of `refresh_docs()`,
+    with parameters None when this backend cannot serve the task.
+    `remember()` is offered docs served by a later backend of the chain.
+    """
+
+    name = "source"
+
+    @abc.abstractmethod
+    def lookup(self, task_name):
+        """Returns `(parameters, status)` for a task; parameters is None when this backend cannot serve it."""
+
+    def remember(self, task_name, parameters):
+        pass
+
+
+class MemoDocSource(DocSource):
+    """Serves docs from the in-process `DOCS_MEMO`, keyed on (task, CASA release, task-docs URL)."""
+
+    name = "memo"
+
+    @staticmethod
+    def _key(task_name):
+        return task_name, get_casa_version(), task_docs_url()
+
+    def lookup(self, task_name):
+        parameters = DOCS_MEMO.get(self._key(task_name))
+        if parameters is None:
+            return None, "miss"
+        METRICS.inc("doc_cache_total", layer="memory", result="hit")
+        return parameters, "hit"
+
+    def remember(self, task_name, parameters):
+        DOCS_MEMO.put(self._key(task_name), parameters)
+
+
+class LocalXmlDocSource(DocSource):
+    """
+    Serves docs parsed from local CASA task XML files, `<xml_dir>/<task>.xml`.
+
+    The files belong to one CASA release and are only used while that release is
+    selected, so one release's XML never answers for another.
+
+    Args:
+        xml_dir (str): Directory of task XML files; `STIMELA_CASA_XML_DIR` when None.
+        casa_version (str): Release the files belong to; `STIMELA_CASA_XML_VERSION`
+            when None, then `DEFAULT_CASA_VERSION`.
+    """
+
+    name = "local-xml"
+
+    def __init__(self, xml_dir=None, casa_version=None):
+        self.xml_dir = xml_dir
+        self.casa_version = casa_version
+
+    def lookup(self, task_name):
+        xml_dir = self.xml_dir or os.environ.get(XML_DIR_ENV)
+        if not xml_dir:
+            return None, "disabled"
+        xml_version = self.casa_version or os.environ.get(XML_VERSION_ENV) or DEFAULT_CASA_VERSION
+        if xml_version != get_casa_version():
+            return None, "other-release"
+        path = os.path.join(xml_dir, f"{task_name}.xml")
+        try:
+            with open(path, encoding="utf-8") as f:
+                parameters = parse_casa_task_xml(f.read())
+        except FileNotFoundError:
+            return None, "miss"
+        except (OSError, ElementTree.ParseError) as e:
+            print(f"⚠️ Could not read CASA task XML {path}: {e}")
+            return None, "failed"
+        return (parameters, "parsed") if parameters else (None, "miss")
+
+
+class ArchiveDocSource(DocSource):
+    """
+    Serves docs from an offline archive written by `build_doc_archive()`.
+
+    The archive is read once and re-read when the file changes. It is ignored
+    unless it was built from the task-docs URL currently in use.
+
+    Args:
+        path (str): Archive file; `STIMELA_CASA_DOC_ARCHIVE` when None.
+    """
+
+    name = "archive"
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._key = None
+        self._archive = None
+
+    def _load(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key != self._key:
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        archive = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Could not read doc archive {path}: {e}")
+                    archive = None
+                if archive is not None and archive.get("schema_version") != DOC_ARCHIVE_SCHEMA_VERSION:
+                    archive = None
+                self._key, self._archive = key, archive
+            return self._archive
+
+    def lookup(self, task_name):
+        path = self.path or os.environ.get(DOC_ARCHIVE_ENV)
+        if not path:
+            return None, "disabled"
+        archive = self._load(path)
+        if not archive or archive.get("docs_url") != task_docs_url():
+            return None, "unavailable"
+        parameters = archive["tasks"].get(task_name)
+        return (copy.deepcopy(parameters), "hit") if parameters else (None, "miss")
+
+
+class DiskCacheDocSource(DocSource):
+    """
+    Serves entries of the on-disk doc cache younger than `max_age` seconds, without network access.
+
+    Args:
+        max_age (float): Maximum age of a cache entry served; by default `get_doc_max_age()`.
+    """
+
+    name = "disk-cache"
+
+    def __init__(self, max_age=None):
+        self.max_age = max_age
+
+    def lookup(self, task_name):
+        max_age = get_doc_max_age() if self.max_age is None else self.max_age
+        cached = load_cached_docs(task_name)
+        if not cached or time.time() - cached.get("fetched_at", 0) >= max_age:
+            return None, "miss"
+        METRICS.inc("doc_cache_total", layer="disk", result="hit")
+        return cached["parameters"], "fresh"
+
+
+class NetworkDocSource(DocSource):
+    """
+    Fetches the task page from the docs site, revalidating any cached copy (see `refresh_docs()`).
+
+    When the site cannot be reached, the stale cached copy is served with status 'stale'.
+    """
+
+    name = "network"
+
+    def lookup(self, task_name):
+        return refresh_docs(task_name, max_age=0)
+
+
+class DocSourceChain:
+    """
+    Ordered fallback chain of doc sources; the first one that has a task's docs serves them.
+
+    Docs served by a later source are offered to the earlier ones (so the memo
+    holds them next time). Each lookup records the task, the serving backend,
+    its status and the lookup's wall time in `served`, and in the
+    `doc_source_total` and `doc_source_seconds` metrics.
+
+    Args:
+        sources (list of DocSource): Backends, fastest first.
+    """
+
+    def __init__(self, sources):
+        self.sources = list(sources)
+        self._lock = threading.Lock()
+        self.served = deque(maxlen=DOC_SOURCE_LOG_SIZE)
+
+    def lookup(self, task_name):
+        """
+        Returns a task's docs from the first source that has them.
+
+        Args:
+            task_name (str): Name of the CASA task.
+
+        Returns:
+            dict: Mapping of parameter names to their 'default' and 'description';
+            empty when no source has the task.
+        """
+        start = time.perf_counter()
+        backend, status, parameters = "none", "failed", None
+        for i, source in enumerate(self.sources):
+            parameters, status = source.lookup(task_name)
+            if parameters:
+                backend = source.name
+                for earlier in self.sources[:i]:
+                    earlier.remember(task_name, parameters)
+                break
+        seconds = time.perf_counter() - start
+
+        METRICS.inc("doc_source_total", backend=backend, status=status)
+        METRICS.observe("doc_source_seconds", seconds, backend=backend)
+        with self._lock:
+            self.served.append({"task": task_name, "backend": backend, "status": status, "seconds": seconds})
+        return parameters or {}
+
+    def summary(self):
+        """
+        Returns the recorded lookups grouped by serving backend.
+
+        Returns:
+            list of list: `[backend, lookups, mean ms, max ms]` rows, in chain order.
+        """
+        with self._lock:
+            served = list(self.served)
+        order = [source.name for source in self.sources] + ["none"]
+        rows = []
+        for backend in order:
+            seconds = [entry["seconds"] for entry in served if entry["backend"] == backend]
+            if seconds:
+                rows.append([backend, len(seconds), 1000 * sum(seconds) / len(seconds), 1000 * max(seconds)])
+        return rows
+
+
+def default_doc_sources():
+    """
+    Builds the default doc-source chain: in-process memo, local CASA task XML files,
+    offline archive, fresh on-disk cache entries, then the docs site.
+    """
+    return DocSourceChain([
+        MemoDocSource(), LocalXmlDocSource(), ArchiveDocSource(), DiskCacheDocSource(), NetworkDocSource(),
+    ])
+
+
+# Process-wide doc-source chain used by every docs consumer; replace it to plug in other backends
+DOC_SOURCES = default_doc_sources()
+
+
+def lookup_docs(task_name):
+    """
+    Returns a task's parsed docs from the process-wide doc-source chain (`DOC_SOURCES`).
+
+    Args:
+        task_name (str): Name of the CASA task.
+
+    Returns:
+        dict: Mapping of parameter names to their 'default' and 'description'.
+    """
+    return DOC_SOURCES.lookup(task_name)
+
+
+class GeneratorService:
+    """
+    Warm, thread-safe state behind the `--serve` daemon.
+
+    Generated cabs and parsed XML docs come from the in-process memos (see
+    `memo_extract_yaml()`), so repeated requests skip parsing and network
+    round trips. Every call gets its own copy of the cached entry.
+
+    Args:
+        out_dir (str): Directory requests may write cabs into, given as an `out_dir`
+            relative to it; when None, requests cannot write files.
+    """
+
+    def __init__(self, out_dir=None):
+        self.out_dir = os.path.realpath(out_dir) if out_dir else None
+
+    def output_dir(self, requested):
+        """
+        Resolves a request's `out_dir` inside the server's output directory.
 
-        norm_local = normalize(local.get("default"))
-        norm_xml = normalize(xml["default"])
-        print(f"DEBUG: {param} - YAML: {repr(norm_local)} ({type(norm_local)}) vs XML: {repr(norm_xml)} ({type(norm_xml)})")
-        if fuzzy_match(norm_local, norm_xml):
-            default_match = "✓"
+        Raises:
+            PermissionError: If the server has no output directory or the path escapes it.
+        """
+        if self.out_dir is None:
+            raise PermissionError("This server does not write files; start it with --out-dir=<dir>")
+        resolved = os.path.realpath(os.path.join(self.out_dir, requested))
+        if os.path.commonpath([resolved, self.out_dir]) != self.out_dir:
+            raise PermissionError(f"out_dir must stay inside the server's output directory: {requested}")
+        return resolved
+
+    def extract(self, filepath):
+        return memo_extract_yaml(filepath)
+
+    def docs(self, task_name):
+        return lookup_docs(task_name)
+
+    def handle(self, action, request):
+        """
+        Runs one API action.
+
+        Args:
+            action (str): One of 'generate', 'validate' or 'fix-description'.
+            request (dict): Decoded JSON body with a `path` and optional `out_dir`.
+
+        Returns:
+            dict: JSON-serializable response body.
+
+        Raises:
+            ValueError: If the body is not a JSON object.
+            FileNotFoundError: If `path` is not a file.
+            PermissionError: If `out_dir` is not allowed (see `output_dir()`).
+        """
+        if not isinstance(request, dict):
+            raise ValueError("Request body must be a JSON object")
+        filepath = request.get("path")
+        if not filepath or not os.path.isfile(filepath):
+            raise FileNotFoundError(f"File not found: {filepath}")
+
+        result = self.extract(filepath)
+        cab_name = result["cab_name"]
+        inputs = result["yaml"]["cabs"][cab_name]["inputs"]
+        response = {"cab_name": cab_name}
+
+        if action == "validate":
+            response["headers"] = VALIDATION_HEADERS
+            response["rows"] = compare_with_xml(inputs, self.docs(cab_name))
+            return response
+
+        if action == "fix-description":
+            response["filled"] = fill_missing_descriptions(inputs, self.docs(cab_name))
+
+        suffix = "_fixed" if action == "fix-description" else ""
+        response["yaml"] = dump_yaml(result["yaml"])
+        if request.get("out_dir"):
+            out_dir = self.output_dir(request["out_dir"])
+            os.makedirs(out_dir, exist_ok=True)
+            out_file = os.path.join(out_dir, f"{cab_name}{suffix}.yaml")
+            write_yaml(result["yaml"], out_file)
+            response["written"] = out_file
+        return response
+
+
+class GeneratorRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON-over-HTTP API of the `--serve` daemon.
+
+    `POST /generate`, `/validate` and `/fix-description` take `{"path": ...}`;
+    `GET /health` reports liveness and `POST /shutdown` stops the server.
+    """
+
+    actions = ("generate", "validate", "fix-description")
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _reply(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"status": "ok"})
         else:
-            default_match = "✗"
+            self._reply(404, {"error": f"Unknown endpoint: {self.path}"})
 
-        local_info = local.get("info", "").strip()
-        xml_desc = xml["description"].strip()
-        description_match = "✓" if xml_desc[:50].lower() in local_info.lower() else "✗"
+    def do_POST(self):
+        action = self.path.strip("/")
+        if action == "shutdown":
+            self._reply(200, {"status": "shutting down"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        if action not in self.actions:
+            self._reply(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            self._reply(200, self.server.service.handle(action, request))
+        except FileNotFoundError as e:
+            self._reply(404, {"error": str(e)})
+        except PermissionError as e:
+            self._reply(403, {"error": str(e)})
+        except ValueError as e:
+            self._reply(400, {"error": str(e)})
+        except Exception as e:
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
 
-        status = "✅" if default_match == "✓" and description_match == "✓" else "⚠️"
 
-        rows.append([param, status, default_match, description_match, f"YAML: {local_info[:50]}...", f"XML: {xml_desc[:50]}..."])
+class UnixThreadingHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer bound to a Unix domain socket instead of a TCP port."""
 
-    if not rows:
-        print("⚠️ No matching parameters found.")
-        return
+    address_family = socket.AF_UNIX
 
-    headers = ["Parameter", "Status", "Default Match", "Description Match", "YAML Info", "XML Info"]
-    table = tabulate(rows, headers=headers, tablefmt="github")
-    print(table)
+    def server_bind(self):
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
 
-    report_path = f"{task_name}_online_validation_report.md"
-    with open(report_path, "w", encoding="utf-8") as f:
-        f.write("# Online XML-CASA Validation Report\n\n")
-        f.write(table)
-        f.write("\n")
 
-    print(f"📄 Report written to: {report_path}")
+def make_server(socket_path=None, port=DEFAULT_SERVER_PORT, service=None, out_dir=None):
+    """
+    Creates the generator daemon's HTTP server.
+
+    Args:
+        socket_path (str): Unix socket to listen on; a localhost TCP port is used when None.
+        port (int): Localhost TCP port, 0 for an ephemeral one.
+        service (GeneratorService): Shared warm state; a new one is created when None.
+        out_dir (str): Only directory requests may write into, for a new service.
+
+    Returns:
+        ThreadingHTTPServer: Server ready for `serve_forever()`.
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixThreadingHTTPServer(socket_path, GeneratorRequestHandler)
+    else:
+        server = ThreadingHTTPServer(("127.0.0.1", port), GeneratorRequestHandler)
+    # Let in-flight requests finish when the server is closed
+    server.daemon_threads = False
+    server.service = service or GeneratorService(out_dir)
+    return server
+
+
+def serve(socket_path=None, port=DEFAULT_SERVER_PORT, out_dir=None):
+    """
+    Runs the generator daemon until SIGINT, SIGTERM or `POST /shutdown`.
+
+    Args:
+        socket_path (str): Unix socket to listen on; a localhost TCP port is used when None.
+        port (int): Localhost TCP port.
+        out_dir (str): Only directory requests may write into; no writes when None.
+    """
+    server = make_server(socket_path, port, out_dir=out_dir)
+
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    where = socket_path or f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"🚀 Generator server listening on {where}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+        print("👋 Generator server stopped.")
+
+
+def start_metrics_export(path, interval=0):
+    """
+    Writes `METRICS` to `path` when the process exits and, if `interval` is
+    positive, every `interval` seconds from a background thread.
+
+    Args:
+        path (str): Metrics file; `.json` selects JSON, anything else Prometheus text.
+        interval (float): Seconds between periodic writes, 0 to disable them.
+    """
+    atexit.register(METRICS.write, path)
+    if interval > 0:
+        def export_loop():
+            while True:
+                time.sleep(interval)
+                METRICS.write(path)
+
+        threading.Thread(target=export_loop, daemon=True).start()
+
+
+def get_cli_option(name, default=None):
+    """
+    Returns the value of a `--name=value` command-line option.
+
+    Args:
+        name (str): Option name without the leading dashes.
+        default (Any): Value returned when the option is absent.
+
+    Returns:
+        str: The option's value, or `default`.
+    """
+    prefix = f"--{name}="
+    for arg in sys.argv[1:]:
+        if arg.startswith(prefix):
+            return arg[len(prefix):]
+    return default
 
 
 def main():
@@ -570,51 +3975,257 @@ def main():
 
     Parses arguments, generates YAML schema from the CASA task,
     optionally validates against XML, and optionally applies fixes
-    to missing descriptions.
+    to missing descriptions. Several files or directories may be given
+    to process a whole release in one run.
     """
     args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
     # CLI flag to enable CASA XML-based validation
     do_validate = '--validate-online' in sys.argv
     # CLI flag to auto-fill missing YAML descriptions from XML
     fix_description = '--fix-description' in sys.argv
-    if len(args) != 1:
-        print("Usage: python generate_stimela_yaml.py <python_file> [--validate-online | --fix-description]")
+    # CLI flags to emit repeated parameter specs once for the whole batch
+    shared_fragments = '--shared-fragments' in sys.argv
+    shared_anchors = '--shared-anchors' in sys.argv
+    # CLI flag to write a JSON fast-load sidecar next to every YAML file
+    sidecar = '--sidecar' in sys.argv
+    # CLI option to extract a batch in parallel worker processes
+    workers = int(get_cli_option("workers", 0))
+    # CLI flag to read standard xml-casa wrappers without building the full AST
+    fast = '--fast-parse' in sys.argv
+    # CLI flag to re-validate only parameters whose spec or docs changed since the last run
+    incremental = '--incremental' in sys.argv or get_cli_option("state-db") is not None
+    # CLI option to pack every cab into one lazily loadable bundle file
+    bundle = get_cli_option("bundle")
+    # CLI options to kill and record as failed any task exceeding its wall-clock or memory budget
+    timeout = float(get_cli_option("task-timeout", 0)) or None
+    max_rss = int(float(get_cli_option("task-max-rss", 0)) * 2**20) or None
+    if get_cli_option("cache-dir"):
+        os.environ[CACHE_DIR_ENV] = get_cli_option("cache-dir")
+    if get_cli_option("docs-url"):
+        os.environ[DOCS_URL_ENV] = get_cli_option("docs-url")
+    # CLI option selecting the CASA release for docs lookups and the cab store
+    casa_version = get_cli_option("casa-version")
+    if casa_version:
+        os.environ[CASA_VERSION_ENV] = casa_version
+    # CLI options adding local CASA task XML files (of --xml-version, by default the selected release) and an offline
+    # doc archive ahead of the cache and network
+    if get_cli_option("xml-dir"):
+        os.environ[XML_DIR_ENV] = get_cli_option("xml-dir")
+        os.environ[XML_VERSION_ENV] = get_cli_option("xml-version", get_casa_version())
+    if get_cli_option("doc-archive"):
+        os.environ[DOC_ARCHIVE_ENV] = get_cli_option("doc-archive")
+    # CLI option capping the age of doc cache entries served as-is; --doc-max-age=0 revalidates every page
+    if get_cli_option("doc-max-age"):
+        os.environ[DOC_MAX_AGE_ENV] = get_cli_option("doc-max-age")
+    # Checked before any worker or doc lookahead starts, whether the release came from --casa-version or the environment
+    needs_docs = (do_validate or fix_description or '--prefetch' in sys.argv or '--patch-descriptions' in sys.argv
+                  or get_cli_option("build-doc-archive"))
+    if needs_docs and get_casa_version() not in CASA_RELEASES:
+        print(f"❌ No documentation known for CASA {get_casa_version()}; "
+              f"known versions: {', '.join(sorted(CASA_RELEASES))}")
         sys.exit(1)
+    # CLI options to export run metrics (Prometheus text, or JSON for *.json) at exit and periodically
+    if get_cli_option("metrics"):
+        start_metrics_export(get_cli_option("metrics"), float(get_cli_option("metrics-interval", 0)))
+
+    if '--serve' in sys.argv:
+        serve(get_cli_option("socket"), int(get_cli_option("port", DEFAULT_SERVER_PORT)), get_cli_option("out-dir"))
+        return
 
-    filepath = args[0]
+    if '--check-golden' in sys.argv:
+        if len(args) != 2:
+            print("Usage: python generate_stimela_yaml.py --check-golden <fixtures_dir> <expected_dir> [--workers=<n>]")
+            sys.exit(1)
+        sys.exit(0 if check_golden(args[0], args[1], workers or None) else 1)
 
-    if not os.path.isfile(filepath):
-        print(f"❌ File not found: {filepath}")
+    if '--patch-descriptions' in sys.argv:
+        if not args:
+            print("Usage: python generate_stimela_yaml.py --patch-descriptions <cab.yaml>...")
+            sys.exit(1)
+        for yaml_path in args:
+            patched = patch_descriptions(yaml_path)
+            for cab_name, param in patched:
+                print(f"📘 Filled missing info for '{cab_name}.{param}' using XML.")
+            print(f"✅ Patched {len(patched)} description(s) in: {yaml_path}")
+        return
+
+    if '--store' in sys.argv or get_cli_option("store"):
+        if not args or not casa_version:
+            print("Usage: python generate_stimela_yaml.py --store[=<dir>] --casa-version=<version> <python_file|dir>... "
+                  "[--out=<dir>] [--workers=<n>]\n"
+                  "<version> is any release number, e.g. 6.2 or 6.5.0-pre; it need not have known docs.")
+            sys.exit(1)
+        store = CabStore(get_cli_option("store"))
+        try:
+            report = store.update_release(casa_version, collect_task_files(args), workers)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"✅ CASA {casa_version}: {len(report['extracted'])} task(s) extracted, "
+              f"{len(report['reused'])} reused unchanged, {len(report['failed'])} failed")
+        stats = store.stats()
+        print(f"📦 Store {store.root}: {stats['releases']} release(s), {stats['tasks']} task entries, "
+              f"{stats['unique_cabs']} unique cab(s), {stats['objects']} objects ({stats['bytes']} bytes)")
+        if get_cli_option("out"):
+            for path in store.export_release(casa_version, get_cli_option("out")):
+                print(f"✅ YAML written to: {path}")
+        sys.exit(1 if report["failed"] else 0)
+
+    if get_cli_option("shard"):
+        try:
+            shard, shards = parse_shard_spec(get_cli_option("shard"))
+            if not get_cli_option("manifest"):
+                raise ValueError("--shard needs --manifest=<file>")
+            record = run_shard(get_cli_option("manifest"), shard, shards, get_cli_option("out", "shards"), workers,
+                               timeout, max_rss)
+        except ValueError as e:
+            print(f"❌ {e}")
+            print("Usage: python generate_stimela_yaml.py --shard=<i>/<n> --manifest=<file> [--out=<dir>] "
+                  "[--workers=<n>]")
+            sys.exit(1)
+        print(f"✅ Shard {shard}/{shards}: {len(record['tasks'])} cab(s) written, {len(record['failed'])} failed")
+        sys.exit(1 if record["failed"] else 0)
+
+    if '--merge' in sys.argv:
+        if len(args) != 1 or not get_cli_option("manifest"):
+            print("Usage: python generate_stimela_yaml.py --merge <shards_dir> --manifest=<file> [--out=<dir>]")
+            sys.exit(1)
+        try:
+            verification = merge_shards(get_cli_option("manifest"), args[0], get_cli_option("out", "cabs"))
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"✅ Merged cab set verification hash: {verification}")
+        return
+
+    if '--prefetch' in sys.argv:
+        try:
+            changes = prefetch_docs(int(get_cli_option("concurrency", DEFAULT_PREFETCH_CONCURRENCY)))
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print("\n=== CASA XML Prefetch Report ===")
+        rows = [[kind, len(names), ", ".join(names[:10]) + (" ..." if len(names) > 10 else "")]
+                for kind, names in changes.items()]
+        print(tabulate(rows, headers=["", "tasks", "names"], tablefmt="github"))
+        sys.exit(1 if changes["failed"] else 0)
+
+    if get_cli_option("build-doc-archive"):
+        archived = build_doc_archive(get_cli_option("build-doc-archive"), args or None)
+        print(f"✅ {len(archived)} task(s) archived into: {get_cli_option('build-doc-archive')}")
+        sys.exit(0 if archived else 1)
+
+    if '--query' in sys.argv:
+        start = time.perf_counter()
+        try:
+            rows = query_index(
+                get_cli_option("db", INDEX_DB_FILE), get_cli_option("task"), get_cli_option("param"),
+                get_cli_option("dtype"), get_cli_option("casa-type"),
+            )
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(tabulate(rows, headers=["task", "parameter", "dtype", "casa_type", "default"], tablefmt="github"))
+        print(f"🔎 {len(rows)} parameter(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return
+
+    if '--index' in sys.argv and args:
+        db_path = get_cli_option("db", INDEX_DB_FILE)
+        indexed, unchanged, removed, failed = index_tree(args, db_path, workers or None)
+        for path, error in failed:
+            print(f"⚠️ Skipped {path}: {error}")
+        print(f"✅ Indexed {indexed} task(s), {unchanged} unchanged, {removed} removed, into {db_path}")
+        sys.exit(1 if failed else 0)
+
+    if not args:
+        print("Usage: python generate_stimela_yaml.py <python_file|dir>... "
+              "[--validate-online | --fix-description | --shared-fragments | --shared-anchors | --bundle=<file>]\n"
+              "       [--sidecar] [--workers=<n>] [--fast-parse] [--lookahead=<n>]\n"
+              "       [--incremental | --state-db=<path>] [--cache-dir=<dir>] [--doc-max-age=<seconds>] [--docs-url=<url>]\n"
+              "       [--casa-version=<version>] [--xml-dir=<dir> [--xml-version=<version>]] [--doc-archive=<file>]\n"
+              "       [--task-timeout=<seconds>] [--task-max-rss=<MB>]\n"
+              "       [--metrics=<file.prom|file.json>] [--metrics-interval=<seconds>]\n"
+              "       python generate_stimela_yaml.py --serve [--socket=<path> | --port=<port>] [--out-dir=<dir>]\n"
+              "       python generate_stimela_yaml.py --check-golden <fixtures_dir> <expected_dir> [--workers=<n>]\n"
+              "       python generate_stimela_yaml.py --index <python_file|dir>... [--db=<path>] [--workers=<n>]\n"
+              "       python generate_stimela_yaml.py --query [--task=<name>] [--param=<name>] [--dtype=<dtype>] "
+              "[--casa-type=<type>] [--db=<path>]\n"
+              "       python generate_stimela_yaml.py --prefetch [--concurrency=<n>] [--cache-dir=<dir>]\n"
+              "       python generate_stimela_yaml.py --patch-descriptions <cab.yaml>...\n"
+              "       python generate_stimela_yaml.py --build-doc-archive=<file> [<task>...]\n"
+              "       python generate_stimela_yaml.py --shard=<i>/<n> --manifest=<file> [--out=<dir>] [--workers=<n>]\n"
+              "       python generate_stimela_yaml.py --merge <shards_dir> --manifest=<file> [--out=<dir>]\n"
+              "       python generate_stimela_yaml.py --store[=<dir>] --casa-version=<version> <python_file|dir>... "
+              "[--out=<dir>]\n"
+              "Store releases accept any release number as --casa-version; docs lookups need a release with known docs ("
+              + ", ".join(sorted(CASA_RELEASES)) + ").")
         sys.exit(1)
 
-    result = extract_yaml(filepath)
-    out_file = f"{result['cab_name']}.yaml"
+    filepaths = collect_task_files(args)
+    for filepath in filepaths:
+        if not os.path.isfile(filepath):
+            print(f"❌ File not found: {filepath}")
+            sys.exit(1)
 
-    with open(out_file, "w", encoding="utf-8") as f:
-        yaml.dump(result['yaml'], f, sort_keys=False, Dumper=CleanDumper, allow_unicode=True)
+    results = []
+    failures = []
+    state = ValidationState(get_cli_option("state-db")) if do_validate and incremental else None
+    try:
+        if do_validate or fix_description:
+            lookahead = int(get_cli_option("lookahead", DEFAULT_DOC_LOOKAHEAD))
+            outcomes = iter_cabs_with_docs(filepaths, workers, fast, lookahead, timeout, max_rss)
+        else:
+            cabs = iter_cabs(filepaths, workers, fast=fast, timeout=timeout, max_rss=max_rss)
+            outcomes = ((path, outcome, None) for path, outcome in zip(filepaths, cabs))
+        for filepath, (cab_name, cab, diagnostics), xml_params in outcomes:
+            if cab is None:
+                print(f"❌ Failed to extract {filepath}: {diagnostics['error']}")
+                failures.append(diagnostics)
+                continue
+            result = {'cab_name': cab_name, 'yaml': {'cabs': {cab_name: cab}}}
+            if shared_fragments or shared_anchors or bundle:
+                # Batch outputs are written once at the end, so fixed descriptions go straight into them
+                if fix_description:
+                    fill_missing_descriptions(cab["inputs"], xml_params)
+                if do_validate:
+                    with METRICS.timer("stage_seconds", stage="validate"):
+                        validate_against_xml(cab_name, cab["inputs"], state, xml_params)
+                results.append(result)
+            else:
+                process_task(filepath, do_validate, fix_description, sidecar, result=result, state=state,
+                             xml_params=xml_params)
+    finally:
+        if state is not None:
+            state.close()
 
-    if fix_description:
-        cab_name = result['cab_name']
-        yaml_inputs = result["yaml"]["cabs"][cab_name]["inputs"]
-        xml_data = fetch_xml_parameter_info(cab_name)
-        updated = False
-        for param, data in yaml_inputs.items():
-            if not data.get("info"):
-                xml_info = xml_data.get(param, {}).get("description")
-                if xml_info:
-                    data["info"] = QuotedString(xml_info)
-                    print(f"📘 Filled missing info for '{param}' using XML.")
-                    updated = True
-        if updated:
-            fixed_out_file = f"{cab_name}_fixed.yaml"
-            with open(fixed_out_file, "w", encoding="utf-8") as f:
-                yaml.dump(result["yaml"], f, sort_keys=False, Dumper=CleanDumper, allow_unicode=True)
-            print(f"✅ YAML with fixed descriptions written to: {fixed_out_file}")
+    if bundle:
+        write_bundle(results, bundle)
+        print(f"✅ {len(results)} cab(s) bundled into: {bundle}")
+    elif shared_fragments or shared_anchors:
+        if shared_anchors:
+            written = write_shared_anchors(results)
+        else:
+            written = write_shared_fragments(results)
+        for path in written:
+            if sidecar:
+                write_sidecar(path)
+            print(f"✅ YAML written to: {path}")
+        report_shared_savings(results, written)
 
-    print(f"✅ YAML written to: {out_file}")
-    validate_and_print_summary(result['yaml']['cabs'][result['cab_name']]['inputs'])
-    if do_validate:
-        validate_against_xml(result['cab_name'], result['yaml']['cabs'][result['cab_name']]['inputs'])
+    if DOC_SOURCES.served:
+        print("\n=== Doc Sources ===")
+        print(tabulate([[backend, lookups, f"{mean:.2f}", f"{worst:.2f}"]
+                        for backend, lookups, mean, worst in DOC_SOURCES.summary()],
+                       headers=["backend", "tasks", "mean ms", "max ms"], tablefmt="github"))
+
+    if timeout or max_rss:
+        exceeded = [diagnostics for diagnostics in failures if diagnostics.get("budget")]
+        print(f"⏱️ Task budgets: {describe_budgets(timeout, max_rss)} per task; {len(exceeded)} task(s) exceeded")
+        for diagnostics in exceeded:
+            print(f"   - {diagnostics['source']}: {diagnostics['budget']} ({diagnostics['seconds']:.1f}s)")
+    if failures:
+        print(f"❌ {len(failures)} of {len(filepaths)} task(s) failed")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
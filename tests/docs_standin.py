@@ -0,0 +1,161 @@
+"""
+Local stand-in for the CASA docs site, serving the synthetic pages in `tests/docs`.
+
+Usage:
+    python tests/docs_standin.py [--port=<port>] [--latency=<seconds>] [--error-rate=<fraction>]
+    python generate_stimela_casa_cab.py applycal.py --validate-online --docs-url=http://127.0.0.1:<port>/
+
+The pages are not captures of casadocs.readthedocs.io: they were written by hand
+in the site's parameter-table layout, from the test fixtures' own docstrings. They
+exercise the HTTP, retry, cache and revalidation paths, not the real site's markup
+or content.
+
+Pages are served with an ETag and Last-Modified header and answer conditional
+requests with 304, like the real site. Each request can be delayed by a fixed
+latency, and failures can be injected either at random (`error_rate`, seeded,
+so runs are repeatable) or for the next few requests (`fail_next()`).
+"""
+import email.utils
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SYNTHETIC_DOCS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "docs")
+
+
+class DocsStandIn:
+    """
+    Threaded HTTP server serving synthetic CASA docs pages.
+
+    Args:
+        root (str): Directory mirroring the docs site layout.
+        latency (float): Seconds added to every request.
+        error_rate (float): Fraction of requests answered with `error_status`.
+        error_status (int): Status code of injected failures.
+        seed (int): Seed of the random error injection.
+        port (int): Port to listen on; 0 picks a free one.
+    """
+
+    def __init__(self, root=SYNTHETIC_DOCS_DIR, latency=0.0, error_rate=0.0, error_status=503, seed=0, port=0):
+        self.root = root
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._random = random.Random(seed)
+        self._failures = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """Base URL to pass as `--docs-url` or `STIMELA_CASA_DOCS_URL`."""
+        return f"http://127.0.0.1:{self._server.server_address[1]}/"
+
+    def fail_next(self, count=1, status=503):
+        """Answers the next `count` requests with `status`."""
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def _injected_status(self):
+        with self._lock:
+            if self._failures:
+                return self._failures.pop(0)
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self.error_status
+        return None
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with standin._lock:
+                    standin.in_flight += 1
+                    standin.max_in_flight = max(standin.max_in_flight, standin.in_flight)
+                try:
+                    standin._serve(self)
+                finally:
+                    with standin._lock:
+                        standin.in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _respond(self, handler, status):
+        # Recorded before the response goes out, so a client never sees its request missing from `requests`
+        with self._lock:
+            self.requests.append((handler.path, status))
+        handler.send_response(status)
+
+    def _serve(self, handler):
+        if self.latency:
+            time.sleep(self.latency)
+        status = self._injected_status()
+        path = os.path.normpath(os.path.join(self.root, handler.path.split("?", 1)[0].lstrip("/")))
+        if status is None and (not path.startswith(self.root) or not os.path.isfile(path)):
+            status = 404
+        if status is not None:
+            self._respond(handler, status)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        with open(path, "rb") as f:
+            body = f.read()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        if handler.headers.get("If-None-Match") == etag:
+            self._respond(handler, 304)
+            handler.send_header("ETag", etag)
+            handler.end_headers()
+            return
+        self._respond(handler, 200)
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.send_header("ETag", etag)
+        handler.send_header("Last-Modified", email.utils.formatdate(os.path.getmtime(path), usegmt=True))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    options = dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("--") and "=" in arg)
+    standin = DocsStandIn(latency=float(options.get("latency", 0)), error_rate=float(options.get("error-rate", 0)),
+                          port=int(options.get("port", 0)))
+    print(f"📚 Serving synthetic CASA docs at {standin.url} (Ctrl-C to stop)")
+    try:
+        standin._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Property-based guards against super-linear regex behaviour in the text parsers.
+
+Hypothesis builds short adversarial fragments from the tokens the parsers'
+patterns care about; each property repeats a fragment to a small and a large
+input and checks that the large one costs no more than roughly the size ratio
+times the small one. A pattern that backtracks quadratically (or worse) on
+some fragment fails the ratio by a wide margin.
+"""
+import contextlib
+import io
+import time
+
+import pytest
+
+hypothesis = pytest.importorskip("hypothesis")
+from hypothesis import HealthCheck, example, given, settings, strategies as st  # noqa: E402
+
+from generate_stimela_casa_cab import (  # noqa: E402
+    coerce_text_default, extract_yaml, fuzzy_match, normalize_default, parse_param_docstring, process_block,
+)
+
+SMALL = 1_000
+LARGE = 8_000
+# Linear code scales by LARGE / SMALL; allow three times that for timer noise, but far below quadratic growth (64x)
+MAX_RATIO = 3 * LARGE / SMALL
+# Below this many seconds the small run is dominated by overhead; compare against it instead
+FLOOR = 0.0005
+
+TOKENS = [
+    "default:", "Default: ", "(", ")", "[", "]", "float(", "int(", "numpy.array(", "boolArray=[", "stringArray=[",
+    "'value': ", "'unit': '", "1", "-", ".", ",", " ", "  ", "'", '"', "\\t", "a", "_", "#", ":", "=", "-->",
+]
+fragments = st.lists(st.sampled_from(TOKENS), min_size=1, max_size=12).map("".join)
+
+PROPERTY_SETTINGS = settings(max_examples=40, deadline=None, derandomize=True,
+                             suppress_health_check=[HealthCheck.too_slow])
+
+
+def best_time(func, arg, repeat=3):
+    best = float("inf")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(arg)
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def assert_scales_linearly(func, make_input, fragment):
+    small = make_input(fragment * (SMALL // len(fragment) + 1))
+    large = make_input(fragment * (LARGE // len(fragment) + 1))
+    small_time = max(best_time(func, small), FLOOR)
+    large_time = best_time(func, large)
+    assert large_time <= MAX_RATIO * small_time, (
+        f"{func.__name__} took {large_time:.4f}s on {len(large)} chars vs {small_time:.4f}s on {len(small)}: "
+        f"super-linear on fragment {fragment!r}"
+    )
+
+
+@PROPERTY_SETTINGS
+@given(fragments)
+@example("default:(")
+@example("Default: (boolArray=[")
+def test_process_block_default_line(fragment):
+    assert_scales_linearly(lambda lines: process_block("param", lines), lambda text: ["Description", text], fragment)
+
+
+@PROPERTY_SETTINGS
+@given(fragments)
+@example("default:(")
+@example("a  ")
+def test_parse_param_docstring(fragment):
+    def docstring(text):
+        return f"Summary\n\n    --------- parameter descriptions ---------------------------------------------\n\n" \
+               f"    vis           {text}\n                  default: {text}\n    {text}  {text}\n"
+
+    assert_scales_linearly(parse_param_docstring, docstring, fragment)
+
+
+@PROPERTY_SETTINGS
+@given(fragments)
+@example("1")
+def test_coerce_text_default(fragment):
+    assert_scales_linearly(coerce_text_default, lambda text: text, fragment)
+    assert_scales_linearly(coerce_text_default, lambda text: "float(" + text, fragment)
+
+
+@PROPERTY_SETTINGS
+@given(fragments)
+@example("int(")
+@example("'value': float(1")
+def test_fuzzy_match_and_normalize(fragment):
+    assert_scales_linearly(lambda text: fuzzy_match([1, 2], text), lambda text: text, fragment)
+    def match_quantity(text):
+        return fuzzy_match({"value": 1.0, "unit": "Jy"}, text)
+
+    assert_scales_linearly(match_quantity, lambda text: text, fragment)
+    assert_scales_linearly(match_quantity, lambda text: "'value': float(" + text, fragment)
+    assert_scales_linearly(normalize_default, lambda text: text, fragment)
+
+
+@settings(max_examples=15, deadline=None, derandomize=True, suppress_health_check=[HealthCheck.too_slow])
+@given(fragments.filter(lambda text: '"""' not in text and "\\" not in text))
+@example("default:(")
+def test_fast_path_adversarial_docstring(fragment):
+    def source(text):
+        return (f"class adv:\n    \"\"\"\n    parameter descriptions\n    vis  {text}\n\"\"\"\n"
+                f"    def __call__(self, vis=''):\n        schema = {{'vis': {{'type': 'cStr'}}}}\n        return None\n")
+
+    assert_scales_linearly(lambda src: extract_yaml("adv.py", source=src, fast=True), source, fragment)
@@ -1,7 +1,30 @@
+import ast
+import gc
+import json
+import multiprocessing
 import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import weakref
 import pytest
+import requests
 import yaml
-from generate_stimela_casa_cab import extract_yaml, validate_against_xml, fetch_xml_parameter_info
+import generate_stimela_casa_cab
+from generate_stimela_casa_cab import (
+    collect_task_files, extract_yaml, validate_against_xml, fetch_xml_parameter_info,
+    build_shared_fragments, write_shared_fragments, write_yaml, write_sidecar, load_cab,
+    sidecar_path, make_server, iter_cabs, scan_task_regions, check_golden, structural_diff,
+    evaluate_default, ValidationState, compare_with_xml_incremental, index_tree, query_index,
+    prefetch_docs, RunMetrics, iter_cabs_with_docs, patch_descriptions, run_shard, merge_shards,
+    shard_of, iter_budgeted_cabs, write_bundle, load_manifest, parse_shard_spec, CabBundle,
+    memo_extract_yaml, LRUMemo, fill_missing_descriptions, CabStore, resolve_schema_dtype,
+    extract_schema_dict, make_worker_pool, default_doc_sources, lookup_docs, build_doc_archive,
+    parse_casa_task_xml, FileLock, fuzzy_match, manifest_hash,
+)
+from docs_standin import DocsStandIn
 
 TASK_DIR = "tests/fixtures"
 EXPECTED_DIR = "tests/expected"
@@ -9,6 +32,23 @@ EXPECTED_DIR = "tests/expected"
 # Get all task script files
 TASK_FILES = [f for f in os.listdir(TASK_DIR) if f.endswith(".py")]
 
+
+@pytest.fixture(scope="session")
+def docs_site():
+    """Local stand-in for the CASA docs site serving the synthetic pages."""
+    with DocsStandIn() as standin:
+        yield standin
+
+
+@pytest.fixture
+def standin_docs(docs_site, tmp_path, monkeypatch):
+    """Points doc fetches at the stand-in, with an empty doc cache."""
+    monkeypatch.setenv("STIMELA_CASA_DOCS_URL", docs_site.url)
+    monkeypatch.setenv("STIMELA_CASA_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(generate_stimela_casa_cab, "HTTP_BACKOFF", 0)
+    return docs_site
+
+
 @pytest.mark.parametrize("task_file", TASK_FILES)
 def test_yaml_generation(task_file):
     """Test YAML generation succeeds and contains a valid cab structure."""
@@ -21,6 +61,7 @@ def test_yaml_generation(task_file):
     assert cab is not None, f"Cab section missing in YAML for {task_file}"
     assert "inputs" in cab and isinstance(cab["inputs"], dict), "Missing or invalid 'inputs' section"
 
+
 @pytest.mark.parametrize("task_file", TASK_FILES)
 def test_yaml_against_expected(task_file):
     """Compare YAML output with expected saved version (if available)."""
@@ -35,13 +76,15 @@ def test_yaml_against_expected(task_file):
 
     assert result["yaml"] == expected_yaml, f"YAML mismatch for {cab_base}"
 
+
 @pytest.mark.parametrize("task_file", TASK_FILES)
-def test_xml_validation(task_file):
-    """Validate YAML against online CASA XML metadata."""
+def test_xml_validation(task_file, standin_docs):
+    """Validate YAML against the stand-in's synthetic CASA XML page."""
     result = extract_yaml(os.path.join(TASK_DIR, task_file))
     cab_name = result["cab_name"]
     yaml_inputs = result["yaml"]["cabs"][cab_name]["inputs"]
     xml_inputs = fetch_xml_parameter_info(cab_name)
+    assert xml_inputs, "the stand-in page is fetched and its parameter table parsed"
 
     # Only compare overlapping keys
     for param in yaml_inputs:
@@ -49,20 +92,1002 @@ def test_xml_validation(task_file):
             assert "dtype" in yaml_inputs[param]
             assert "info" in yaml_inputs[param]
 
+
 @pytest.mark.parametrize("task_file", TASK_FILES)
-def test_fix_description(task_file):
+def test_fix_description(task_file, standin_docs):
     """Ensure that --fix-description fills in missing info fields from XML."""
     result = extract_yaml(os.path.join(TASK_DIR, task_file))
     cab_name = result["cab_name"]
     yaml_inputs = result["yaml"]["cabs"][cab_name]["inputs"]
     xml_inputs = fetch_xml_parameter_info(cab_name)
 
-    for param in yaml_inputs:
-        if not yaml_inputs[param].get("info") and xml_inputs.get(param, {}).get("info"):
-            yaml_inputs[param]["info"] = xml_inputs[param]["info"]
+    missing = [param for param, item in yaml_inputs.items() if not item.get("info")]
+    assert sorted(fill_missing_descriptions(yaml_inputs, xml_inputs)) == sorted(missing)
 
     for param, item in yaml_inputs.items():
-        if xml_inputs.get(param, {}).get("info"):
+        if xml_inputs.get(param, {}).get("description"):
             assert item.get("info"), f"Missing info after fix for param: {param}"
 
         # assert item.get("info"), f"Missing info after fix for param: {param}"
+
+
+def test_shared_fragments(tmp_path, capsys):
+    """Identical parameter specs across cabs are emitted once and referenced with _use."""
+    first = extract_yaml(os.path.join(TASK_DIR, "applycal.py"))
+    second = extract_yaml(os.path.join(TASK_DIR, "applycal.py"))
+    second["cab_name"] = "applycal_copy"
+    second["yaml"] = {"cabs": {"applycal_copy": second["yaml"]["cabs"]["applycal"]}}
+
+    fragments, refs = build_shared_fragments([first, second])
+    inputs = first["yaml"]["cabs"]["applycal"]["inputs"]
+    assert len(fragments) == len(inputs)
+    assert refs["applycal"] == refs["applycal_copy"]
+
+    write_shared_fragments([first, second], out_dir=str(tmp_path))
+    with open(tmp_path / "casa_shared_params.yaml") as f:
+        shared = yaml.safe_load(f)["lib"]["params"]["casa"]
+    with open(tmp_path / "applycal_copy.yaml") as f:
+        cab = yaml.safe_load(f)
+    for param, spec in cab["cabs"]["applycal_copy"]["inputs"].items():
+        frag_id = spec["_use"].rsplit(".", 1)[1]
+        assert shared[frag_id] == inputs[param]
+
+    # Nothing shared: no fragment file, and the cabs are written exactly as in the default mode
+    plain_dir = tmp_path / "plain"
+    plain_dir.mkdir()
+    results = [extract_yaml(os.path.join(TASK_DIR, task_file)) for task_file in ("applycal.py", "deconvolve.py")]
+    assert build_shared_fragments(results) == ({}, {})
+    written = write_shared_fragments(results, out_dir=str(plain_dir))
+    assert sorted(os.listdir(plain_dir)) == ["applycal.yaml", "deconvolve.yaml"]
+    for path, result in zip(written, results):
+        assert open(path).read() == generate_stimela_casa_cab.dump_yaml(result["yaml"])
+    generate_stimela_casa_cab.report_shared_savings(results, written)
+    assert "nothing to compare" in capsys.readouterr().out
+
+
+def test_shared_anchors_apply_fix_and_validation(standin_docs, tmp_path, monkeypatch):
+    """--shared-anchors writes one file with aliases, validates each task and fills missing descriptions in it."""
+    generate_stimela_casa_cab.DOCS_MEMO.clear()
+    source = open(os.path.join(TASK_DIR, "applycal.py")).read()
+    (tmp_path / "tasks").mkdir()
+    (tmp_path / "tasks" / "applycal.py").write_text(source)
+    (tmp_path / "tasks" / "applycalcopy.py").write_text(source.replace("applycal", "applycalcopy"))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("sys.argv", ["generate_stimela_casa_cab.py", "tasks", "--shared-anchors", "--fix-description",
+                                     "--validate-online"])
+    generate_stimela_casa_cab.main()
+
+    text = (tmp_path / "casa_cabs.yaml").read_text()
+    cabs = yaml.safe_load(text)["cabs"]
+    assert sorted(cabs) == ["applycal", "applycalcopy"]
+    assert text.count("&") > 0 and cabs["applycal"]["inputs"]["vis"] == cabs["applycalcopy"]["inputs"]["vis"]
+    missing = [param for param, spec in cabs["applycalcopy"]["inputs"].items() if not spec.get("info")]
+    assert missing and all(cabs["applycal"]["inputs"][param]["info"] for param in missing)
+    assert os.path.exists(tmp_path / "applycal_online_validation_report.md")
+    assert not os.path.exists(tmp_path / "applycal.yaml")
+
+
+def test_sidecar_fresh_and_stale(tmp_path):
+    """load_cab() serves the sidecar while it matches the YAML and falls back once the YAML changes."""
+    result = extract_yaml(os.path.join(TASK_DIR, "applycal.py"))
+    yaml_path = str(tmp_path / "applycal.yaml")
+    write_yaml(result["yaml"], yaml_path)
+    write_sidecar(yaml_path)
+    assert load_cab(yaml_path) == yaml.safe_load(open(yaml_path))
+
+    with open(sidecar_path(yaml_path)) as f:
+        sidecar = json.load(f)
+    sidecar["cab"] = {"marker": True}
+    with open(sidecar_path(yaml_path), "w") as f:
+        json.dump(sidecar, f)
+    assert load_cab(yaml_path) == {"marker": True}
+
+    with open(yaml_path, "a") as f:
+        f.write("# edited\n")
+    assert load_cab(yaml_path) == result["yaml"]
+
+
+def test_server_generate_and_shutdown(tmp_path):
+    """The --serve daemon answers concurrent generate requests, confines writes and shuts down on request."""
+    out_dir = tmp_path / "cabs"
+    server = make_server(port=0, out_dir=str(out_dir))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        path = os.path.join(TASK_DIR, "applycal.py")
+        responses = [None] * 6
+        barrier = threading.Barrier(len(responses))
+
+        def post(i):
+            barrier.wait()
+            responses[i] = requests.post(f"{url}/generate", json={"path": path})
+
+        clients = [threading.Thread(target=post, args=(i,)) for i in range(len(responses))]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join(timeout=30)
+        for response in responses:
+            assert response.status_code == 200
+            assert yaml.safe_load(response.json()["yaml"]) == extract_yaml(path)["yaml"]
+        assert requests.post(f"{url}/generate", json={"path": "missing.py"}).status_code == 404
+        assert requests.post(f"{url}/generate", json=[path]).status_code == 400
+        assert requests.post(f"{url}/generate", json="applycal.py").status_code == 400
+
+        written = requests.post(f"{url}/generate", json={"path": path, "out_dir": "batch"})
+        assert written.status_code == 200 and written.json()["written"] == str(out_dir / "batch" / "applycal.yaml")
+        for escape in ("..", str(tmp_path), "batch/../../elsewhere"):
+            assert requests.post(f"{url}/generate", json={"path": path, "out_dir": escape}).status_code == 403
+        assert sorted(os.listdir(tmp_path)) == ["cabs"]
+        with pytest.raises(PermissionError):
+            generate_stimela_casa_cab.GeneratorService().output_dir("cabs")
+
+        assert requests.post(f"{url}/shutdown").status_code == 200
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+    finally:
+        server.server_close()
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_iter_cabs(workers):
+    """iter_cabs() yields one result per source, in input order, and reports failures instead of raising."""
+    paths = [os.path.join(TASK_DIR, task_file) for task_file in sorted(TASK_FILES)]
+    with open(paths[0]) as f:
+        source = f.read()
+    items = paths + [("from_source", source), ("broken", "class (:")]
+
+    results = list(iter_cabs(items, workers=workers))
+    assert [name for name, _, _ in results] == [f.replace(".py", "") for f in sorted(TASK_FILES)] + ["from_source", "broken"]
+    for path, (cab_name, cab, diagnostics) in zip(paths, results):
+        assert cab == extract_yaml(path)["yaml"]["cabs"][cab_name]
+        assert diagnostics["error"] is None
+    assert results[-2][1] == results[0][1]
+    assert results[-1][1] is None and "SyntaxError" in results[-1][2]["error"]
+
+    unordered = list(iter_cabs(paths, workers=workers, ordered=False))
+    assert sorted(name for name, _, _ in unordered) == sorted(name for name, _, _ in results[:len(paths)])
+
+
+@pytest.mark.parametrize("task_file", TASK_FILES)
+def test_fast_parse_matches_ast(task_file):
+    """The tokenizer fast path produces the same cab as the full AST, and falls back for non xml-casa sources."""
+    path = os.path.join(TASK_DIR, task_file)
+    assert scan_task_regions(path) is not None
+    reference = extract_yaml(path)
+    fast = extract_yaml(path, fast=True)
+    assert (fast["yaml"], fast["schema"]) == (reference["yaml"], reference["schema"])
+
+    with open(path) as f:
+        source = f.read().split("\n", 2)[2]
+    assert scan_task_regions(path, source=source) is None
+    assert extract_yaml(path, source=source, fast=True)["yaml"] == reference["yaml"]
+
+
+@pytest.mark.parametrize("returns, has_outputs", [
+    ("return(task_result)", True),
+    ("return  # nothing to hand back", False),
+    ('"""\n        return x\n        """\n        return', False),
+])
+def test_fast_parse_matches_ast_returns(returns, has_outputs):
+    """The fast path decides `has_outputs` from tokens, as the AST does, not from lines."""
+    path = os.path.join(TASK_DIR, "applycal.py")
+    with open(path) as f:
+        source = f.read().replace("        return task_result\n", f"        {returns}\n")
+    assert scan_task_regions(path, source=source)["has_outputs"] is has_outputs
+    reference = extract_yaml(path, source=source)
+    fast = extract_yaml(path, source=source, fast=True)
+    assert (fast["yaml"], fast["schema"]) == (reference["yaml"], reference["schema"])
+
+
+def test_check_golden(tmp_path, capsys):
+    """--check-golden passes on the stored corpus and prints a structural diff for a mismatch."""
+    assert check_golden(TASK_DIR, EXPECTED_DIR, workers=2)
+
+    with open(os.path.join(EXPECTED_DIR, "applycal.yaml")) as f:
+        expected = yaml.safe_load(f)
+    expected["cabs"]["applycal"]["inputs"]["vis"]["dtype"] = "File"
+    del expected["cabs"]["applycal"]["inputs"]["field"]
+    with open(tmp_path / "applycal.yaml", "w") as f:
+        yaml.safe_dump(expected, f)
+
+    capsys.readouterr()
+    assert not check_golden(TASK_DIR, str(tmp_path), workers=1)
+    out = capsys.readouterr().out
+    assert "cabs.applycal.inputs.vis.dtype: expected 'File', got 'MS'" in out
+    assert "cabs.applycal.inputs.field: unexpected" in out
+    assert structural_diff({"a": [1]}, {"a": [1]}) == []
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("int(2)", 2),
+    ("float(-1.5)", -1.5),
+    ("[ bool(True), bool(False) ]", [True, False]),
+    ("numpy.array([ int(1), float(2.0) ])", [1, 2.0]),
+    ("{'value': float(0.0), 'unit': 'mJy'}", {"value": 0.0, "unit": "mJy"}),
+    ("''", ""),
+    ("[  ]", []),
+])
+def test_evaluate_default(text, expected):
+    """CASA constructor defaults are evaluated straight from the signature AST."""
+    value = evaluate_default(ast.parse(text, mode="eval").body)
+    assert value == expected and type(value) is type(expected)
+
+
+def test_evaluate_default_rejects_expressions():
+    with pytest.raises(ValueError):
+        evaluate_default(ast.parse("os.getcwd()", mode="eval").body)
+
+
+@pytest.mark.parametrize("local, xml, expected", [
+    ([1, 2], "numpy.array([int(1), int(2)])", True),
+    ([1.5, -2], "[float(1.5), int(-2)]", True),
+    ([], "numpy.array([])", True),
+    ([1, 3], "numpy.array([int(1), int(2)])", False),
+    (10, "int(10)", True),
+    ({"value": 0.0, "unit": "mJy"}, "{'value': float(0.0), 'unit': 'mJy'}", True),
+])
+def test_fuzzy_match(local, xml, expected):
+    """Local defaults match their constructor-wrapped XML spelling."""
+    assert fuzzy_match(local, xml) is expected
+
+
+def test_unevaluable_defaults_keep_source_text(tmp_path):
+    """Defaults that raise TypeError when evaluated fall back to their source text instead of aborting extraction."""
+    with pytest.raises(TypeError):
+        evaluate_default(ast.parse("{[1]: 2}", mode="eval").body)
+    source = open(os.path.join(TASK_DIR, "applycal.py")).read()
+    source = source.replace("gaintable=[  ]", "gaintable={[1]: 2}", 1).replace("calwt=[ bool(True) ]", "calwt=int([1])", 1)
+    assert "gaintable={[1]: 2}" in source and "calwt=int([1])" in source
+    inputs = extract_yaml(str(tmp_path / "applycal.py"), source=source)["yaml"]["cabs"]["applycal"]["inputs"]
+    assert inputs["gaintable"]["default"] == "{[1]: 2}"
+    assert inputs["calwt"]["default"] == "int([1])"
+
+
+def test_incremental_validation(tmp_path):
+    """Only parameters whose spec or doc entry changed are validated again."""
+    result = extract_yaml(os.path.join(TASK_DIR, "applycal.py"))
+    inputs = result["yaml"]["cabs"]["applycal"]["inputs"]
+    xml_params = {param: {"default": "''", "description": spec["info"]} for param, spec in inputs.items()}
+
+    state = ValidationState(str(tmp_path / "state.sqlite"))
+    first = compare_with_xml_incremental("applycal", inputs, xml_params, state)
+    assert {row[-1] for row in first} == {"fresh"}
+
+    second = compare_with_xml_incremental("applycal", inputs, xml_params, state)
+    assert {row[-1] for row in second} == {"cached"}
+    assert [row[:-1] for row in second] == [row[:-1] for row in first]
+
+    xml_params["field"]["description"] = "Changed upstream"
+    inputs["spw"]["info"] = "Edited locally"
+    third = {row[0]: row[-1] for row in compare_with_xml_incremental("applycal", inputs, xml_params, state)}
+    assert third.pop("field") == "fresh" and third.pop("spw") == "fresh"
+    assert set(third.values()) == {"cached"}
+    state.close()
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+
+def test_doc_cache_revalidation(tmp_path, monkeypatch):
+    """Parsed doc pages are cached on disk and revalidated with conditional requests."""
+    monkeypatch.setenv("STIMELA_CASA_CACHE_DIR", str(tmp_path))
+    page = "<table><tr><th>a</th></tr><tr><td>vis</td><td>''</td><td>Name of input visibility file</td></tr></table>"
+    sent_headers = []
+
+    def fake_get(url, headers=None, **kwargs):
+        sent_headers.append(headers or {})
+        if (headers or {}).get("If-None-Match") == '"v1"':
+            return FakeResponse(304)
+        return FakeResponse(200, page, {"ETag": '"v1"'})
+
+    monkeypatch.setattr(requests, "get", fake_get)
+    expected = {"vis": {"default": "''", "description": "Name of input visibility file"}}
+    assert fetch_xml_parameter_info("applycal") == expected
+    assert fetch_xml_parameter_info("applycal") == expected
+    assert len(sent_headers) == 1, "a fresh cache entry is served without network access"
+    assert fetch_xml_parameter_info("applycal", max_age=0) == expected
+    assert sent_headers[1]["If-None-Match"] == '"v1"'
+
+    def offline(url, headers=None, **kwargs):
+        raise requests.ConnectionError("offline")
+
+    monkeypatch.setattr(requests, "get", offline)
+    monkeypatch.setattr(generate_stimela_casa_cab, "HTTP_BACKOFF", 0)
+    assert fetch_xml_parameter_info("applycal", max_age=0) == expected
+
+
+def test_index_and_query(tmp_path):
+    """The SQLite index answers dtype and CASA type questions and skips unchanged tasks on re-index."""
+    db_path = str(tmp_path / "index.sqlite")
+    with pytest.raises(FileNotFoundError, match="--index"):
+        query_index(db_path)
+    assert not os.path.exists(db_path)
+    assert index_tree([TASK_DIR], db_path, workers=1) == (len(TASK_FILES), 0, 0, [])
+    assert index_tree([TASK_DIR], db_path, workers=1) == (0, len(TASK_FILES), 0, [])
+
+    assert query_index(db_path, param="spw", dtype="str") == [("applycal", "spw", "str", "cStr", '""')]
+    variants = {(task, param) for task, param, _, _, _ in query_index(db_path, casa_type="cVariant")}
+    assert ("deconvolve", "threshold") in variants and ("applycal", "spwmap") in variants
+    assert len(query_index(db_path, task="applycal")) == len(extract_yaml(os.path.join(TASK_DIR, "applycal.py"))["yaml"]["cabs"]["applycal"]["inputs"])
+
+
+def test_index_keeps_trees_apart_and_prunes(tmp_path):
+    """Same-named tasks from two trees are both indexed, broken wrappers are skipped and deleted ones removed."""
+    db_path = str(tmp_path / "index.sqlite")
+    source = open(os.path.join(TASK_DIR, "applycal.py")).read()
+    for tree in ("old", "new"):
+        (tmp_path / tree).mkdir()
+        (tmp_path / tree / "applycal.py").write_text(source)
+    (tmp_path / "new" / "broken.py").write_text("def broken(:\n")
+
+    indexed, unchanged, removed, failed = index_tree([str(tmp_path / "old"), str(tmp_path / "new")], db_path, workers=1)
+    assert (indexed, unchanged, removed) == (2, 0, 0)
+    assert [os.path.basename(path) for path, _ in failed] == ["broken.py"]
+    assert len(query_index(db_path, task="applycal", param="vis")) == 2
+
+    (tmp_path / "old" / "applycal.py").unlink()
+    assert index_tree([str(tmp_path / "new")], db_path, workers=1) == (0, 2, 1, [])
+    assert len(query_index(db_path, task="applycal", param="vis")) == 1
+
+
+def test_prefetch_reports_changes(tmp_path, monkeypatch):
+    """--prefetch crawls every task in the XML index and reports what changed since the previous crawl."""
+    monkeypatch.setenv("STIMELA_CASA_CACHE_DIR", str(tmp_path))
+    index = '<a href="../tasks611/applycal.xml.html">applycal</a><a href="../tasks611/flagdata.xml.html">flagdata</a>'
+    pages = {
+        "applycal": "<table><tr></tr><tr><td>vis</td><td>''</td><td>Input MS</td></tr></table>",
+        "flagdata": "<table><tr></tr><tr><td>mode</td><td>'manual'</td><td>Flagging mode</td></tr></table>",
+    }
+
+    def fake_get(url, headers=None, **kwargs):
+        if url.endswith("XML611.html"):
+            return FakeResponse(200, index)
+        return FakeResponse(200, pages[url.rsplit("/", 1)[1].split(".")[0]])
+
+    monkeypatch.setattr(requests, "get", fake_get)
+    assert prefetch_docs(concurrency=2)["added"] == ["applycal", "flagdata"]
+
+    pages["flagdata"] = pages["flagdata"].replace("Flagging mode", "Mode of flagging")
+    changes = prefetch_docs(concurrency=2)
+    assert changes["changed"] == ["flagdata"] and changes["unchanged"] == ["applycal"]
+    assert fetch_xml_parameter_info("flagdata")["mode"]["description"] == "Mode of flagging"
+
+    index = ""
+    with pytest.raises(ValueError, match="No task pages"):
+        prefetch_docs(concurrency=2)
+    assert json.load(open(tmp_path / "docs" / "_crawl.json"))["tasks"] == ["applycal", "flagdata"]
+
+
+def test_run_metrics_export(tmp_path):
+    """Run metrics render as Prometheus text exposition and as JSON."""
+    metrics = RunMetrics(buckets=(0.1, 1.0))
+    metrics.inc("tasks_total", status="ok")
+    metrics.inc("tasks_total", status="ok")
+    metrics.observe("stage_seconds", 0.05, stage="parse")
+    metrics.observe("stage_seconds", 0.5, stage="parse")
+
+    text = metrics.to_prometheus()
+    assert "# TYPE stimela_casa_tasks_total counter" in text
+    assert 'stimela_casa_tasks_total{status="ok"} 2' in text
+    assert 'stimela_casa_stage_seconds_bucket{stage="parse",le="0.1"} 1' in text
+    assert 'stimela_casa_stage_seconds_bucket{stage="parse",le="+Inf"} 2' in text
+    assert "stimela_casa_tasks_per_second " in text
+
+    metrics.write(str(tmp_path / "metrics.json"))
+    with open(tmp_path / "metrics.json") as f:
+        snapshot = json.load(f)
+    assert snapshot["counters"] == [{"name": "tasks_total", "labels": {"status": "ok"}, "value": 2}]
+    assert snapshot["histograms"][0]["count"] == 2
+
+    # Concurrent writers (periodic thread and exit flush) use their own temp files
+    errors = []
+
+    def writer():
+        try:
+            for _ in range(50):
+                metrics.write(str(tmp_path / "metrics.prom"))
+        except OSError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert sorted(os.listdir(tmp_path)) == ["metrics.json", "metrics.prom"]
+
+
+def test_pipelined_docs_fetched_once_and_ahead(monkeypatch):
+    """Doc pages are fetched ahead of extraction and exactly once per task."""
+    calls = []
+    started = threading.Event()
+
+    def fake_fetch(task_name):
+        calls.append(task_name)
+        if task_name == "deconvolve":
+            started.set()
+        return {"task": task_name}
+
+    monkeypatch.setattr(generate_stimela_casa_cab, "lookup_docs", fake_fetch)
+    paths = [os.path.join(TASK_DIR, name) for name in ("applycal.py", "deconvolve.py", "applycal.py")]
+    seen = []
+    for filepath, (cab_name, cab, _), xml_params in iter_cabs_with_docs(paths, lookahead=2):
+        if not seen:
+            assert started.wait(5), "docs for the next task are fetched while the first is processed"
+        assert xml_params == {"task": cab_name}
+        seen.append(cab_name)
+    assert seen == ["applycal", "deconvolve", "applycal"]
+    assert sorted(calls) == ["applycal", "deconvolve"]
+
+
+def test_pipelined_docs_are_released_after_use(tmp_path, monkeypatch):
+    """Docs are dropped once their task is done, so a long run holds only about `lookahead` pages."""
+    class Docs(dict):
+        pass
+
+    alive = []
+
+    def fake_fetch(task_name):
+        docs = Docs(task=task_name)
+        alive.append(weakref.ref(docs))
+        return docs
+
+    monkeypatch.setattr(generate_stimela_casa_cab, "lookup_docs", fake_fetch)
+    source = open(os.path.join(TASK_DIR, "applycal.py")).read()
+    paths = []
+    for i in range(12):
+        path = tmp_path / f"task{i}.py"
+        path.write_text(source)
+        paths.append(str(path))
+    held = []
+    for _, _, xml_params in iter_cabs_with_docs(paths, lookahead=2):
+        del xml_params
+        held.append(sum(ref() is not None for ref in alive))
+    assert len(alive) == 12 and max(held) <= 4
+
+
+def test_patch_descriptions_preserves_formatting(tmp_path):
+    """Empty info fields are spliced in place; all other bytes stay as they were."""
+    with open(os.path.join(EXPECTED_DIR, "applycal.yaml")) as f:
+        original = f.read()
+    original = "# hand-tuned cab\n" + original.replace('info: "Select field using field id(s) or field name(s)"', "info: ''  # todo")
+    yaml_path = tmp_path / "applycal.yaml"
+    yaml_path.write_text(original)
+
+    docs = {"observation": {"description": "Select by observation ID(s)"}, "field": {"description": 'Field "id"'}}
+    patched = patch_descriptions(str(yaml_path), docs_lookup=lambda task: docs)
+    assert sorted(patched) == [("applycal", "field"), ("applycal", "observation")]
+
+    result = yaml_path.read_text()
+    assert result.replace('info: "Field \\"id\\""  # todo', "info: ''  # todo").replace(
+        'info: "Select by observation ID(s)"', 'info: ""', 1) == original
+    with open(os.path.join(EXPECTED_DIR, "applycal_fixed.yaml")) as f:
+        fixed = yaml.safe_load(f)
+    fixed["cabs"]["applycal"]["inputs"]["field"]["info"] = 'Field "id"'
+    assert yaml.safe_load(result) == fixed
+
+
+def test_patch_descriptions_multiline_and_null_info(tmp_path):
+    """A bare `info:` continued on deeper-indented lines is not empty; `~` and `null` are."""
+    yaml_path = tmp_path / "applycal.yaml"
+    yaml_path.write_text(
+        "cabs:\n  applycal:\n    inputs:\n"
+        "      vis:\n        dtype: str\n        info:\n          Name of input\n          visibility file\n"
+        "      field:\n        info: ~\n"
+        "      spw:\n        info: null\n"
+    )
+    docs = {name: {"description": f"{name} from docs"} for name in ("vis", "field", "spw")}
+    assert sorted(patch_descriptions(str(yaml_path), docs_lookup=lambda task: docs)) == [
+        ("applycal", "field"), ("applycal", "spw")]
+    inputs = yaml.safe_load(yaml_path.read_text())["cabs"]["applycal"]["inputs"]
+    assert inputs["vis"]["info"] == "Name of input visibility file"
+    assert inputs["field"]["info"] == "field from docs" and inputs["spw"]["info"] == "spw from docs"
+
+
+def test_sharded_generation_merges_to_full_set(tmp_path):
+    """Shards split the manifest deterministically and merge into a verified, complete cab set."""
+    manifest = tmp_path / "tasks.txt"
+    manifest.write_text("# all fixtures\n" + os.path.abspath(TASK_DIR) + "\n")
+    assert shard_of("applycal", 3) == shard_of("applycal", 3)
+
+    shards_dir = tmp_path / "shards"
+    run_shard(str(manifest), 0, 2, str(shards_dir))
+    with pytest.raises(ValueError, match="Missing"):
+        merge_shards(str(manifest), str(shards_dir), str(tmp_path / "cabs"))
+    run_shard(str(manifest), 1, 2, str(shards_dir))
+    verification = merge_shards(str(manifest), str(shards_dir), str(tmp_path / "cabs"))
+
+    for task_file in TASK_FILES:
+        cab_name = task_file[:-3]
+        with open(tmp_path / "cabs" / f"{cab_name}.yaml") as f:
+            assert yaml.safe_load(f) == extract_yaml(os.path.join(TASK_DIR, task_file))["yaml"]
+    assert (tmp_path / "cabs" / "cabs.sha256").read_text().endswith(f"{verification}  *\n")
+
+    tampered = shards_dir / f"shard-{shard_of('applycal', 2)}-of-2" / "applycal.yaml"
+    tampered.write_text(tampered.read_text().replace("applycal", "applycal2", 1))
+    with pytest.raises(ValueError, match="recorded hash"):
+        merge_shards(str(manifest), str(shards_dir), str(tmp_path / "again"))
+
+    # Same task names from other wrapper files, or edited in place, are different inputs
+    edited = tmp_path / "edited"
+    edited.mkdir()
+    for task_file in TASK_FILES:
+        (edited / task_file).write_text(open(os.path.join(TASK_DIR, task_file)).read())
+    manifest.write_text(str(edited) + "\n")
+    with pytest.raises(ValueError, match="different manifest"):
+        merge_shards(str(manifest), str(shards_dir), str(tmp_path / "edited-cabs"))
+    before = manifest_hash(load_manifest(str(manifest)))
+    (edited / "applycal.py").write_text((edited / "applycal.py").read_text() + "\n")
+    assert manifest_hash(load_manifest(str(manifest))) != before
+
+
+def test_manifest_rejects_duplicate_tasks_and_bad_shards(tmp_path, capsys, monkeypatch):
+    """Two wrappers with one task name, and malformed --shard values, are reported instead of overwriting cabs."""
+    for release in ("6.1", "6.2"):
+        (tmp_path / release).mkdir()
+        (tmp_path / release / "applycal.py").write_text(open(os.path.join(TASK_DIR, "applycal.py")).read())
+    manifest = tmp_path / "tasks.txt"
+    manifest.write_text("6.1\n6.1/applycal.py\n")
+    assert load_manifest(str(manifest)) == [str(tmp_path / "6.1" / "applycal.py")]
+    manifest.write_text("6.1\n6.2\n")
+    with pytest.raises(ValueError, match="listed twice"):
+        load_manifest(str(manifest))
+
+    assert parse_shard_spec("1/3") == (1, 3)
+    for spec in ("3/3", "-1/2", "0/0", "a/2", "1"):
+        with pytest.raises(ValueError, match="Invalid shard"):
+            parse_shard_spec(spec)
+    monkeypatch.setattr("sys.argv", ["generate_stimela_casa_cab.py", "--shard=2/2", f"--manifest={manifest}"])
+    with pytest.raises(SystemExit) as exit_info:
+        generate_stimela_casa_cab.main()
+    assert exit_info.value.code == 1 and "Invalid shard" in capsys.readouterr().out
+
+
+def test_unknown_casa_version_from_environment_is_rejected(tmp_path, capsys, monkeypatch):
+    """A release without known docs is reported up front, also when it is selected through STIMELA_CASA_VERSION."""
+    monkeypatch.setenv("STIMELA_CASA_VERSION", "9.9")
+    task_file = os.path.abspath(os.path.join(TASK_DIR, "applycal.py"))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("sys.argv", ["generate_stimela_casa_cab.py", task_file, "--validate-online"])
+    with pytest.raises(SystemExit) as exit_info:
+        generate_stimela_casa_cab.main()
+    assert exit_info.value.code == 1 and "No documentation known for CASA 9.9" in capsys.readouterr().out
+    assert os.listdir(tmp_path) == []
+
+
+def runaway_task(item, fast=False):
+    """Stand-in for extract_task() in budgeted workers: the 'stall' item hangs and the 'hog' item grabs memory."""
+    cab_name = item[0] if isinstance(item, tuple) else None
+    if cab_name == "stall":
+        time.sleep(60)
+    if cab_name == "hog":
+        hog = b"x" * (512 * 2**20)  # noqa: F841
+        time.sleep(60)
+    return generate_stimela_casa_cab.extract_task(item, fast)
+
+
+@pytest.mark.parametrize("start_method", [method for method in ("fork", "spawn", "forkserver")
+                                          if method in multiprocessing.get_all_start_methods()])
+def test_budgets_kill_runaway_tasks(start_method):
+    """Tasks over their time or memory budget are killed and recorded; the pool carries on, under every start method."""
+    applycal = os.path.join(TASK_DIR, "applycal.py")
+    items = [("stall", ""), applycal, ("hog", ""), applycal]
+    start = time.monotonic()
+    outcomes = list(iter_budgeted_cabs(items, workers=2, timeout=2, max_rss=256 * 2**20,
+                                       context=multiprocessing.get_context(start_method), extract=runaway_task))
+    assert time.monotonic() - start < 30
+
+    assert [cab_name for cab_name, _, _ in outcomes] == ["stall", "applycal", "hog", "applycal"]
+    assert [diagnostics.get("budget") for _, _, diagnostics in outcomes] == ["time", None, "memory", None]
+    assert outcomes[0][1] is None and "TimeBudgetExceeded" in outcomes[0][2]["error"]
+    assert outcomes[3][1] == extract_yaml(applycal)["yaml"]["cabs"]["applycal"]
+
+
+def test_bundle_loads_single_cabs(tmp_path):
+    """A bundle decodes only the requested cab, and detects corrupted blobs."""
+    results = [extract_yaml(os.path.join(TASK_DIR, task_file)) for task_file in TASK_FILES]
+    path = str(tmp_path / "casa.cabs")
+    write_bundle(results, path)
+
+    with CabBundle(path) as bundle:
+        assert bundle.names() == sorted(result["cab_name"] for result in results)
+        for result in results:
+            assert bundle.load(result["cab_name"]) == result["yaml"]["cabs"][result["cab_name"]]
+        assert "nosuchtask" not in bundle
+        offset, length, _ = bundle._index["applycal"]
+        data_start = bundle._data_start
+
+    raw = bytearray(open(path, "rb").read())
+    raw[data_start + offset + length // 2] ^= 1
+    with open(path, "wb") as f:
+        f.write(raw)
+    with CabBundle(path) as bundle:
+        with pytest.raises(ValueError, match="corrupt"):
+            bundle.load("applycal")
+
+
+def test_bundle_with_fixed_descriptions(standin_docs, tmp_path, monkeypatch):
+    """--bundle with --fix-description packs cabs whose missing descriptions were filled from the docs."""
+    generate_stimela_casa_cab.DOCS_MEMO.clear()
+    task_file = os.path.abspath(os.path.join(TASK_DIR, "applycal.py"))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("sys.argv", ["generate_stimela_casa_cab.py", task_file, "--bundle=casa.cabs", "--fix-description"])
+    generate_stimela_casa_cab.main()
+
+    unfixed = extract_yaml(task_file)["yaml"]["cabs"]["applycal"]["inputs"]
+    missing = [param for param, spec in unfixed.items() if not spec.get("info")]
+    with CabBundle(str(tmp_path / "casa.cabs")) as bundle:
+        inputs = bundle.load("applycal")["inputs"]
+    assert missing and all(inputs[param]["info"] for param in missing)
+    assert not os.path.exists(tmp_path / "applycal_fixed.yaml")
+
+
+def test_memo_returns_private_copies(tmp_path, standin_docs):
+    """Memoized extraction and docs match the unmemoized calls, hand out copies and evict least recently used."""
+    path = tmp_path / "applycal.py"
+    path.write_text(open(os.path.join(TASK_DIR, "applycal.py")).read())
+    generate_stimela_casa_cab.EXTRACT_MEMO.clear()
+
+    first = memo_extract_yaml(str(path))
+    first["yaml"]["cabs"]["applycal"]["inputs"].clear()
+    second = memo_extract_yaml(str(path))
+    assert second["yaml"] == extract_yaml(str(path))["yaml"]
+    assert generate_stimela_casa_cab.EXTRACT_MEMO.stats()["hits"] == 1
+
+    path.write_text(path.read_text() + "\n# edited\n")
+    assert memo_extract_yaml(str(path))["yaml"] == second["yaml"]
+    assert generate_stimela_casa_cab.memo_stats()["extract"]["misses"] == 2
+
+    generate_stimela_casa_cab.DOCS_MEMO.clear()
+    docs = lookup_docs("applycal")
+    docs.clear()
+    assert lookup_docs("applycal") == fetch_xml_parameter_info("applycal") != {}
+    assert generate_stimela_casa_cab.memo_stats()["docs"]["hits"] == 1
+
+    memo = LRUMemo(maxsize=2)
+    memo.put("a", 1)
+    memo.put("b", 2)
+    memo.get("a")
+    memo.put("c", 3)
+    assert memo.get("b") is None and memo.get("a") == 1
+    assert memo.stats() == {"hits": 2, "misses": 1, "evictions": 1, "size": 2, "maxsize": 2}
+
+
+def test_docs_standin_retry_revalidate_and_concurrency(tmp_path, monkeypatch):
+    """Fetch retries, conditional revalidation, offline fallback and crawl concurrency against the stand-in."""
+    monkeypatch.setenv("STIMELA_CASA_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(generate_stimela_casa_cab, "HTTP_BACKOFF", 0)
+    with DocsStandIn(latency=0.2) as standin:
+        monkeypatch.setenv("STIMELA_CASA_DOCS_URL", standin.url)
+
+        standin.fail_next(2)
+        docs = fetch_xml_parameter_info("applycal")
+        assert docs["observation"]["description"] == "Select by observation ID(s)"
+        assert [status for _, status in standin.requests] == [503, 503, 200]
+
+        assert fetch_xml_parameter_info("applycal", max_age=0) == docs
+        assert standin.requests[-1][1] == 304
+
+        standin.fail_next(3, status=500)
+        assert fetch_xml_parameter_info("applycal", max_age=0) == docs, "cached copy is used when the site fails"
+
+        assert prefetch_docs(concurrency=2)["added"] == ["deconvolve"]
+        assert standin.max_in_flight == 2
+
+
+def test_cab_store_dedups_across_releases(tmp_path):
+    """A new release re-extracts only changed wrappers, and identical cabs and parameters are stored once."""
+    release_61 = tmp_path / "6.1"
+    release_62 = tmp_path / "6.2"
+    for release in (release_61, release_62):
+        release.mkdir()
+        for task_file in TASK_FILES:
+            (release / task_file).write_text(open(os.path.join(TASK_DIR, task_file)).read())
+    changed = release_62 / "applycal.py"
+    changed.write_text(changed.read_text().replace("parang=False, applymode", "parang=True, applymode"))
+
+    store = CabStore(str(tmp_path / "store"))
+    assert sorted(store.update_release("6.1", collect_task_files([str(release_61)]))["extracted"]) == ["applycal", "deconvolve"]
+    objects_61 = store.stats()["objects"]
+    metrics = generate_stimela_casa_cab.METRICS
+    hits = metrics.counter("cab_cache_total", layer="store", result="hit")
+    misses = metrics.counter("cab_cache_total", layer="store", result="miss")
+    report = store.update_release("6.2", collect_task_files([str(release_62)]))
+    assert report == {"extracted": ["applycal"], "reused": ["deconvolve"], "failed": []}
+    assert metrics.counter("cab_cache_total", layer="store", result="hit") == hits + 1
+    assert metrics.counter("cab_cache_total", layer="store", result="miss") == misses + 1
+
+    stats = store.stats()
+    assert stats["tasks"] == 4 and stats["unique_cabs"] == 3
+    assert stats["objects"] == objects_61 + 2, "only the changed parameter and its cab are new"
+    assert store.load_cab("6.1", "applycal") == extract_yaml(os.path.join(TASK_DIR, "applycal.py"))["yaml"]["cabs"]["applycal"]
+    assert store.load_cab("6.2", "applycal")["inputs"]["parang"]["default"] is True
+
+    for path in store.export_release("6.1", str(tmp_path / "cabs-6.1")):
+        with open(path) as exported, open(os.path.join(EXPECTED_DIR, os.path.basename(path))) as expected:
+            assert exported.read() == expected.read()
+
+    for label in ("typo", "6.2/../x", ""):
+        with pytest.raises(ValueError, match="Invalid CASA release"):
+            store.update_release(label, collect_task_files([str(release_61)]))
+    assert store.releases() == ["6.1", "6.2"]
+
+
+def test_resolve_schema_dtype_anyof():
+    """`anyof` fragments resolve to Union dtypes, memoized by structure regardless of coerce callables."""
+    generate_stimela_casa_cab.DTYPE_CACHE.clear()
+    assert resolve_schema_dtype({"type": "cFloat"}) == "float"
+    assert resolve_schema_dtype({"anyof": [{"type": "cStr", "coerce": "a"}, {"type": "cStrVec"}]}) == "Union[str, List[str]]"
+    assert resolve_schema_dtype({"anyof": [{"type": "cStrVec"}, {"type": "cStr", "coerce": "b"}]}) == "Union[str, List[str]]"
+    assert resolve_schema_dtype({"anyof": [{"type": "cInt"}, {"type": "cStr"}, {"type": "cStrVec"}]}) == "Union[int, str, List[str]]"
+    assert resolve_schema_dtype({"anyof": [{"type": "cStr"}, {"type": "cVariant"}]}) == "Any"
+    assert resolve_schema_dtype({"anyof": [{"type": "cStr", "coerce": "c"}, {"type": "cStrVec"}]}) == "Union[str, List[str]]"
+    assert len(generate_stimela_casa_cab.DTYPE_CACHE) == 5
+
+    schema = extract_yaml(os.path.join(TASK_DIR, "deconvolve.py"))["schema"]
+    assert [alt["type"] for alt in schema["scales"]["anyof"]] == ["cIntVec", "cFloatVec"]
+
+
+def test_extract_schema_dict_reads_only_used_keys(monkeypatch):
+    """The schema extractor reads type/anyof/allowed constants without evaluating or unparsing anything."""
+    def forbidden(*args, **kwargs):
+        raise AssertionError("schema values must be read without literal_eval/unparse")
+
+    node = ast.parse(
+        "{'mode': {'type': 'cStr', 'coerce': _coerce.to_str, 'allowed': ['a', 'b']},"
+        " 'mask': {'anyof': [{'type': 'cStr', 'coerce': _coerce.to_str}, {'type': 'cStrVec', 'coerce': [f, g]}]},"
+        " 'niter': {'type': 'cInt', 'min': -1}, 'odd': {'type': name}}", mode="eval").body
+    monkeypatch.setattr(ast, "literal_eval", forbidden)
+    monkeypatch.setattr(ast, "unparse", forbidden)
+    assert extract_schema_dict(node) == {
+        "mode": {"type": "cStr", "allowed": ["a", "b"]},
+        "mask": {"anyof": [{"type": "cStr"}, {"type": "cStrVec"}]},
+        "niter": {"type": "cInt"},
+        "odd": {},
+    }
+
+
+def test_worker_pool_is_warm_started():
+    """Batch workers come from the warm-start context and have frozen their heap before the first task."""
+    with make_worker_pool(1) as executor:
+        assert executor.submit(gc.get_freeze_count).result() > 0
+        cab_name, cab, _ = executor.submit(generate_stimela_casa_cab.extract_task, os.path.join(TASK_DIR, "applycal.py")).result()
+    assert cab == extract_yaml(os.path.join(TASK_DIR, "applycal.py"))["yaml"]["cabs"]["applycal"]
+
+
+def test_in_process_extraction_leaves_gc_alone(monkeypatch):
+    """Outside worker processes extract_task() never switches off the process-wide GC."""
+    def forbidden():
+        raise AssertionError("gc.disable() called in-process")
+
+    monkeypatch.setattr(gc, "disable", forbidden)
+    _, cab, diagnostics = generate_stimela_casa_cab.extract_task(os.path.join(TASK_DIR, "applycal.py"))
+    assert diagnostics["error"] is None and cab["inputs"] and gc.isenabled()
+
+
+APPLYCAL_TASK_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<casaxml xmlns="http://casa.nrao.edu/schema/psetTypes.html">
+<task type="function" name="applycal" category="calibration">
+<shortdescription>Apply calibrations solutions(s) to data</shortdescription>
+<input>
+    <param type="string" name="vis" mustexist="true">
+        <shortdescription>Name of input visibility file</shortdescription>
+        <description>Name of input visibility file
+                     Default: none</description>
+        <value/>
+    </param>
+    <param type="boolArray" name="calwt">
+        <shortdescription>Calibrate data weights per gaintable.</shortdescription>
+        <value><value>true</value></value>
+    </param>
+    <param type="bool" name="parang">
+        <shortdescription>Apply parallactic angle correction</shortdescription>
+        <value>false</value>
+    </param>
+</input>
+<constraints>
+    <when param="docallib"><equals type="bool" value="false"><default param="calwt"><value>true</value></default></equals></when>
+</constraints>
+</task>
+</casaxml>
+"""
+
+
+def test_parse_casa_task_xml():
+    """CASA task XML parameters map to Python-literal defaults and collapsed short descriptions."""
+    assert parse_casa_task_xml(APPLYCAL_TASK_XML) == {
+        "vis": {"default": "''", "description": "Name of input visibility file"},
+        "calwt": {"default": "[True]", "description": "Calibrate data weights per gaintable."},
+        "parang": {"default": "False", "description": "Apply parallactic angle correction"},
+    }
+
+
+def test_doc_source_chain_serves_from_first_backend(standin_docs, tmp_path, monkeypatch):
+    """Docs come from memo, local XML, archive, disk cache or network, in that order, and each lookup is recorded."""
+    chain = default_doc_sources()
+    monkeypatch.setattr(generate_stimela_casa_cab, "DOC_SOURCES", chain)
+    generate_stimela_casa_cab.DOCS_MEMO.clear()
+    xml_params = parse_casa_task_xml(APPLYCAL_TASK_XML)
+    xml_dir = tmp_path / "xml"
+    xml_dir.mkdir()
+    (xml_dir / "applycal.xml").write_text(APPLYCAL_TASK_XML)
+    monkeypatch.setenv("STIMELA_CASA_XML_DIR", str(xml_dir))
+    cached_page = os.path.join(generate_stimela_casa_cab.doc_cache_dir(), "deconvolve.json")
+
+    assert lookup_docs("applycal") == xml_params
+    assert lookup_docs("applycal") == xml_params
+    downloaded = lookup_docs("deconvolve")
+    assert downloaded["niter"] and standin_docs.requests[-1] == ("/tasks611/deconvolve.xml.html", 200)
+    generate_stimela_casa_cab.DOCS_MEMO.clear()
+    assert lookup_docs("deconvolve") == downloaded
+
+    archive = tmp_path / "docs.json"
+    assert build_doc_archive(str(archive), ["deconvolve"]) == ["deconvolve"]
+    monkeypatch.setenv("STIMELA_CASA_DOC_ARCHIVE", str(archive))
+    os.remove(cached_page)
+    generate_stimela_casa_cab.DOCS_MEMO.clear()
+    requests_before = len(standin_docs.requests)
+    assert lookup_docs("deconvolve") == downloaded
+    assert lookup_docs("flagdata") == {}
+    assert [status for _, status in standin_docs.requests[requests_before:]] == [404]
+
+    inputs = extract_yaml(os.path.join(TASK_DIR, "deconvolve.py"))["yaml"]["cabs"]["deconvolve"]["inputs"]
+    monkeypatch.chdir(tmp_path)
+    validate_against_xml("deconvolve", inputs)
+
+    # The XML directory belongs to CASA 6.1 and does not answer for another release
+    monkeypatch.setitem(generate_stimela_casa_cab.CASA_RELEASES, "6.2", generate_stimela_casa_cab.CASA_RELEASES["6.1"])
+    monkeypatch.setenv("STIMELA_CASA_VERSION", "6.2")
+    assert lookup_docs("applycal")["observation"]
+
+    served = [(entry["task"], entry["backend"], entry["status"]) for entry in chain.served]
+    assert served == [
+        ("applycal", "local-xml", "parsed"), ("applycal", "memo", "hit"), ("deconvolve", "network", "downloaded"),
+        ("deconvolve", "disk-cache", "fresh"), ("deconvolve", "archive", "hit"), ("flagdata", "none", "failed"),
+        ("deconvolve", "memo", "hit"), ("applycal", "network", "downloaded"),
+    ]
+    assert all(entry["seconds"] >= 0 for entry in chain.served)
+    assert [row[:2] for row in chain.summary()] == [
+        ["memo", 2], ["local-xml", 1], ["archive", 1], ["disk-cache", 1], ["network", 2], ["none", 1]]
+    with pytest.raises(TypeError):
+        generate_stimela_casa_cab.DocSource()
+
+
+def test_validate_online_serves_prefetched_docs(standin_docs, tmp_path, monkeypatch):
+    """--validate-online serves fresh cached pages as-is; --doc-max-age=0 revalidates them with the site."""
+    chain = default_doc_sources()
+    monkeypatch.setattr(generate_stimela_casa_cab, "DOC_SOURCES", chain)
+    generate_stimela_casa_cab.DOCS_MEMO.clear()
+    monkeypatch.setenv("STIMELA_CASA_DOC_MAX_AGE", str(generate_stimela_casa_cab.DOC_CACHE_MAX_AGE))
+    requests_before = len(standin_docs.requests)
+    assert lookup_docs("applycal")["vis"]
+
+    task_file = os.path.abspath(os.path.join(TASK_DIR, "applycal.py"))
+    monkeypatch.chdir(tmp_path)
+    for options, backend, fetches in (([], "disk-cache", 1), (["--doc-max-age=0"], "network", 2)):
+        generate_stimela_casa_cab.DOCS_MEMO.clear()
+        monkeypatch.setattr("sys.argv", ["generate_stimela_casa_cab.py", task_file, "--validate-online"] + options)
+        generate_stimela_casa_cab.main()
+        assert chain.served[-1]["backend"] == backend
+        assert [path for path, _ in standin_docs.requests[requests_before:]] == ["/tasks611/applycal.xml.html"] * fetches
+
+
+def test_doc_fetch_is_single_flight_across_processes(tmp_path, monkeypatch):
+    """Processes needing the same uncached page wait for the first one's download instead of fetching it again."""
+    monkeypatch.setenv("STIMELA_CASA_CACHE_DIR", str(tmp_path))
+    with DocsStandIn(latency=0.3) as standin:
+        monkeypatch.setenv("STIMELA_CASA_DOCS_URL", standin.url)
+        with multiprocessing.get_context("fork").Pool(4) as pool:
+            results = pool.map(fetch_xml_parameter_info, ["applycal"] * 4, chunksize=1)
+        assert all(result == results[0] for result in results) and results[0]["vis"]
+        assert standin.requests == [("/tasks611/applycal.xml.html", 200)]
+    assert not os.path.exists(os.path.join(generate_stimela_casa_cab.doc_cache_dir(), "applycal.json.lock"))
+
+
+def test_file_lock_breaks_stale_locks(tmp_path):
+    """A lock held by a dead process, or held for too long, is broken; a live, recent holder is waited for."""
+    path = str(tmp_path / "entry.lock")
+    holder = FileLock(path)
+    assert holder.acquire()
+    assert not FileLock(path).acquire(blocking=False)
+    assert not FileLock(path).acquire(timeout=0.2)
+
+    # The holder's descriptor stays locked, as in a forked child that inherited it, but its recorded owner is gone
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    with open(path, "w") as f:
+        json.dump({"host": socket.gethostname(), "pid": dead.pid}, f)
+    broken_before = generate_stimela_casa_cab.METRICS.counter("locks_broken_total")
+    successor = FileLock(path)
+    assert successor.acquire(timeout=5)
+    assert generate_stimela_casa_cab.METRICS.counter("locks_broken_total") == broken_before + 1
+    assert not os.path.exists(path + ".break"), "the guard used while breaking is removed"
+    holder.release()
+    assert os.path.exists(path), "releasing a broken lock leaves its successor's lock file alone"
+
+    old = time.time() - 60
+    os.utime(path, (old, old))
+    late = FileLock(path, stale_after=30)
+    assert late.acquire(timeout=5)
+    successor.release()
+    late.release()
+    assert not os.path.exists(path)
+
+
+def test_file_lock_heartbeat_keeps_live_holder_fresh(tmp_path, monkeypatch):
+    """A live holder keeps touching its lock, so waiters never break it however long it is held."""
+    monkeypatch.setattr(generate_stimela_casa_cab, "LOCK_HEARTBEAT_INTERVAL", 0.05)
+    monkeypatch.setattr(FileLock, "_heartbeat", None)
+    path = str(tmp_path / "entry.lock")
+    holder = FileLock(path, stale_after=0.5)
+    assert holder.acquire()
+    old = time.time() - 60
+    os.utime(path, (old, old))
+    time.sleep(0.3)
+    assert not FileLock(path, stale_after=0.5).acquire(timeout=1)
+    holder.release()
+    assert not os.path.exists(path)
+
+
+def test_cab_store_extracts_each_wrapper_once_across_processes(tmp_path):
+    """Concurrent store updates share extraction work; a claimed wrapper is waited for, then built if still missing."""
+    store_dir = str(tmp_path / "store")
+    paths = collect_task_files([TASK_DIR])
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+
+    def update(version):
+        queue.put(CabStore(store_dir).update_release(version, paths))
+
+    processes = [context.Process(target=update, args=(version,)) for version in ("6.1", "6.1-rerun")]
+    for process in processes:
+        process.start()
+    reports = [queue.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join()
+    assert sorted(task for report in reports for task in report["extracted"]) == sorted(
+        os.path.splitext(os.path.basename(path))[0] for path in paths)
+
+    store = CabStore(str(tmp_path / "fresh"))
+    applycal = os.path.join(TASK_DIR, "applycal.py")
+    lock = FileLock(store._built_path("applycal", generate_stimela_casa_cab._file_sha256(applycal)) + ".lock")
+    assert lock.acquire()
+    outcome = {}
+    updater = threading.Thread(target=lambda: outcome.update(store.update_release("6.1", [applycal])))
+    updater.start()
+    updater.join(0.5)
+    assert updater.is_alive(), "waits while another process holds the wrapper's lock"
+    lock.release()
+    updater.join(30)
+    assert outcome["extracted"] == ["applycal"], "built itself once the holder finished without a result"
+
+
+def test_cab_store_rechecks_built_cab_after_claiming(tmp_path, monkeypatch):
+    """A cab built by another process between the check and the claim is reused, not extracted again."""
+    store = CabStore(str(tmp_path / "store"))
+    applycal = os.path.join(TASK_DIR, "applycal.py")
+    source_hash = generate_stimela_casa_cab._file_sha256(applycal)
+    built_cab = store.built_cab
+    checks = []
+
+    def built_meanwhile(task_name, digest):
+        checks.append(task_name)
+        if len(checks) == 1:
+            store._record_built("applycal", source_hash, extract_yaml(applycal)["yaml"]["cabs"]["applycal"])
+            return None
+        return built_cab(task_name, digest)
+
+    monkeypatch.setattr(store, "built_cab", built_meanwhile)
+    report = store.update_release("6.1", [applycal])
+    assert report["reused"] == ["applycal"] and not report["extracted"]